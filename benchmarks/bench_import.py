@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks.bench_import
+~~~~~~~~~~~~
+Measures how long `import osisoftpy` takes in a fresh interpreter and fails
+when the median exceeds the budget, or when the import pulls in an optional
+dependency or configures logging.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# imported only by the features that need them
+LAZY = ('requests_kerberos', 'blinker', 'dateutil', 'numpy', 'pandas',
+        'pyarrow', 'multiprocessing.pool', 'multiprocessing.shared_memory')
+
+PROBE = '''
+import json, logging, sys, time
+began = time.time()
+import osisoftpy
+elapsed = time.time() - began
+handlers = [type(h).__name__ for h in logging.getLogger('osisoftpy').handlers]
+print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules),
+                  'handlers': handlers,
+                  'level': logging.getLogger('osisoftpy').level}))
+'''
+
+
+def measure():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [SRC] + [p for p in [env.get('PYTHONPATH')] if p])
+    out = subprocess.check_output([sys.executable, '-c', PROBE], env=env)
+    return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='number of fresh interpreters')
+    parser.add_argument('--budget', type=float, default=250,
+                        help='maximum median import time in milliseconds')
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.repeat)]
+    times = sorted(1000 * r['seconds'] for r in runs)
+    median = times[len(times) // 2]
+    print('import osisoftpy      median {:.1f} ms  min {:.1f} ms  '
+          'max {:.1f} ms  budget {:.0f} ms'.format(
+              median, times[0], times[-1], args.budget))
+
+    problems = []
+    if median > args.budget:
+        problems.append('median import time {:.1f} ms exceeds the budget of '
+                        '{:.0f} ms'.format(median, args.budget))
+    loaded = [m for m in LAZY if m in runs[0]['modules']]
+    if loaded:
+        problems.append('optional modules imported eagerly: {}'.format(
+            ', '.join(loaded)))
+    if runs[0]['handlers'] != ['NullHandler'] or runs[0]['level']:
+        problems.append('logging configured at import: {} level {}'.format(
+            runs[0]['handlers'], runs[0]['level']))
+    for problem in problems:
+        print('FAIL ' + problem)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
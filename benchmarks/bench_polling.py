@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks.bench_polling
+~~~~~~~~~~~~
+Polls many points for their current values and their recorded values since
+the previous poll, as a dashboard would.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from common import arguments, connect, run
+
+
+def main():
+    args = arguments(__doc__, points=200, repeat=20)
+    fake, webapi, recorder = connect(args)
+    points = webapi.points(query='name:*', count=args.points)
+    run('poll current', points.current, recorder, args.repeat)
+    cursors = {}
+
+    def since():
+        values, new = points.recorded_since(cursors)
+        cursors.update(new)
+
+    run('poll recorded_since', since, recorder, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
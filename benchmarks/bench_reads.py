@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks.bench_reads
+~~~~~~~~~~~~
+Reads the current, recorded, interpolated and summary values of many
+points.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from common import arguments, connect, run
+
+
+def main():
+    args = arguments(__doc__, points=200, repeat=3)
+    fake, webapi, recorder = connect(args)
+    points = webapi.points(query='name:*', count=args.points)
+    run('current (batch)', points.current, recorder, args.repeat)
+    run('recorded 1 day', lambda: [p.recorded(starttime='*-1d', endtime='*')
+                                   for p in points], recorder, args.repeat)
+    run('interpolated 1 day 1h', lambda: [p.interpolated(
+        starttime='*-1d', endtime='*', interval='1h') for p in points],
+        recorder, args.repeat)
+    run('summary 1 day', lambda: [p.summary(
+        starttime='*-1d', endtime='*', summarytype=['Average', 'Maximum'])
+        for p in points], recorder, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks.bench_search
+~~~~~~~~~~~~
+Searches for points: a single name, a wildcard and a query that pages
+through every point.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from common import arguments, connect, run
+
+
+def main():
+    args = arguments(__doc__)
+    fake, webapi, recorder = connect(args)
+    run('search single', lambda: webapi.points(query='name:sinusoid'),
+        recorder, args.repeat)
+    run('search wildcard', lambda: webapi.points(query='name:fake0001*'),
+        recorder, args.repeat)
+    run('search all (paged)', lambda: webapi.points(
+        query='name:*', count=args.points), recorder, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks.bench_writes
+~~~~~~~~~~~~
+Writes single values and, through the batch controller, many values to
+many points.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import itertools
+
+from common import arguments, connect, run
+from osisoftpy.pitime import format_epoch
+
+
+def main():
+    args = arguments(__doc__, points=100, repeat=3)
+    fake, webapi, recorder = connect(args)
+    points = webapi.points(query='name:*', count=args.points)
+    clock = itertools.count(1500000000)
+    blocks = itertools.count(1400000000, 100)
+
+    def single():
+        for p in points:
+            p.update_value(format_epoch(next(clock)), 1.0)
+
+    def bulk():
+        start = next(blocks)
+        data = dict((p, [(format_epoch(start + k), float(k))
+                         for k in range(100)]) for p in points)
+        points.update_values(data, retries=0)
+
+    run('update_value', single, recorder, args.repeat)
+    run('update_values (batch)', bulk, recorder, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+benchmarks.common
+~~~~~~~~~~~~
+Shared setup and reporting of the benchmarks.
+
+Every benchmark runs against the in-process fake PI Web API and reports the
+requests per second, the p50 and p99 latency of the HTTP requests and the
+peak resident memory of the process.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from osisoftpy.fakeserver import FakePIWebAPI
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def arguments(description, **defaults):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--points', type=int, default=defaults.get(
+        'points', 1000), help='number of points on the fake server')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds every request takes')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with a 500')
+    parser.add_argument('--repeat', type=int, default=defaults.get(
+        'repeat', 10), help='number of times the workload runs')
+    return parser.parse_args()
+
+
+class Recorder(object):
+    """Collects the elapsed time of every response of a session."""
+
+    def __init__(self):
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def __call__(self, response, *args, **kwargs):
+        with self._lock:
+            self.latencies.append(response.elapsed.total_seconds())
+        return response
+
+    def clear(self):
+        with self._lock:
+            del self.latencies[:]
+
+
+def connect(args):
+    """
+    Starts a fake server for the arguments and connects to it.
+
+    :return: (fake, webapi, recorder) tuple
+    """
+    fake = FakePIWebAPI(points=args.points, latency=args.latency,
+                        error_rate=args.error_rate)
+    webapi = fake.webapi()
+    recorder = Recorder()
+    webapi.session.hooks['response'].append(recorder)
+    return fake, webapi, recorder
+
+
+def run(name, workload, recorder, repeat):
+    """
+    Runs a workload repeatedly and prints its report.
+
+    :param string name: Name of the benchmark.
+    :param workload: Function without arguments.
+    :param Recorder recorder: Recorder of the session the workload uses.
+    :param int repeat: Number of runs.
+    """
+    recorder.clear()
+    start = time.time()
+    for _ in range(repeat):
+        workload()
+    elapsed = time.time() - start
+    report(name, recorder.latencies, elapsed)
+
+
+def report(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    print('{:<28} {:>8} requests {:>10.1f} req/s  p50 {:>8.2f} ms  '
+          'p99 {:>8.2f} ms  peak RSS {:>7.1f} MB'.format(
+              name, len(latencies), len(latencies) / elapsed if elapsed else 0,
+              1000 * percentile(latencies, 50),
+              1000 * percentile(latencies, 99), peak_rss() / 2 ** 20))
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    k = max(int(round(p / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(k, len(values) - 1)]
+
+
+def peak_rss():
+    """Peak resident memory of the process in bytes, 0 if unknown."""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
@@ -28,18 +28,26 @@ from osisoftpy.point import (Point)
 from osisoftpy.element import Element
 from osisoftpy.attribute import Attribute
 from osisoftpy.value import (Value)
+from osisoftpy.cursor import Cursor
 from osisoftpy.dataserver import DataServer
 from osisoftpy.assetserver import AssetServer
 from osisoftpy.api import webapi
+from osisoftpy.profiling import profile
 
 __author__ = 'Andrew Pong'
 __email__ = 'apong@dstcontrols.com'
 __version__ = '2.3.5'
 
 
-# Configure logging
+# Logging is left to the application; init_log() can be called to print
+# the library's debug messages.
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
 
 def init_log():
+    """Prints the DEBUG messages of osisoftpy and requests_kerberos to
+    stderr.
+    """
     format = logging.Formatter(
         '[%(filename)s:%(lineno)s %(funcName)5s() ] %(levelname).1s %(message)s')
     log_level = logging.DEBUG
@@ -59,5 +67,3 @@ def init_log():
     # rklog.addHandler(stream_handler)
     # klog.addHandler(stream_handler)
 
-init_log()
-
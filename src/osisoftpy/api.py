@@ -21,8 +21,6 @@ This module implements the OSIsoftPy API.
 from __future__ import (absolute_import, division, unicode_literals)
 
 import requests
-import requests_kerberos
-from requests_kerberos import HTTPKerberosAuth
 import logging
 from requests.packages.urllib3 import disable_warnings
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
@@ -44,7 +42,8 @@ def webapi(
         username=None,
         password=None,
         verifyssl=False,
-        error_action='Stop'):
+        error_action='Stop',
+        session=None):
     """Sends a request to the provided url and authentication configuration. 
     If successfully, a WebAPI object will be constructed from the response 
     and returned. 
@@ -56,23 +55,31 @@ def webapi(
     :param password: Optional password - Only used for basic auth.
     :param verifyssl: Optional SSL verification. If set to False, then
         InsecureRequestWarning will be disabled.
+    :param session: Optional requests Session to send the requests with,
+        e.g. the one of :class:`osisoftpy.fakeserver.FakePIWebAPI`. The
+        authentication and SSL options are then left as they are.
     :return: :class:`WebAPI <WebAPI>` object
     :rtype: osisoftpy.WebAPI
     """
     try:
-        s = requests.session()
-        s.verify = verifyssl
-        if not s.verify:
-            disable_warnings(InsecureRequestWarning)
-        if authtype == 'kerberos':
-            s.auth = HTTPKerberosAuth(
-                mutual_authentication=requests_kerberos.OPTIONAL,
-                sanitize_mutual_error_response=False,
-                hostname_override=hostname_override,
-                force_preemptive=True,
-                principal=principal)
-        else:
-            s.auth = requests.auth.HTTPBasicAuth(username, password)
+        s = session
+        if s is None:
+            s = requests.session()
+            s.verify = verifyssl
+            if not s.verify:
+                disable_warnings(InsecureRequestWarning)
+            if authtype == 'kerberos':
+                # requests_kerberos is only imported when it is used
+                import requests_kerberos
+                from requests_kerberos import HTTPKerberosAuth
+                s.auth = HTTPKerberosAuth(
+                    mutual_authentication=requests_kerberos.OPTIONAL,
+                    sanitize_mutual_error_response=False,
+                    hostname_override=hostname_override,
+                    force_preemptive=True,
+                    principal=principal)
+            else:
+                s.auth = requests.auth.HTTPBasicAuth(username, password)
         r = APIResponse(s.get(url), s)
         if r.response.status_code == 401:
             msg = 'Authorization denied - incorrect username or password.'
@@ -73,7 +73,7 @@ class AssetServer(Base):
         }
         url = '{}/{}/{}/{}'.format(
             self.webapi.links.get('Self'), 'assetservers', self.webid, 'assetdatabases')
-        r = get(url, self.session, params=payload, **kwargs)
+        r = get(url, self.session, params=payload, webapi=self.webapi, **kwargs)
         itemsjson = r.response.json().get('Items', None)
         databases = list(create(Factory(AssetDatabase), databaseitem, self.session,
                     self.webapi) for databaseitem in itemsjson)
@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.cache
+~~~~~~~~~~~~
+This module contains the client side caches of OSIsoftPy.
+
+The RecordedCache keeps the recorded values of streams together with the
+time intervals they are known to be complete for, so repeated requests for
+the same history only fetch the parts that are missing.
+
+The ConditionalCache keeps the ETag and Last-Modified validators of GET
+responses, so internal.get can ask the server whether a resource changed and
+reuse the already parsed body when it didn't.
+
+The ResponseCache keeps GET responses for a few seconds, so callers in one
+process asking for the same values shortly after each other share a single
+request to the server.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import bisect
+import collections
+import io
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class _Segments(object):
+    """The cached recorded values of one stream."""
+
+    def __init__(self, intervals=None, times=None, items=None):
+        self.intervals = intervals or []
+        self.times = times or []
+        self.items = items or []
+
+    def __len__(self):
+        return len(self.items)
+
+    def missing(self, start, end):
+        gaps = []
+        cursor = start
+        for a, b in self.intervals:
+            if b < cursor:
+                continue
+            if a > end:
+                break
+            if a > cursor:
+                gaps.append((cursor, a))
+            cursor = max(cursor, b)
+            if cursor >= end:
+                break
+        if cursor < end or (start == end and not self.covers(start)):
+            gaps.append((cursor, end))
+        return gaps
+
+    def covers(self, t):
+        return any(a <= t <= b for a, b in self.intervals)
+
+    def add(self, start, end, times, items):
+        # the fetched range is authoritative: whatever was cached inside of
+        # it is replaced by what the server returned.
+        lo = bisect.bisect_left(self.times, start)
+        hi = bisect.bisect_right(self.times, end)
+        self.times[lo:hi] = times
+        self.items[lo:hi] = items
+
+        merged = []
+        for a, b in sorted(self.intervals + [(start, end)]):
+            if merged and a <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        self.intervals = merged
+
+    def slice(self, start, end):
+        lo = bisect.bisect_left(self.times, start)
+        hi = bisect.bisect_right(self.times, end)
+        return self.times[lo:hi], self.items[lo:hi]
+
+    def interval(self, start, end):
+        for a, b in self.intervals:
+            if a <= start and end <= b:
+                lo = bisect.bisect_left(self.times, a)
+                hi = bisect.bisect_right(self.times, b)
+                return a, b, self.times[lo:hi], self.items[lo:hi]
+        return None
+
+
+class RecordedCache(object):
+    """
+    A cache of recorded values per stream which tracks the time intervals
+    it holds complete data for.
+
+    The cache is bounded by the total number of values it holds; when it
+    grows larger, the least recently used streams are dropped, or written to
+    directory if one is given, from where they are loaded when needed again.
+
+    :param int maxvalues: Optional. Maximum number of values held in memory.
+        Defaults to 1,000,000.
+    :param string directory: Optional. Directory to keep evicted streams in.
+    """
+
+    def __init__(self, maxvalues=1000000, directory=None):
+        self.maxvalues = maxvalues
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+        self._streams = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __len__(self):
+        return self._size
+
+    def missing(self, webid, start, end):
+        """
+        Returns the parts of a time range which are not cached.
+
+        :param string webid: WebID of the stream.
+        :param float start: Start of the range, in seconds since the epoch.
+        :param float end: End of the range, in seconds since the epoch.
+        :return: list of (start, end) tuples
+        :rtype: list
+        """
+        with self._lock:
+            segments = self._get(webid)
+            gaps = segments.missing(start, end) if segments else [(start, end)]
+            if gaps:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return gaps
+
+    def add(self, webid, start, end, times, items):
+        """
+        Stores the recorded values of a time range.
+
+        :param string webid: WebID of the stream.
+        :param float start: Start of the range, in seconds since the epoch.
+        :param float end: End of the range the values are complete for.
+        :param list times: Sorted times of the items, in seconds since the
+            epoch.
+        :param list items: The items as returned by the PI Web API.
+        """
+        with self._lock:
+            segments = self._get(webid)
+            if segments is None:
+                segments = self._streams[webid] = _Segments()
+            self._size -= len(segments)
+            segments.add(start, end, times, items)
+            self._size += len(segments)
+            self._evict()
+
+    def values(self, webid, start, end):
+        """
+        Returns the cached items of a time range.
+
+        :param string webid: WebID of the stream.
+        :param float start: Start of the range, in seconds since the epoch.
+        :param float end: End of the range, in seconds since the epoch.
+        :return: The items as returned by the PI Web API.
+        :rtype: list
+        """
+        return self.series(webid, start, end)[1]
+
+    def series(self, webid, start, end):
+        """
+        Returns the cached items of a time range with their times.
+
+        :param string webid: WebID of the stream.
+        :param float start: Start of the range, in seconds since the epoch.
+        :param float end: End of the range, in seconds since the epoch.
+        :return: (times, items) lists
+        :rtype: tuple
+        """
+        with self._lock:
+            segments = self._get(webid)
+            return segments.slice(start, end) if segments else ([], [])
+
+    def interval(self, webid, start, end):
+        """
+        Returns the cached interval which contains a time range, with all of
+        its values.
+
+        :param string webid: WebID of the stream.
+        :param float start: Start of the range, in seconds since the epoch.
+        :param float end: End of the range, in seconds since the epoch.
+        :return: (start, end, times, items) of the interval, or None if no
+            interval contains the range.
+        :rtype: tuple
+        """
+        with self._lock:
+            segments = self._get(webid)
+            return segments.interval(start, end) if segments else None
+
+    def invalidate(self, webid=None):
+        """
+        Drops the cached values of a stream, or of all streams.
+
+        :param string webid: Optional. WebID of the stream.
+        """
+        with self._lock:
+            webids = [webid] if webid else list(self._streams)
+            for w in webids:
+                segments = self._streams.pop(w, None)
+                if segments is not None:
+                    self._size -= len(segments)
+                path = self._path(w)
+                if path and os.path.exists(path):
+                    os.remove(path)
+            if webid is None and self.directory:
+                for name in os.listdir(self.directory):
+                    if name.endswith('.json'):
+                        os.remove(os.path.join(self.directory, name))
+
+    def save(self):
+        """
+        Writes every cached stream to the directory.
+        """
+        with self._lock:
+            for webid, segments in self._streams.items():
+                self._dump(webid, segments)
+
+    def _get(self, webid):
+        segments = self._streams.get(webid)
+        if segments is not None:
+            self._streams.pop(webid)
+            self._streams[webid] = segments
+            return segments
+        path = self._path(webid)
+        if path and os.path.exists(path):
+            with io.open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            segments = _Segments(
+                [tuple(i) for i in stored['intervals']],
+                stored['times'], stored['items'])
+            self._streams[webid] = segments
+            self._size += len(segments)
+            self._evict()
+        return segments
+
+    def _evict(self):
+        # the stream in use was moved to the end, so it is never evicted
+        while self._size > self.maxvalues and len(self._streams) > 1:
+            webid, segments = self._streams.popitem(last=False)
+            self._size -= len(segments)
+            if self.directory:
+                self._dump(webid, segments)
+
+    def _dump(self, webid, segments):
+        # osisoftpy.internal imports this module
+        from osisoftpy.internal import replace_file
+
+        path = self._path(webid)
+        if not path:
+            return
+        with io.open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(json.dumps(dict(intervals=segments.intervals,
+                                    times=segments.times,
+                                    items=segments.items)))
+        replace_file(path + '.tmp', path)
+
+    def _path(self, webid):
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, '{}.json'.format(webid))
+
+
+def request_key(url, params=None):
+    """
+    Returns a key identifying a request by its url and parameters, ignoring
+    the order of the parameters and the ones set to None.
+
+    :param string url: URL of the request.
+    :param dict params: Optional. Query parameters of the request.
+    :rtype: tuple
+    """
+    if not params:
+        return url, ()
+    items = []
+    for k, v in params.items():
+        if v is None:
+            continue
+        if isinstance(v, (list, tuple)):
+            v = tuple(v)
+        items.append((k, v))
+    return url, tuple(sorted(items, key=lambda kv: kv[0]))
+
+
+class CachedResponse(object):
+    """
+    A response kept by a cache. It behaves like the requests.Response it
+    wraps, except that json() returns the body parsed when it was stored.
+    Callers must not modify the returned object.
+    """
+
+    def __init__(self, response):
+        self._response = response
+        try:
+            self._json = response.json()
+        except ValueError:
+            self._json = None
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def json(self, **kwargs):
+        if self._json is None:
+            raise ValueError('No JSON object could be decoded')
+        return self._json
+
+
+class ConditionalCache(object):
+    """
+    A bounded cache of GET responses with their ETag and Last-Modified
+    validators, used to send conditional requests.
+
+    Attributes:
+        | hits: Number of requests answered with 304 Not Modified
+        | misses: Number of requests which returned a full response
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def headers(self, key):
+        """
+        Returns the conditional headers for a request.
+
+        :param tuple key: Key of the request, see :func:`request_key`.
+        :rtype: dict
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.headers.get('ETag'):
+            headers['If-None-Match'] = entry.headers['ETag']
+        if entry.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = entry.headers['Last-Modified']
+        return headers
+
+    def response(self, key, response):
+        """
+        Returns the response to hand to the caller: the cached one if the
+        server answered 304 Not Modified, otherwise the new one, which is
+        cached if it carries a validator.
+
+        :param tuple key: Key of the request, see :func:`request_key`.
+        :param response: The requests.Response received.
+        """
+        with self._lock:
+            if response.status_code == 304 and key in self._entries:
+                self.hits += 1
+                entry = self._entries.pop(key)
+                self._entries[key] = entry
+                return entry
+            if response.status_code != 200:
+                return response
+            self.misses += 1
+            if not (response.headers.get('ETag') or
+                    response.headers.get('Last-Modified')):
+                self._entries.pop(key, None)
+                return response
+            entry = CachedResponse(response)
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return entry
+
+    def stats(self):
+        """
+        :return: dict with the hits, misses and size of the cache.
+        :rtype: dict
+        """
+        return dict(hits=self.hits, misses=self.misses, size=len(self))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Makes concurrent calls with the same key share one execution: the first
+    caller runs the function, the callers arriving while it runs wait for it
+    and get its result, or its exception.
+
+    Attributes:
+        | shared: Number of calls which were answered by another caller's
+        |     execution
+    """
+
+    def __init__(self):
+        self.shared = 0
+
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Calls fn, unless a call with the same key is in flight, in which
+        case its outcome is waited for and returned.
+
+        :param key: Hashable key identifying the call.
+        :param fn: Function without arguments.
+        :return: The result of fn.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+
+class ResponseCache(object):
+    """
+    A bounded cache of GET responses which keeps each response for the time
+    to live of its endpoint. Concurrent identical requests that miss the
+    cache share one request to the server.
+
+    The endpoint of a request is the last segment of its url's path, e.g.
+    'value', 'end' or 'recorded' for the stream controller.
+
+    :param float ttl: Optional. Seconds a response is kept for endpoints not
+        in ttls. Defaults to 1 second.
+    :param dict ttls: Optional. Seconds a response is kept per endpoint,
+        e.g. {'value': 0.5, 'assetdatabases': 300}. 0 disables caching for an
+        endpoint, though identical requests in flight are still shared.
+    :param int maxsize: Optional. Maximum number of responses kept.
+        Defaults to 1000.
+
+    Attributes:
+        | hits: Number of requests answered from the cache
+        | misses: Number of requests sent to the server
+    """
+
+    def __init__(self, ttl=1.0, ttls=None, maxsize=1000):
+        self.ttl = ttl
+        self.ttls = dict((k.lower(), v) for k, v in (ttls or {}).items())
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url, params, fetch):
+        """
+        Returns the cached response of a GET request, or calls fetch to
+        request it from the server.
+
+        :param string url: URL of the request.
+        :param dict params: Query parameters of the request.
+        :param fetch: Function without arguments returning the response.
+        """
+        key = ('GET',) + request_key(url, params)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, response = entry
+                if expires > now:
+                    self.hits += 1
+                    self._entries.pop(key)
+                    self._entries[key] = entry
+                    return response
+                del self._entries[key]
+        return self._flights.do(key, lambda: self._fetch(key, url, fetch))
+
+    def invalidate(self, webid=None):
+        """
+        Drops the cached responses of a stream or object, or all of them.
+
+        :param string webid: Optional. WebID the url of the responses
+            contains.
+        """
+        with self._lock:
+            if webid is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if webid in k[1]]:
+                del self._entries[key]
+
+    def stats(self):
+        """
+        :return: dict with the hits, misses, shared in-flight requests and
+            size of the cache.
+        :rtype: dict
+        """
+        return dict(hits=self.hits, misses=self.misses,
+                    shared=self._flights.shared, size=len(self))
+
+    def _fetch(self, key, url, fetch):
+        with self._lock:
+            self.misses += 1
+        response = fetch()
+        ttl = self._ttl(url)
+        if response.status_code != 200 or ttl <= 0:
+            return response
+        if not isinstance(response, CachedResponse):
+            response = CachedResponse(response)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + ttl, response)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return response
+
+    def _ttl(self, url):
+        endpoint = url.split('?')[0].rstrip('/').rsplit('/', 1)[-1].lower()
+        return self.ttls.get(endpoint, self.ttl)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.columnar
+~~~~~~~~~~~~
+This module decodes the values returned by the PI Web API into columns, one
+NumPy array per field, instead of a Value object per value:
+
+    | timestamp: float64 seconds since the epoch
+    | value: float64 numeric value, NaN for anything else
+    | state: int32 code of a digital state, -1 for anything else
+    | good: bool
+    | questionable: bool
+
+Strings and other non-numeric values that aren't digital states have no
+column; their value is NaN.
+
+NumPy is required.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import json
+
+from osisoftpy.interpolation import _is_number
+from osisoftpy.pitime import parse_epoch
+from osisoftpy.structures import BatchColumns
+
+COLUMNS = ('timestamp', 'value', 'state', 'good', 'questionable')
+DTYPES = {'timestamp': 'float64', 'value': 'float64', 'state': 'int32',
+          'good': 'bool', 'questionable': 'bool'}
+
+
+def empty(size=0):
+    """
+    Returns columns of the given length, filled with no value.
+
+    :rtype: dict
+    """
+    import numpy as np
+
+    return {
+        'timestamp': np.zeros(size, dtype='float64'),
+        'value': np.full(size, np.nan, dtype='float64'),
+        'state': np.full(size, -1, dtype='int32'),
+        'good': np.ones(size, dtype='bool'),
+        'questionable': np.zeros(size, dtype='bool'),
+    }
+
+
+def decode_items(items, states=None):
+    """
+    Decodes values in the format of the PI Web API into columns.
+
+    :param list items: The items, e.g. the Items of a recorded response.
+    :param dict states: Optional. dict the names of the digital states found
+        are added to, as code -> name.
+    :return: dict of column name -> numpy.ndarray
+    :rtype: dict
+    """
+    columns = empty(len(items))
+    timestamp, value, state = (columns['timestamp'], columns['value'],
+                               columns['state'])
+    good, questionable = columns['good'], columns['questionable']
+    for i, item in enumerate(items):
+        timestamp[i] = parse_epoch(item['Timestamp'])
+        v = item.get('Value')
+        if _is_number(v):
+            value[i] = v
+        elif isinstance(v, dict) and _is_number(v.get('Value')):
+            state[i] = v['Value']
+            if states is not None:
+                states[int(v['Value'])] = v.get('Name')
+        if item.get('Good') is False:
+            good[i] = False
+        if item.get('Questionable'):
+            questionable[i] = True
+    return columns
+
+
+def from_values(values):
+    """
+    Converts :class:`osisoftpy.Value` objects, e.g. the result of
+    :meth:`osisoftpy.Point.recorded`, into columns.
+
+    :param list values: The values.
+    :return: dict of column name -> numpy.ndarray
+    :rtype: dict
+    """
+    return decode_items([dict(Timestamp=v.timestamp, Value=v.value,
+                              Good=getattr(v, 'good', True),
+                              Questionable=getattr(v, 'questionable', False))
+                         for v in values])
+
+
+def decode_batch(body):
+    """
+    Decodes a batch response whose sub-requests returned Items, e.g. reads
+    of recorded values, into columns per sub-request.
+
+    :param bytes body: The raw response body.
+    :return: dict of key -> :class:`BatchColumns <BatchColumns>`, where last
+        is the Timestamp of the last item and skip the number of items
+        sharing it, for continuing with a :class:`osisoftpy.cursor.Cursor`,
+        and states the names of the digital states found, as code -> name.
+    :rtype: dict
+    """
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    results = {}
+    for key, item in json.loads(body).items():
+        status = item.get('Status')
+        content = item.get('Content')
+        if status != 200 or not isinstance(content, dict):
+            errors = content.get('Errors') if isinstance(content, dict) \
+                else [content]
+            results[key] = BatchColumns(status, None, None, 0, errors or [],
+                                        {})
+            continue
+        items = content.get('Items') or []
+        last = items[-1]['Timestamp'] if items else None
+        skip = 0
+        for x in reversed(items):
+            if x['Timestamp'] != last:
+                break
+            skip += 1
+        states = {}
+        results[key] = BatchColumns(status, decode_items(items, states), last,
+                                    skip, [], states)
+    return results
+
+
+def take(columns, start=0, stop=None):
+    """
+    Returns a slice of every column.
+
+    :rtype: dict
+    """
+    return dict((name, array[start:stop]) for name, array in columns.items())
+
+
+def concat(parts):
+    """
+    Joins columns end to end.
+
+    :param list parts: dicts of columns.
+    :rtype: dict
+    """
+    import numpy as np
+
+    if not parts:
+        return empty()
+    if len(parts) == 1:
+        return parts[0]
+    return dict((name, np.concatenate([p[name] for p in parts]))
+                for name in COLUMNS)
+
+
+def nbytes(columns):
+    """
+    Returns the size of the columns in bytes.
+
+    :rtype: int
+    """
+    return sum(array.nbytes for array in columns.values())
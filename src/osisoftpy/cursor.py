@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.cursor
+~~~~~~~~~~~~
+This module contains the Cursor class, which remembers how far the recorded
+values of a stream have been read by Stream.recorded_since and
+Points.recorded_since.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import json
+
+
+class Cursor(object):
+    """
+    The read position in the recorded values of a stream.
+
+    Several values can share a timestamp, so besides the timestamp of the
+    last value read the cursor keeps how many values at that timestamp were
+    read already.
+
+    Attributes:
+        | webid: WebID of the stream
+        | timestamp: Timestamp of the last value read
+        | skip: Number of values at timestamp which were read
+    """
+
+    def __init__(self, webid, timestamp, skip=0):
+        self.webid = webid
+        self.timestamp = timestamp
+        self.skip = skip
+
+    def __str__(self):
+        self_str = '<OSIsoft PI Cursor [{} - {}]>'
+        return self_str.format(self.webid, self.timestamp)
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
+
+    def __ne__(self, other):
+        return not self == other
+
+    def advance(self, items):
+        """
+        Returns the cursor after the given items, which must be the result of
+        a request starting at this cursor's timestamp.
+
+        :param list items: The recorded items as returned by the PI Web API.
+        :rtype: osisoftpy.cursor.Cursor
+        """
+        if not items:
+            return self
+        last = items[-1].get('Timestamp')
+        skip = sum(1 for x in items if x.get('Timestamp') == last)
+        return Cursor(self.webid, last, skip)
+
+    def to_dict(self):
+        return dict(webid=self.webid, timestamp=self.timestamp, skip=self.skip)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['webid'], d['timestamp'], d.get('skip', 0))
+
+
+def dumps(cursors):
+    """
+    Serializes cursors to a JSON string.
+
+    :param cursors: dict of webid -> :class:`Cursor`, or an iterable of them.
+    :rtype: string
+    """
+    if hasattr(cursors, 'values'):
+        cursors = cursors.values()
+    return json.dumps([c.to_dict() for c in cursors])
+
+
+def loads(s):
+    """
+    Restores cursors serialized with :func:`dumps`.
+
+    :param string s: JSON string.
+    :return: dict of webid -> :class:`Cursor`
+    :rtype: dict
+    """
+    return dict((c.webid, c) for c in map(Cursor.from_dict, json.loads(s)))
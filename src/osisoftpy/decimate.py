@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.decimate
+~~~~~~~~~~~~
+This module reduces recorded values to the number of points a trend can
+show, on the client, as an alternative to the plot values of the server.
+
+Two methods are available:
+
+    | minmax: splits the time range into one bucket per pixel and keeps the
+    |     first, last, lowest and highest value of each (M4), so no spike is
+    |     lost and the lines between pixels join up as they would undecimated.
+    | lttb: Largest-Triangle-Three-Buckets, which keeps the one value per
+    |     bucket that best preserves the visual shape of the line.
+
+Only good numeric values are decimated; bad values and digital states are
+always kept, so gaps remain visible in the trend.
+
+NumPy is required.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+from osisoftpy.interpolation import _is_number
+
+METHODS = ('minmax', 'lttb')
+
+
+def minmax(times, values, pixels):
+    """
+    Returns the indices of the first, last, lowest and highest value of
+    every bucket, after splitting the time range into equally long buckets.
+
+    :param times: Sorted times, in seconds since the epoch.
+    :param values: Numeric values.
+    :param int pixels: Number of buckets.
+    :return: Sorted numpy.ndarray of indices into times.
+    """
+    import numpy as np
+
+    t = np.asarray(times, dtype='float64')
+    v = np.asarray(values, dtype='float64')
+    if len(t) <= 4 * pixels:
+        return np.arange(len(t))
+    span = t[-1] - t[0]
+    if span <= 0:
+        return np.array([0, len(t) - 1])
+    bucket = np.minimum(((t - t[0]) / span * pixels).astype('int64'),
+                        pixels - 1)
+    # the times are sorted, so each bucket is a run of indices
+    edges = np.flatnonzero(np.diff(bucket)) + 1
+    first = np.concatenate(([0], edges))
+    last = np.concatenate((edges - 1, [len(t) - 1]))
+    # sorted by bucket and then by value, each bucket's lowest value comes
+    # first and its highest last
+    order = np.lexsort((v, bucket))
+    keep = np.concatenate((first, last, order[first], order[last]))
+    return np.unique(keep)
+
+
+def lttb(times, values, pixels):
+    """
+    Returns the indices of the values selected by the
+    Largest-Triangle-Three-Buckets algorithm.
+
+    :param times: Sorted times, in seconds since the epoch.
+    :param values: Numeric values.
+    :param int pixels: Number of values to keep, at least 3.
+    :return: Sorted numpy.ndarray of indices into times.
+    """
+    import numpy as np
+
+    t = np.asarray(times, dtype='float64')
+    v = np.asarray(values, dtype='float64')
+    n = len(t)
+    if pixels >= n or pixels < 3:
+        return np.arange(n)
+
+    # the first and last values are always kept, the others are split into
+    # pixels - 2 buckets of about the same number of values
+    edges = (np.arange(pixels - 1) * ((n - 2) / (pixels - 2)) + 1).astype(
+        'int64')
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    sums_t = np.add.reduceat(t[1:n - 1], edges[:-1] - 1)
+    sums_v = np.add.reduceat(v[1:n - 1], edges[:-1] - 1)
+    avg_t = np.append(sums_t / counts, t[-1])
+    avg_v = np.append(sums_v / counts, v[-1])
+
+    selected = np.empty(pixels, dtype='int64')
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for k in range(pixels - 2):
+        lo, hi = edges[k], edges[k + 1]
+        # twice the area of the triangles formed by the point selected
+        # before, each candidate and the average of the next bucket
+        area = np.abs((t[a] - avg_t[k + 1]) * (v[lo:hi] - v[a]) -
+                      (t[a] - t[lo:hi]) * (avg_v[k + 1] - v[a]))
+        a = lo + int(np.argmax(area))
+        selected[k + 1] = a
+    return selected
+
+
+def decimate(times, items, pixels, method='minmax'):
+    """
+    Reduces recorded items to about the number of points a trend of the
+    given width can show.
+
+    :param list times: Sorted times of the items, in seconds since the epoch.
+    :param list items: The recorded items as returned by the PI Web API.
+    :param int pixels: Width of the trend in pixels.
+    :param string method: Optional. 'minmax' (the default), which keeps up
+        to four values per pixel, or 'lttb', which keeps one.
+    :return: The selected items, in time order.
+    :rtype: list
+    """
+    import numpy as np
+
+    if method not in METHODS:
+        raise ValueError('method must be one of {}, not {!r}'.format(
+            ', '.join(METHODS), method))
+    numeric = np.array([bool(x.get('Good', True)) and
+                        _is_number(x.get('Value')) for x in items], dtype=bool)
+    index = np.flatnonzero(numeric)
+    t = np.asarray(times, dtype='float64')[index]
+    v = np.array([float(items[i]['Value']) for i in index], dtype='float64')
+    select = minmax if method == 'minmax' else lttb
+    keep = index[select(t, v, pixels)]
+    keep = np.union1d(keep, np.flatnonzero(~numeric))
+    return [items[i] for i in keep]
+
+
+def decimate_many(series, pixels, method='minmax'):
+    """
+    Decimates the recorded items of several streams to the same width.
+
+    :param dict series: key -> (times, items) of every stream, see
+        :func:`decimate`.
+    :param int pixels: Width of the trend in pixels.
+    :param string method: Optional. 'minmax' (the default) or 'lttb'.
+    :return: dict key -> selected items, of the same type as series.
+    :rtype: dict
+    """
+    result = type(series)()
+    for key, (times, items) in series.items():
+        result[key] = decimate(times, items, pixels, method)
+    return result
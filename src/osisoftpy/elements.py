@@ -25,6 +25,10 @@ from __future__ import (absolute_import, division, unicode_literals)
 from future.builtins import *
 
 import collections
+try:
+    from collections.abc import MutableSequence
+except ImportError:
+    from collections import MutableSequence
 import logging
 
 from osisoftpy.factory import Factory
@@ -35,7 +39,7 @@ from osisoftpy.value import Value
 log = logging.getLogger(__name__)
 
 
-class Elements(collections.MutableSequence):
+class Elements(MutableSequence):
     def __init__(self, iterable, webapi):
         self.list = list()
         self.webapi = webapi
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.enumeration
+~~~~~~~~~~~~
+This module contains the enumeration sets, also called digital state sets,
+of digital points and enumerated attributes.
+
+The PI Web API returns a digital value as a dict of its state's Name and
+Value, i.e. its code. The columnar paths (see :mod:`osisoftpy.columnar`)
+keep only the code; an :class:`EnumerationSet` resolves codes to names when
+they are needed. Stream.enumeration_set fetches the set of a stream once,
+and the sets are shared through the :class:`EnumerationCache` of the WebAPI
+by every stream using them.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class EnumerationSet(object):
+    """
+    The states of an enumeration set.
+
+    :param string name: Name of the set.
+    :param states: dict of code -> name, or (code, name) tuples.
+
+    Attributes:
+        | name: Name of the set
+        | states: dict of code -> name
+    """
+
+    def __init__(self, name, states):
+        self.name = name
+        self.states = dict(states)
+        self._codes = dict((n, c) for c, n in self.states.items())
+
+    def __str__(self):
+        return '<OSIsoft PI Enumeration Set [{} - {} states]>'.format(
+            self.name, len(self.states))
+
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, code):
+        return code in self.states
+
+    @classmethod
+    def from_items(cls, name, items):
+        """
+        Creates a set from the Items of an enumerationvalues response.
+
+        :rtype: osisoftpy.enumeration.EnumerationSet
+        """
+        return cls(name, ((int(x['Value']), x['Name']) for x in items or []))
+
+    def name_of(self, code):
+        """
+        Returns the name of a code, or None.
+        """
+        return self.states.get(code)
+
+    def code_of(self, name):
+        """
+        Returns the code of a name, or None.
+        """
+        return self._codes.get(name)
+
+    def names(self, codes):
+        """
+        Resolves codes, e.g. the state column of :mod:`osisoftpy.columnar`,
+        to names. Codes not in the set, like -1 for no state, become None.
+
+        :param codes: Iterable of codes, or a numpy.ndarray.
+        :rtype: list
+        """
+        if hasattr(codes, 'tolist'):
+            codes = codes.tolist()
+        return [self.states.get(c) for c in codes]
+
+    def merge(self, observed):
+        """
+        Returns the states of the set together with the states returned with
+        values that aren't in it, like system states such as 'I/O Timeout'.
+        Where both name a code, the observed name wins.
+
+        :param dict observed: code -> name of the states returned.
+        :rtype: dict
+        """
+        states = dict(self.states)
+        states.update(observed or {})
+        return states
+
+
+class EnumerationCache(object):
+    """
+    The enumeration sets fetched from the server, by a key identifying the
+    set on its server.
+
+    Attributes:
+        | fetches: Number of sets fetched
+    """
+
+    def __init__(self):
+        self.fetches = 0
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sets)
+
+    def get(self, key, fetch):
+        """
+        Returns the set of a key, calling fetch() to read it the first time.
+
+        :param key: Hashable key of the set.
+        :param fetch: Function returning the
+            :class:`EnumerationSet <EnumerationSet>`.
+        :rtype: osisoftpy.enumeration.EnumerationSet
+        """
+        with self._lock:
+            if key in self._sets:
+                return self._sets[key]
+        enumeration = fetch()
+        with self._lock:
+            self.fetches += 1
+            return self._sets.setdefault(key, enumeration)
+
+    def clear(self):
+        with self._lock:
+            self._sets.clear()
+
+
+def changed(old, new):
+    """
+    Returns whether a value differs from the previous one. Two digital
+    values are compared by their codes and whether they are system states,
+    not by their whole dicts; a digital value and any other value always
+    differ.
+    """
+    if _is_digital(old) and _is_digital(new):
+        return (old['Value'] != new['Value'] or
+                bool(old.get('IsSystem')) != bool(new.get('IsSystem')))
+    if _is_digital(old) or _is_digital(new):
+        return True
+    return old != new
+
+
+def _is_digital(value):
+    return isinstance(value, dict) and 'Value' in value
@@ -29,6 +29,15 @@ class PIWebAPIError(OSIsoftPyException):
 class HTTPError(OSIsoftPyException):
     """An HTTP error occurred."""
 
+    def __init__(self, *args, **kwargs):
+        self.response = kwargs.pop('response', None)
+        super(HTTPError, self).__init__(*args, **kwargs)
+
+    @property
+    def status_code(self):
+        """The HTTP status of the response, if there was one."""
+        return getattr(self.response, 'status_code', None)
+
 
 class Unauthorized(HTTPError):
     """401 unauthorized"""
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.export
+~~~~~~~~~~~~
+This module contains the file writers of Points.export. Each writes the
+values in long format, one row per value:
+
+    | name: Point name
+    | webid: WebID of the point
+    | timestamp: Timestamp in UTC
+    | value: Numeric value, empty or NaN for anything else
+    | state: Code of a digital state, empty or -1 for anything else
+    | good: Whether the value is good
+    | questionable: Whether the value is questionable
+
+Parquet and Arrow IPC files require the pyarrow package. They store name and
+webid dictionary encoded, and the points' name, webid, uom and datatype as
+JSON in the schema metadata under the key 'osisoftpy.points'. CSV files have
+no room for that.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import csv
+import io
+import json
+import logging
+
+from osisoftpy.pitime import format_epoch
+
+log = logging.getLogger(__name__)
+
+FORMATS = ('parquet', 'arrow', 'csv')
+FIELDS = ('name', 'webid', 'timestamp', 'value', 'state', 'good',
+          'questionable')
+
+
+def open_writer(path, format, points, metadata=None):
+    """
+    Opens a file to write pages of values to.
+
+    :param string path: Path of the file.
+    :param string format: 'parquet', 'arrow' or 'csv'.
+    :param list points: The points whose values will be written.
+    :param dict metadata: Optional. More strings to store in the schema
+        metadata.
+    :return: A writer with the methods write(pages), where pages is a list
+        of (point, columns), and close().
+    """
+    if format == 'csv':
+        return CSVWriter(path, points)
+    if format in ('parquet', 'arrow'):
+        return ArrowWriter(path, format, points, metadata)
+    raise ValueError('format must be one of {}, not {!r}'.format(
+        ', '.join(FORMATS), format))
+
+
+def point_metadata(point):
+    """
+    Returns the metadata of a point stored in the schema.
+
+    :rtype: dict
+    """
+    return dict(name=point.name, webid=point.webid,
+                uom=getattr(point, 'uom', None) or '',
+                datatype=getattr(point, 'datatype', None) or '')
+
+
+class ArrowWriter(object):
+    """
+    Writes a Parquet file with a row group per page, or an Arrow IPC file
+    with a record batch per page.
+    """
+
+    def __init__(self, path, format, points, metadata=None):
+        import pyarrow as pa
+
+        self.rows = 0
+        self._index = dict((p.webid, i) for i, p in enumerate(points))
+        self._names = pa.array([p.name for p in points], pa.string())
+        self._webids = pa.array([p.webid for p in points], pa.string())
+        info = dict(metadata or {})
+        info['osisoftpy.points'] = json.dumps(
+            [point_metadata(p) for p in points])
+        self.schema = pa.schema([
+            ('name', pa.dictionary(pa.int32(), pa.string())),
+            ('webid', pa.dictionary(pa.int32(), pa.string())),
+            ('timestamp', pa.timestamp('us', tz='UTC')),
+            ('value', pa.float64()),
+            ('state', pa.int32()),
+            ('good', pa.bool_()),
+            ('questionable', pa.bool_()),
+        ], metadata=info)
+        self.format = format
+        if format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, pages):
+        if not pages:
+            return
+        import numpy as np
+        import pyarrow as pa
+
+        index = np.concatenate([
+            np.full(len(c['timestamp']), self._index[p.webid], 'int32')
+            for p, c in pages])
+
+        def column(name):
+            return np.concatenate([c[name] for _, c in pages])
+
+        micros = np.round(column('timestamp') * 1e6).astype('int64')
+        table = pa.Table.from_arrays([
+            pa.DictionaryArray.from_arrays(index, self._names),
+            pa.DictionaryArray.from_arrays(index, self._webids),
+            pa.array(micros, self.schema.field('timestamp').type),
+            pa.array(column('value')),
+            pa.array(column('state')),
+            pa.array(column('good')),
+            pa.array(column('questionable')),
+        ], schema=self.schema)
+        if self.format == 'parquet':
+            self._writer.write_table(table, row_group_size=len(table))
+        else:
+            self._writer.write_table(table, max_chunksize=len(table))
+        self.rows += len(table)
+
+    def close(self):
+        self._writer.close()
+
+
+class CSVWriter(object):
+    """
+    Writes a CSV file with a header row, timestamps as ISO 8601 and empty
+    fields for missing values and states.
+    """
+
+    def __init__(self, path, points):
+        self.rows = 0
+        self._file = io.open(path, 'w', newline='', encoding='utf-8')
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(FIELDS)
+
+    def write(self, pages):
+        for point, columns in pages:
+            for t, v, s, good, questionable in zip(
+                    columns['timestamp'].tolist(), columns['value'].tolist(),
+                    columns['state'].tolist(), columns['good'].tolist(),
+                    columns['questionable'].tolist()):
+                self._csv.writerow((
+                    point.name, point.webid, format_epoch(t),
+                    '' if v != v else repr(v), '' if s < 0 else s,
+                    good, questionable))
+                self.rows += 1
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,595 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.fakeserver
+~~~~~~~~~~~~
+This module contains an in-process fake of the PI Web API, for running the
+tests and benchmarks without a PI System.
+
+The fake is a requests transport adapter, so no sockets are involved:
+
+    >>> fake = FakePIWebAPI(points=1000, latency=0.005)
+    >>> webapi = fake.webapi()
+    >>> webapi.points(query='name:sinusoid')[0].current()
+
+It serves the root links, dataservers, assetservers and their databases,
+search queries with paging, the value, end, recorded, recordedattime,
+interpolated, interpolatedattimes, summary and plot endpoints of streams and
+streamsets, point attributes, enumeration sets, value updates and batch
+requests.
+
+Every point records a sine wave with a period and amplitude derived from its
+name at a fixed interval, so the data is the same on every run; digital
+points step through the states of the set 'Modes' instead. Values
+written through the fake are kept and replace the generated ones at their
+timestamp, following the updateOption of the request.
+
+GET responses carry an ETag of their body, and requests whose
+If-None-Match still matches it are answered with 304 Not Modified.
+
+Latency, server errors and throttling can be injected to see how clients
+behave when the server is slow or unwell.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import fnmatch
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    from urllib.parse import parse_qs, unquote, urlsplit
+except ImportError:
+    from urlparse import parse_qs, urlsplit
+    from urllib import unquote
+
+from osisoftpy.decimate import decimate
+from osisoftpy.interpolation import interpolate
+from osisoftpy.pitime import format_epoch, parse_epoch, parse_timespan
+from osisoftpy.pitime import resolve, UTC
+from osisoftpy.summary import intervals, summarize, summary_types
+
+MODES = ('Off', 'Starting', 'On', 'Stopping')
+SERVER_ID = '0fbf5e27-3c64-4e25-9b42-e8e0f9c1a001'
+ASSET_SERVER_ID = '0fbf5e27-3c64-4e25-9b42-e8e0f9c1a002'
+DATABASE_ID = '0fbf5e27-3c64-4e25-9b42-e8e0f9c1a003'
+
+_REASONS = {200: 'OK', 202: 'Accepted', 204: 'No Content', 207: 'Multi-Status',
+            304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+            429: 'Too Many Requests', 500: 'Internal Server Error',
+            503: 'Service Unavailable'}
+
+
+class _Error(Exception):
+    def __init__(self, status, message):
+        super(_Error, self).__init__(message)
+        self.status = status
+        self.message = message
+
+
+class FakePoint(object):
+    """
+    A point of the fake server and the values it records.
+
+    :param string name: Name of the point.
+    :param int index: Position of the point, used for its WebID.
+    :param float interval: Seconds between the generated values.
+    :param list states: Optional. Names of the states of a digital point.
+    """
+
+    def __init__(self, name, index, interval=60.0, states=None):
+        self.name = name
+        self.webid = 'FAKEP{:08d}'.format(index)
+        self.index = index
+        self.interval = interval
+        self.states = states
+        self.written = {}
+
+        seed = zlib.crc32(name.encode('utf-8')) & 0xffffffff
+        self.period = 3600.0 * (1 + seed % 24)
+        self.amplitude = 10.0 * (1 + (seed >> 8) % 10)
+        self.offset = float((seed >> 16) % 100)
+        self.phase = float(seed % 997)
+
+    def value(self, t):
+        if self.states:
+            code = int((t + self.phase) // self.interval // 7) % len(
+                self.states)
+            return {'Name': self.states[code], 'Value': code,
+                    'IsSystem': False}
+        return round(self.offset + self.amplitude * math.sin(
+            2 * math.pi * (t + self.phase) / self.period), 6)
+
+    def item(self, t):
+        if t in self.written:
+            return self.written[t]
+        return _item(t, self.value(t))
+
+    def recorded(self, start, end, maxcount=1000):
+        # the generated values and the written ones, in time order
+        first = math.ceil(start / self.interval)
+        last = math.floor(end / self.interval)
+        count = int(min(max(last - first + 1, 0), maxcount))
+        times = set(self.interval * (first + k) for k in range(count))
+        times.update(t for t in self.written if start <= t <= end)
+        times = sorted(times)[:maxcount]
+        return times, [self.item(t) for t in times]
+
+    def prior(self, t):
+        generated = math.floor(t / self.interval) * self.interval
+        written = [w for w in self.written if w <= t]
+        return max([generated] + written)
+
+    def after(self, t):
+        generated = math.ceil(t / self.interval) * self.interval
+        written = [w for w in self.written if w >= t]
+        return min([generated] + written)
+
+    def around(self, start, end):
+        # the recorded values from the one at or before start to the one at
+        # or after end
+        a, b = self.prior(start), self.after(end)
+        count = int((b - a) / self.interval) + 2 + len(self.written)
+        return self.recorded(a, b, count)
+
+    def write(self, item, updateoption='Replace'):
+        # one value per timestamp, so Insert replaces like Replace; Remove
+        # only removes a written value equal to the one given, as the tests
+        # of update options expect from a PI Data Archive
+        t = parse_epoch(item['Timestamp'])
+        option = (updateoption or 'Replace').lower()
+        exists = t in self.written or t % self.interval == 0
+        if option == 'noreplace' and exists:
+            return
+        if option == 'replaceonly' and not exists:
+            return
+        if option == 'remove':
+            if self.written.get(t, {}).get('Value') == item.get('Value'):
+                del self.written[t]
+            return
+        self.written[t] = _item(
+            t, item.get('Value'),
+            good=item.get('Good') if item.get('Good') is not None else True,
+            questionable=bool(item.get('Questionable')),
+            units=item.get('UnitsAbbreviation') or '')
+
+
+class FakePIWebAPI(BaseAdapter):
+    """
+    An in-process fake of the PI Web API.
+
+    :param int points: Optional. Number of points, or a list of point
+        names. The first points are called sinusoid, sinusoidu and cdt158,
+        like on a fresh PI Data Archive. Defaults to 100.
+    :param string url: Optional. URL the fake is served at. Defaults to
+        'https://fakepi/piwebapi/'.
+    :param float interval: Optional. Seconds between the generated values
+        of a point. Defaults to 60.
+    :param latency: Optional. Seconds every request takes, or a (min, max)
+        tuple for a random latency. Defaults to 0.
+    :param float error_rate: Optional. Fraction of requests answered with
+        500 Internal Server Error. Defaults to 0.
+    :param float max_rps: Optional. Requests per second above which the
+        fake answers 429 Too Many Requests. Defaults to no limit.
+    :param float now: Optional. The current time of the fake in seconds
+        since the epoch, which makes '*' deterministic. Defaults to the
+        clock.
+    :param int seed: Optional. Seed of the injected latency and errors.
+    :param int digital: Optional. Number of digital points added after the
+        others, called digital000000 and up. Defaults to 0.
+
+    Attributes:
+        | requests: Number of requests received, batch sub-requests included
+        | counts: Number of requests per endpoint
+    """
+
+    def __init__(
+            self,
+            points=100,
+            url='https://fakepi/piwebapi/',
+            interval=60.0,
+            latency=0,
+            error_rate=0,
+            max_rps=None,
+            now=None,
+            seed=0,
+            digital=0):
+        super(FakePIWebAPI, self).__init__()
+        if not url.endswith('/'):
+            url += '/'
+        self.url = url
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.now = now
+        self.requests = 0
+        self.counts = {}
+
+        if isinstance(points, int):
+            names = ['sinusoid', 'sinusoidu', 'cdt158']
+            names = (names + ['fake{:06d}'.format(i)
+                              for i in range(len(names), points)])[:points]
+        else:
+            names = list(points)
+        self.points = [FakePoint(n, i, interval) for i, n in enumerate(names)]
+        self.points.extend(
+            FakePoint('digital{:06d}'.format(i), len(names) + i, interval,
+                      MODES) for i in range(digital))
+        self._by_webid = dict((p.webid, p) for p in self.points)
+
+        self._path = urlsplit(url).path
+        self._random = random.Random(seed)
+        self._injected = []
+        self._window = []
+        self._lock = threading.Lock()
+
+    def session(self):
+        """
+        Returns a requests Session whose requests to the fake's url are
+        answered by the fake.
+
+        :rtype: requests.Session
+        """
+        s = requests.Session()
+        s.mount(self.url, self)
+        return s
+
+    def webapi(self, **kwargs):
+        """
+        Connects to the fake, see :func:`osisoftpy.webapi`.
+
+        :rtype: osisoftpy.WebAPI
+        """
+        from osisoftpy.api import webapi
+        return webapi(self.url, session=self.session(), **kwargs)
+
+    def inject(self, status, count=1):
+        """
+        Makes the next requests fail.
+
+        :param int status: HTTP status to answer with, e.g. 503.
+        :param int count: Optional. Number of requests. Defaults to 1.
+        """
+        with self._lock:
+            self._injected.extend([status] * count)
+
+    def point(self, name):
+        """
+        Returns the :class:`FakePoint` of a name.
+        """
+        return next(p for p in self.points if p.name == name)
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        status = self._fault()
+        if status is None:
+            body = request.body
+            if isinstance(body, bytes):
+                body = body.decode('utf-8')
+            status, content = self.handle(request.method, request.url, body)
+        else:
+            content = {'Errors': ['Injected {} response'.format(status)]}
+        etag = None
+        if request.method == 'GET' and status == 200:
+            etag = '"{:08x}"'.format(zlib.crc32(json.dumps(
+                content, sort_keys=True).encode('utf-8')) & 0xffffffff)
+            if request.headers.get('If-None-Match') == etag:
+                status, content = 304, None
+        return self._response(request, status, content, etag)
+
+    def close(self):
+        pass
+
+    def handle(self, method, url, body=None):
+        """
+        Answers a request.
+
+        :return: (status, content) tuple, where content is JSON-serializable.
+        """
+        parts = urlsplit(url)
+        path = unquote(parts.path)
+        if not path.startswith(self._path.rstrip('/')):
+            return 404, {'Errors': ['Unknown url {}'.format(url)]}
+        segments = [x for x in path[len(self._path):].split('/') if x]
+        query = dict((k.lower(), v) for k, v in
+                     parse_qs(parts.query, keep_blank_values=True).items())
+        params = _Params(query)
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            return 400, {'Errors': ['The request body is not valid JSON.']}
+
+        with self._lock:
+            self.requests += 1
+            key = '/'.join([method] + [s for s in segments
+                                       if not s.startswith('FAKE')])
+            self.counts[key] = self.counts.get(key, 0) + 1
+        try:
+            return self._route(method, segments, params, data)
+        except _Error as e:
+            return e.status, {'Errors': [e.message]}
+
+    def _route(self, method, segments, params, data):
+        if not segments:
+            return 200, self._root()
+        controller = segments[0].lower()
+        if controller == 'batch' and method == 'POST':
+            return self._batch(data)
+        if controller == 'dataservers':
+            if (len(segments) == 3 and
+                    segments[2].lower() == 'enumerationsets'):
+                return 200, {'Items': [self._enumerationset()]}
+            return 200, {'Items': [self._dataserver()]}
+        if (controller == 'enumerationsets' and len(segments) == 3 and
+                segments[1] == 'FAKEE0001'):
+            return 200, {'Items': [{'Name': name, 'Value': code}
+                                   for code, name in enumerate(MODES)]}
+        if controller == 'assetservers':
+            if len(segments) == 3 and segments[2].lower() == 'assetdatabases':
+                return 200, {'Items': [self._database()]}
+            return 200, {'Items': [self._assetserver()]}
+        if controller == 'search' and segments[1:] == ['query']:
+            return 200, self._search(params)
+        if controller == 'points' and len(segments) == 3:
+            return 200, self._attributes(self._find(segments[1]), params)
+        if controller == 'streams' and len(segments) == 3:
+            point = self._find(segments[1])
+            if method == 'POST':
+                return self._write(point, segments[2].lower(), data, params)
+            return 200, self._stream(point, segments[2].lower(), params)
+        if controller == 'streamsets' and len(segments) == 2:
+            return 200, self._streamset(segments[1].lower(), params)
+        raise _Error(404, 'Unknown resource {}'.format('/'.join(segments)))
+
+    def _root(self):
+        links = dict((name, self.url + name.lower()) for name in (
+            'AssetServers', 'DataServers', 'Search', 'StreamSets', 'Batch'))
+        links['Self'] = self.url
+        links['Search'] = self.url + 'search'
+        return {'Links': links}
+
+    def _dataserver(self):
+        return {
+            'WebId': 'FAKES0001', 'Id': SERVER_ID, 'Name': 'FAKEPI',
+            'Path': '\\\\PIServers[FAKEPI]', 'IsConnected': True,
+            'ServerVersion': '3.4.405.1198',
+            'Links': {'Self': self.url + 'dataservers/FAKES0001'}}
+
+    def _enumerationset(self):
+        return {
+            'WebId': 'FAKEE0001', 'Name': 'Modes', 'Description': '',
+            'Links': {'Values': self.url +
+                      'enumerationsets/FAKEE0001/enumerationvalues'}}
+
+    def _assetserver(self):
+        return {
+            'WebId': 'FAKEA0001', 'Id': ASSET_SERVER_ID, 'Name': 'FAKEAF',
+            'Description': '', 'Path': '\\\\FAKEAF', 'IsConnected': True,
+            'ServerVersion': '2.9.1.8106', 'ExtendedProperties': {},
+            'Links': {'Self': self.url + 'assetservers/FAKEA0001'}}
+
+    def _database(self):
+        return {
+            'WebId': 'FAKED0001', 'Id': DATABASE_ID, 'Name': 'Fake',
+            'Description': '', 'Path': '\\\\FAKEAF\\Fake',
+            'ExtendedProperties': {},
+            'Links': {'Self': self.url + 'assetdatabases/FAKED0001'}}
+
+    def _search(self, params):
+        terms = [t for t in re.split(r'\s+OR\s+|\s+', params.get('q', '*'))
+                 if t]
+        patterns = [t.split(':', 1)[1] if ':' in t else t for t in terms]
+        found = [p for p in self.points if any(
+            fnmatch.fnmatch(p.name.lower(), x.lower()) for x in patterns)]
+        start = int(params.get('start', 0))
+        count = int(params.get('count', 10))
+        return {
+            'TotalHits': len(found),
+            'Items': [self._searchitem(p) for p in found[start:start + count]],
+            'Links': {}, 'Errors': []}
+
+    def _searchitem(self, point):
+        return {
+            'Name': point.name, 'Description': '',
+            'UniqueID': 'pi:\\\\FAKEPI?{' + SERVER_ID + '}?' + str(point.index),
+            'WebId': point.webid,
+            'DataType': 'EnumerationValue' if point.states else 'Float32',
+            'ItemType': 'pipoint', 'UoM': '', 'Plottable': True,
+            'Links': {'Self': self.url + 'points/' + point.webid}}
+
+    def _attributes(self, point, params):
+        digital = bool(point.states)
+        attributes = [('tag', point.name),
+                      ('pointtype', 'Digital' if digital else 'Float32'),
+                      ('digitalset', 'Modes' if digital else ''),
+                      ('step', int(digital)),
+                      ('span', 2 * point.amplitude),
+                      ('zero', point.offset - point.amplitude)]
+        namefilter = params.get('namefilter') or '*'
+        return {'Items': [{'Name': n, 'Value': v} for n, v in attributes
+                          if fnmatch.fnmatch(n, namefilter.lower())]}
+
+    def _find(self, webid):
+        point = self._by_webid.get(webid)
+        if point is None:
+            raise _Error(404, 'Unknown WebID {}'.format(webid))
+        return point
+
+    def _stream(self, point, action, params):
+        now = self._now()
+        if action == 'value':
+            t = self._time(params.get('time'), now) if params.get('time') else now
+            return point.item(point.prior(t))
+        if action == 'end':
+            # the last value in the archive, written ones after now included
+            return point.item(max([point.prior(now)] + list(point.written)))
+        if action == 'recordedattime':
+            return point.item(point.prior(self._time(params.get('time'), now)))
+        if action == 'recorded':
+            start, end = self._range(params, now, '*-1d')
+            maxcount = int(params.get('maxcount', 1000))
+            return {'Items': point.recorded(start, end, maxcount)[1]}
+        if action == 'interpolated':
+            start, end = self._range(params, now, '*-1d')
+            step = parse_timespan(params.get('interval', '1h'))
+            if not step:
+                raise _Error(400, 'Invalid interval')
+            count = int(math.floor((end - start) / step + 1e-9)) + 1
+            at = [start + k * step for k in range(count)]
+            return {'Items': self._interpolate(point, at)}
+        if action == 'interpolatedattimes':
+            at = sorted(self._time(t, now) for t in params.getall('time'))
+            if (params.get('sortorder') or '').lower() == 'descending':
+                at.reverse()
+            return {'Items': self._interpolate(point, at)}
+        if action == 'plot':
+            start, end = self._range(params, now, '*-1d')
+            times, items = point.recorded(start, end, 10 ** 7)
+            pixels = int(params.get('intervals', 24))
+            return {'Items': decimate(times, items, pixels, 'minmax')}
+        if action == 'summary':
+            return {'Items': self._summary(point, params, now)}
+        raise _Error(404, 'Unknown stream action {}'.format(action))
+
+    def _interpolate(self, point, at):
+        if not at:
+            return []
+        times, items = point.around(min(at), max(at))
+        return interpolate(times, items, at)
+
+    def _summary(self, point, params, now):
+        start, end = self._range(params, now, '*-1d')
+        types = summary_types(params.getall('summarytype') or None)
+        if not types:
+            raise _Error(400, 'Unsupported summary type')
+        duration = parse_timespan(params.get('summaryduration') or '')
+        times, items = point.around(start, end)
+        return summarize(times, items, intervals(start, end, duration), types,
+                         params.get('calculationbasis'))
+
+    def _write(self, point, action, data, params):
+        option = params.get('updateoption')
+        if action == 'value':
+            data = [data]
+        elif action != 'recorded':
+            raise _Error(404, 'Unknown stream action {}'.format(action))
+        # timestamps may be time expressions such as '*' as well
+        now = self._now()
+        for item in data:
+            t = self._time(item.get('Timestamp') or '*', now)
+            point.write(dict(item, Timestamp=format_epoch(t)), option)
+        return 202, None
+
+    def _streamset(self, action, params):
+        items = []
+        for webid in params.getall('webid'):
+            point = self._find(webid)
+            content = self._stream(point, action, params)
+            item = {'WebId': point.webid, 'Name': point.name}
+            if 'Items' in content:
+                item['Items'] = content['Items']
+            else:
+                item['Value'] = content
+            items.append(item)
+        return {'Items': items}
+
+    def _batch(self, data):
+        result = {}
+        for key, sub in (data or {}).items():
+            status, content = self.handle(
+                sub.get('Method', 'GET'), sub['Resource'], sub.get('Content'))
+            result[key] = {'Status': status, 'Headers': {}, 'Content': content}
+        return 207, result
+
+    def _range(self, params, now, default):
+        start = self._time(params.get('starttime') or default, now)
+        end = self._time(params.get('endtime') or '*', now, start)
+        if end < start:
+            raise _Error(400, 'Descending time ranges are not supported by '
+                              'the fake server')
+        return start, end
+
+    def _time(self, expression, now, relative_to=None):
+        seconds = resolve(expression, now, relative_to, UTC)
+        if seconds is None:
+            raise _Error(400, 'Cannot parse time {}'.format(expression))
+        return seconds
+
+    def _now(self):
+        return self.now if self.now is not None else time.time()
+
+    def _fault(self):
+        with self._lock:
+            if self._injected:
+                return self._injected.pop(0)
+            if self.max_rps:
+                now = time.time()
+                self._window = [t for t in self._window if t > now - 1]
+                if len(self._window) >= self.max_rps:
+                    return 429
+                self._window.append(now)
+            latency = self.latency
+            if isinstance(latency, (tuple, list)):
+                latency = self._random.uniform(*latency)
+            failed = self.error_rate and self._random.random() < self.error_rate
+        if latency:
+            time.sleep(latency)
+        return 500 if failed else None
+
+    def _response(self, request, status, content, etag=None):
+        r = requests.Response()
+        r.status_code = status
+        r.reason = _REASONS.get(status, '')
+        r.url = request.url
+        r.request = request
+        r.encoding = 'utf-8'
+        r.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+        if status == 429:
+            r.headers['Retry-After'] = '1'
+        if etag:
+            r.headers['ETag'] = etag
+        r._content = b'' if content is None else json.dumps(
+            content).encode('utf-8')
+        return r
+
+
+class _Params(object):
+    # query parameters with case-insensitive names
+
+    def __init__(self, query):
+        self._query = query
+
+    def get(self, name, default=None):
+        values = self._query.get(name)
+        return values[0] if values else default
+
+    def getall(self, name):
+        return self._query.get(name, [])
+
+
+def _item(t, value, good=True, questionable=False, units=''):
+    return {'Timestamp': format_epoch(t), 'Value': value,
+            'UnitsAbbreviation': units, 'Good': good,
+            'Questionable': questionable, 'Substituted': False}
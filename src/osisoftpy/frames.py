@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.frames
+~~~~~~~~~~~~
+This module builds pandas objects from the columns of
+:mod:`osisoftpy.columnar`, for Stream.to_series and Points.to_frame.
+
+The timestamps become a time zone aware DatetimeIndex. Streams whose values
+are all digital states become categorical, with the state names as
+categories; in other streams digital states, e.g. 'Shutdown', are NaN.
+
+pandas is required.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+LAYOUTS = ('wide', 'long')
+
+
+def series(columns, states=None, name=None, tz='UTC'):
+    """
+    Returns the values of one stream as a pandas Series indexed by
+    timestamp.
+
+    :param dict columns: The columns of the stream.
+    :param dict states: Optional. Names of the digital states, as code ->
+        name.
+    :param string name: Optional. Name of the Series.
+    :param tz: Optional. Time zone of the index, name or tzinfo. Defaults to
+        'UTC'.
+    :rtype: pandas.Series
+    """
+    import pandas as pd
+
+    if _is_digital(columns, states):
+        data = _categorical(columns['state'], states, _names([states]))
+    else:
+        data = columns['value']
+    return pd.Series(data, index=_timestamps(columns['timestamp'], tz),
+                     name=name)
+
+
+def wide(streams, tz='UTC'):
+    """
+    Returns the values of several streams as a DataFrame with a column per
+    stream, aligned on the union of their timestamps. A stream with several
+    values at one timestamp keeps the last.
+
+    :param list streams: (name, columns, states) tuples.
+    :rtype: pandas.DataFrame
+    """
+    import pandas as pd
+
+    parts = []
+    for name, columns, states in streams:
+        s = series(columns, states, name, tz)
+        parts.append(s[~s.index.duplicated(keep='last')])
+    if not parts:
+        return pd.DataFrame(index=_timestamps([], tz))
+    frame = pd.concat(parts, axis=1, sort=True)
+    frame.index.name = 'timestamp'
+    return frame
+
+
+def long(streams, tz='UTC'):
+    """
+    Returns the values of several streams as a DataFrame with a row per
+    value and the columns point, timestamp, value, state, good and
+    questionable. point and state are categorical.
+
+    :param list streams: (name, columns, states) tuples.
+    :rtype: pandas.DataFrame
+    """
+    import numpy as np
+    import pandas as pd
+
+    fields = ['point', 'timestamp', 'value', 'state', 'good', 'questionable']
+    if not streams:
+        return pd.DataFrame(columns=fields)
+    categories = _names([states for _, _, states in streams])
+
+    def column(key):
+        return np.concatenate([columns[key] for _, columns, _ in streams])
+
+    point = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(streams), dtype='int32'),
+                  [len(columns['timestamp']) for _, columns, _ in streams]),
+        categories=[name for name, _, _ in streams])
+    state = pd.Categorical.from_codes(
+        np.concatenate([_codes(columns['state'], states, categories)
+                        for _, columns, states in streams]),
+        categories=categories)
+    return pd.DataFrame(dict(
+        point=point, timestamp=_timestamps(column('timestamp'), tz),
+        value=column('value'), state=state, good=column('good'),
+        questionable=column('questionable')), columns=fields)
+
+
+def _timestamps(timestamps, tz):
+    import numpy as np
+    import pandas as pd
+
+    micros = np.round(np.asarray(timestamps, 'float64') * 1e6).astype('int64')
+    return pd.DatetimeIndex(pd.to_datetime(micros, unit='us', utc=True),
+                            name='timestamp').tz_convert(tz)
+
+
+def _is_digital(columns, states):
+    import numpy as np
+
+    return bool(states) and bool((columns['state'] >= 0).any()) and bool(
+        np.isnan(columns['value']).all())
+
+
+def _names(states):
+    # the state names of several streams, ordered by code and name
+    names = {}
+    for mapping in states:
+        for code, name in (mapping or {}).items():
+            names.setdefault(name, code)
+    return sorted(names, key=lambda n: (names[n], n))
+
+
+def _codes(state, states, categories):
+    # positions of the states' names in categories, -1 for no state
+    import numpy as np
+
+    codes = np.full(len(state), -1, dtype='int32')
+    if not states:
+        return codes
+    position = dict((name, i) for i, name in enumerate(categories))
+    known = np.array(sorted(states), dtype='int64')
+    mapped = np.array([position[states[c]] for c in known], dtype='int32')
+    found = np.minimum(np.searchsorted(known, state), len(known) - 1)
+    hit = known[found] == state
+    codes[hit] = mapped[found[hit]]
+    return codes
+
+
+def _categorical(state, states, categories):
+    import pandas as pd
+
+    return pd.Categorical.from_codes(_codes(state, states, categories),
+                                     categories=categories)
@@ -21,27 +21,125 @@ OSIsoftPy.
 """
 from __future__ import (absolute_import, division, unicode_literals)
 from future.builtins import *
+import json as jsonlib
 import logging
+import os
+import re
 import requests
 import time
-from osisoftpy.structures import APIResponse
+from timeit import default_timer
+from osisoftpy import tracing
+from osisoftpy.cache import request_key
+from osisoftpy.structures import APIResponse, BatchResult, RequestEvent
 from osisoftpy.exceptions import (PIWebAPIError, Unauthorized, HTTPError)
 
 log = logging.getLogger(__name__)
 
+# Statuses worth sending the same request again for.
+RETRY_STATUS = frozenset([408, 429, 500, 502, 503, 504])
 
-def get(url, session, params=None, **kwargs):
+# Controllers whose next path segment is a WebID.
+_CONTROLLERS = frozenset([
+    'analyses', 'assetdatabases', 'assetservers', 'attributes',
+    'attributetemplates', 'dataservers', 'elements', 'elementtemplates',
+    'enumerationsets', 'enumerationvalues', 'eventframes', 'points',
+    'streams', 'streamsets', 'tables'])
+_LOWERCASE = re.compile(r'^[a-z]+$')
+
+
+def url_template(url, base=None):
+    """Returns the endpoint of a url with its WebIDs replaced by {webid},
+    like 'streams/{webid}/recorded', so requests can be grouped by endpoint.
+
+    :param url: URL of the request.
+    :param base: Optional. URL of the PI Web API, which is left out.
+    :return: str
+    """
+    path = url.split('?', 1)[0]
+    if base and path.startswith(base):
+        path = path[len(base):]
+    segments = [x for x in path.split('/') if x]
+    for i in range(1, len(segments)):
+        if (segments[i - 1].lower() in _CONTROLLERS and
+                not _LOWERCASE.match(segments[i])):
+            segments[i] = '{webid}'
+    return '/'.join(segments)
+
+
+def instrumented(webapi, method, url, send, retry=0, subrequests=None):
+    """Sends a request by calling send() and reports it to the request
+    hooks of the webapi, see :meth:`osisoftpy.WebAPI.on_request_start` and
+    :meth:`osisoftpy.WebAPI.on_request_end`, and as an HTTP span to the
+    tracer, see :mod:`osisoftpy.tracing`. Without hooks and tracing send()
+    is simply called.
+
+    :param webapi: The :class:`osisoftpy.WebAPI` the request is made for,
+        or None.
+    :param method: HTTP method of the request.
+    :param url: URL of the request, without the query string.
+    :param send: Function without arguments that sends the request and
+        returns the requests.Response.
+    :param retry: Optional. Number of times the request was sent before.
+    :param subrequests: Optional. Number of sub-requests of a batch request.
+    :return: requests.Response
+    """
+    start = getattr(webapi, 'request_start_hooks', None)
+    end = getattr(webapi, 'request_end_hooks', None)
+    if not start and not end and not tracing.enabled():
+        return send()
+
+    event = RequestEvent(
+        method=method, url=url,
+        template=url_template(url, getattr(webapi, 'url', None)),
+        status=None, bytes=None, seconds=None, response_seconds=None,
+        retry=retry, subrequests=subrequests, error=None)
+    with tracing.span('HTTP {}'.format(method), endpoint=event.template,
+                      retry=retry, subrequests=subrequests) as span:
+        _call_hooks(start, event)
+        began = default_timer()
+        try:
+            r = send()
+        except Exception as e:
+            _call_hooks(end, event._replace(
+                seconds=default_timer() - began, error=e))
+            raise
+        size = len(r.content)
+        span.set_attribute('status', r.status_code)
+        span.set_attribute('bytes', size)
+        _call_hooks(end, event._replace(
+            status=r.status_code, bytes=size, seconds=default_timer() - began,
+            response_seconds=r.elapsed.total_seconds()))
+        return r
+
+
+def _call_hooks(hooks, event):
+    # a failing hook is logged, the request itself carries on
+    for hook in list(hooks or []):
+        try:
+            hook(event)
+        except Exception:
+            log.exception('Request hook %r failed', hook)
+
+
+def get(url, session, params=None, webapi=None, **kwargs):
     """Constructs a HTTP request to the provided url.
 
     Returns an APIResponse namedtuple with two named fields: response and
     session. Both objects are standard Requests objects: Requests.Response,
     and Requests.Session
 
+    If the webapi has conditional requests enabled, the ETag and 
+    Last-Modified of earlier responses are sent along, and on 304 Not 
+    Modified the earlier response is returned. If it has a response cache, 
+    responses that haven't expired are returned without a request.
+
     :param url: URL to send the HTTP request to.
     :param session: A Requests Session object.
     :param error_action: 'Stop' to halt program execution upon error.
     :param params: Paramaters to be passed to the GET request.
         InsecureRequestWarning will be disabled.
+    :param webapi: Optional. The :class:`osisoftpy.WebAPI` the request is
+        made for.
 
     :return: :class:`APIResponse <APIResponse>` object
     :rtype: osisoftpy.APIResponse
@@ -49,22 +147,38 @@ def get(url, session, params=None, **kwargs):
     s = session
     isCrawling = True
     error_action = kwargs.pop('error_action', 'stop')
+    cache = getattr(webapi, 'conditional_cache', None)
+    key = request_key(url, params) if cache is not None else None
+    responses = getattr(webapi, 'response_cache', None)
+
+    attempt = [0]
+
+    def send():
+        if cache is not None:
+            r = instrumented(webapi, 'GET', url, lambda: s.get(
+                url, params=params, headers=cache.headers(key)), attempt[0])
+            return cache.response(key, r)
+        return instrumented(webapi, 'GET', url, lambda: s.get(
+            url, params=params), attempt[0])
 
     with s:
         try:
             while isCrawling:
                 isCrawling = False
-                r = APIResponse(s.get(url, params=params), s)
+                if responses is not None:
+                    r = APIResponse(responses.get(url, params, send), s)
+                else:
+                    r = APIResponse(send(), s)
                 if r.response.status_code == 401:
                     msg = 'Authorization denied - incorrect username or password.'
                     if error_action.lower() == 'stop':
-                        raise Unauthorized(msg)
+                        raise Unauthorized(msg, response=r.response)
                     else:
                         print(msg + ', Continuing')
                 if r.response.status_code != 200:
                     msg = 'Wrong server response: %s %s' % (r.response.status_code, r.response.reason)
                     if error_action.lower() == 'stop':
-                        raise HTTPError(msg)
+                        raise HTTPError(msg, response=r.response)
                     else:
                         print(msg + ', Continuing')
                 try:
@@ -76,6 +190,7 @@ def get(url, session, params=None, **kwargs):
                             if(error['ErrorCode'] == 20):
                                 print('Database is being crawled. Retrying in 5 sec.')
                                 isCrawling = True
+                                attempt[0] += 1
                                 time.sleep(5)
                                 # should we terminate if database is stuck in crawling state?
                             else:
@@ -98,7 +213,8 @@ def get(url, session, params=None, **kwargs):
         except:
             raise
 
-def post(url, session, error_action='Stop', params=None, json=None, **kwargs):
+def post(url, session, error_action='Stop', params=None, json=None,
+         data=None, webapi=None, retry=0, **kwargs):
     """Constructs a HTTP request to the provided url.
 
     Returns an APIResponse namedtuple with two named fields: response and
@@ -110,6 +226,11 @@ def post(url, session, error_action='Stop', params=None, json=None, **kwargs):
     :param error_action: 'Stop' to halt program execution upon error.
     :param params: Paramaters to be passed to the GET request.
         InsecureRequestWarning will be disabled.
+    :param json: Body of the request, serialized to JSON.
+    :param data: Optional already serialized JSON body, sent instead of json.
+    :param webapi: Optional. The :class:`osisoftpy.WebAPI` the request is
+        made for.
+    :param retry: Optional. Number of times the request was sent before.
 
     :return: :class:`APIResponse <APIResponse>` object
     :rtype: osisoftpy.APIResponse
@@ -119,41 +240,49 @@ def post(url, session, error_action='Stop', params=None, json=None, **kwargs):
 
     with s:
         try:
-            r = APIResponse(s.post(url, json=json, params=params), s)
+            if data is not None:
+                send = lambda: s.post(
+                    url, data=data, params=params,
+                    headers={'Content-Type': 'application/json'})
+            else:
+                send = lambda: s.post(url, json=json, params=params)
+            r = APIResponse(instrumented(webapi, 'POST', url, send, retry), s)
             if r.response.status_code == 401:
                 msg = 'Authorization denied - incorrect username or password.'
                 if error_action.lower() == 'stop':
-                    raise Unauthorized(msg)
+                    raise Unauthorized(msg, response=r.response)
                 else:
                     print(msg + ', Continuing')
             if r.response.status_code != 202:
                 msg = 'Wrong server response: %s %s' % (r.response.status_code, r.response.reason)
                 if error_action.lower() == 'stop':
-                    raise HTTPError(msg)
+                    raise HTTPError(msg, response=r.response)
                 else:
                     print(msg + ', Continuing')
             return r
         except:
             raise
 
-def put(url, session, error_action='Stop', params=None, **kwargs):
+def put(url, session, error_action='Stop', params=None, webapi=None,
+        **kwargs):
 
     s = session
     error_action = kwargs.pop('error_action', 'stop')
 
     with s:
         try:
-            r = APIResponse(s.put(url, params=params), s)
+            r = APIResponse(instrumented(webapi, 'PUT', url, lambda: s.put(
+                url, params=params)), s)
             if r.response.status_code == 401:
                 msg = 'Authorization denied - incorrect username or password.'
                 if error_action.lower() == 'stop':
-                    raise Unauthorized(msg)
+                    raise Unauthorized(msg, response=r.response)
                 else:
                     print(msg + ', Continuing')
             if r.response.status_code != 200:
                 msg = 'Wrong server response: %s %s' % (r.response.status_code, r.response.reason)
                 if error_action.lower() == 'stop':
-                    raise HTTPError(msg)
+                    raise HTTPError(msg, response=r.response)
                 else:
                     print(msg + ', Continuing')
             try:
@@ -174,7 +303,8 @@ def put(url, session, error_action='Stop', params=None, **kwargs):
 def get_batch(method, webapi, points, action, params=None):
     s = webapi.session
 
-    with s:
+    with s, tracing.span('get_batch', action=action,
+                         subrequests=len(points)):
         payload = {}
 
         for p in points:
@@ -182,8 +312,11 @@ def get_batch(method, webapi, points, action, params=None):
             r = s.prepare_request(requests.Request(method, url, params=params))
             payload[p.name] = dict(Method=r.method, Resource=r.url)
 
-        r = APIResponse(s.post('{}batch/'.format(webapi.url), json=payload), s)
-        json = r.response.json()
+        url = '{}batch/'.format(webapi.url)
+        r = APIResponse(instrumented(webapi, 'POST', url, lambda: s.post(
+            url, json=payload), subrequests=len(payload)), s)
+        with tracing.span('decode', bytes=len(r.response.content)):
+            json = r.response.json()
         if 'Errors' in json and json.get('Errors').__len__() > 0:
             msg = 'PI Web API returned an error: {}'
             raise PIWebAPIError(msg.format(json.get('Errors')))
@@ -191,6 +324,97 @@ def get_batch(method, webapi, points, action, params=None):
             return r
 
 
+def batch(webapi, subrequests, retry=0):
+    """Sends several sub-requests to the PI Web API in a single POST to the
+    batch controller.
+
+    Each sub-request is described by a dict with the keys method, url and
+    optionally params and json. The body given in json is serialized into the
+    sub-request Content, as the batch controller expects a string there.
+
+    Unlike :func:`get_batch`, the status of every sub-request is reported
+    instead of raising on the first error, so callers can decide what to do
+    with the ones that failed.
+
+    :param webapi: The :class:`osisoftpy.WebAPI` to send the batch to.
+    :param subrequests: dict of key -> sub-request description.
+    :param retry: Optional. Number of times these sub-requests were sent
+        before, reported to the request hooks.
+    :return: dict of key -> :class:`BatchResult <BatchResult>`
+    :rtype: dict
+    """
+    with webapi.session, tracing.span('batch', subrequests=len(subrequests),
+                                      retry=retry):
+        response = _post_batch(webapi, subrequests, retry)
+        with tracing.span('decode', bytes=len(response.content)):
+            json = response.json()
+        results = {}
+        for key, item in json.items():
+            content = item.get('Content')
+            errors = []
+            if isinstance(content, dict):
+                errors = content.get('Errors') or []
+            elif content and (item.get('Status') or 0) >= 300:
+                errors = [content]
+            results[key] = BatchResult(item.get('Status'), content, errors)
+        return results
+
+
+def batch_content(webapi, subrequests, retry=0):
+    """Like :func:`batch`, but returns the raw response body undecoded, e.g.
+    to decode it in another process with :mod:`osisoftpy.parallel`.
+
+    :return: The response body.
+    :rtype: bytes
+    """
+    with webapi.session, tracing.span('batch', subrequests=len(subrequests),
+                                      retry=retry) as span:
+        content = _post_batch(webapi, subrequests, retry).content
+        span.set_attribute('bytes', len(content))
+        return content
+
+
+def _post_batch(webapi, subrequests, retry):
+    s = webapi.session
+    payload = {}
+
+    for key, sub in subrequests.items():
+        r = s.prepare_request(requests.Request(
+            sub.get('method', 'GET'), sub['url'],
+            params=sub.get('params')))
+        payload[key] = dict(Method=r.method, Resource=r.url)
+        if sub.get('json') is not None:
+            payload[key]['Content'] = jsonlib.dumps(sub['json'])
+
+    url = '{}batch/'.format(webapi.url)
+    r = instrumented(webapi, 'POST', url, lambda: s.post(url, json=payload),
+                     retry, len(payload))
+    if r.status_code == 401:
+        raise Unauthorized(
+            'Authorization denied - incorrect username or password.',
+            response=r)
+    if r.status_code not in (200, 207):
+        msg = 'Wrong server response: %s %s' % (r.status_code, r.reason)
+        raise HTTPError(msg, response=r)
+    return r
+
+
+def replace_file(src, dst):
+    """
+    Renames src to dst, replacing dst if it exists. Where os.replace is
+    available this is atomic, so readers see either the old or the new file.
+
+    :param string src: Path of the file, usually a temporary one.
+    :param string dst: Path to move it to.
+    """
+    try:
+        os.replace(src, dst)
+    except AttributeError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
 def _stringify(**kwargs):
     """
     Return a concatenated string of the keys and values of the kwargs
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.interpolation
+~~~~~~~~~~~~
+This module interpolates recorded values on the client the way the PI Data
+Archive does, so Stream.interpolated and Stream.interpolatedattimes can be
+answered from the RecordedCache.
+
+The value at a time is the recorded value at that time if there is one.
+Otherwise, numeric values of continuous streams are interpolated linearly
+between the recorded values before and after it. Step streams, digital
+states, strings and anything next to a bad value take the value recorded
+before it; a bad value is returned as it was recorded, with good False.
+Integer values are interpolated and rounded.
+
+NumPy is required.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import numbers
+
+from osisoftpy.pitime import format_epoch
+
+
+def targets(start, end, interval):
+    """
+    Returns the times of an interpolated request: start, start + interval,
+    and so on up to and including end.
+
+    :param float start: Start time, in seconds since the epoch.
+    :param float end: End time, in seconds since the epoch. Must not be
+        earlier than start.
+    :param float interval: Seconds between the times.
+    :return: numpy.ndarray of seconds since the epoch
+    """
+    import numpy as np
+
+    count = int(np.floor((end - start) / interval + 1e-9)) + 1
+    return start + np.arange(count) * interval
+
+
+def interpolate(times, items, at, step=False):
+    """
+    Interpolates recorded values.
+
+    :param list times: Sorted times of the recorded items, in seconds since
+        the epoch.
+    :param list items: The recorded items as returned by the PI Web API.
+    :param at: Times to interpolate at, in seconds since the epoch. Each
+        must lie at or after the first recorded item.
+    :param bool step: Optional. True for step streams. Defaults to False.
+    :return: list of items in the format of the PI Web API, one per time.
+    :rtype: list
+    """
+    import numpy as np
+
+    t = np.asarray(times, dtype='float64')
+    x = np.asarray(at, dtype='float64')
+    if len(t) == 0 or (len(x) and x.min() < t[0]):
+        raise ValueError('Can only interpolate after the first recorded value')
+
+    raw = [item.get('Value') for item in items]
+    good = np.array([bool(item.get('Good', True)) for item in items])
+    numeric = np.array([_is_number(v) for v in raw], dtype=bool) & good
+    v = np.array([float(r) if n else np.nan for r, n in zip(raw, numeric)])
+
+    prior = np.searchsorted(t, x, side='right') - 1
+    after = np.minimum(prior + 1, len(t) - 1)
+    t0, t1 = t[prior], t[after]
+    linear = (not step) & numeric[prior] & numeric[after] & (t0 < x) & (x < t1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        interpolated = v[prior] + (v[after] - v[prior]) * (x - t0) / (t1 - t0)
+
+    result = []
+    for k in range(len(x)):
+        i, j = prior[k], after[k]
+        item = items[i]
+        value = raw[i]
+        questionable = bool(item.get('Questionable', False))
+        if linear[k]:
+            value = float(interpolated[k])
+            if _is_integer(raw[i]) and _is_integer(raw[j]):
+                value = int(round(value))
+            questionable = questionable or bool(
+                items[j].get('Questionable', False))
+        result.append({
+            'Timestamp': format_epoch(x[k]),
+            'Value': value,
+            'UnitsAbbreviation': item.get('UnitsAbbreviation', ''),
+            'Good': bool(linear[k] or good[i]),
+            'Questionable': questionable,
+            'Substituted': False,
+        })
+    return result
+
+
+def interpolate_cached(cache, webid, at, step=False):
+    """
+    Interpolates the recorded values held by a RecordedCache, if it holds
+    everything needed: one cached interval that contains every time, with a
+    recorded value at or before the first of them and, for continuous
+    streams, one at or after the last of them.
+
+    :param cache: The :class:`osisoftpy.cache.RecordedCache`.
+    :param string webid: WebID of the stream.
+    :param at: Times to interpolate at, in seconds since the epoch.
+    :param bool step: Optional. True for step streams. Defaults to False.
+    :return: list of items in the format of the PI Web API, or None if the
+        cache doesn't hold the recorded values needed.
+    :rtype: list
+    """
+    if len(at) == 0:
+        return []
+    first, last = min(at), max(at)
+    interval = cache.interval(webid, first, last)
+    if interval is None:
+        return None
+    a, b, times, items = interval
+    if not times or times[0] > first:
+        return None
+    if not step and times[-1] < last:
+        return None
+    return interpolate(times, items, at, step)
+
+
+def _is_number(value):
+    return (isinstance(value, numbers.Number) and
+            not isinstance(value, bool))
+
+
+def _is_integer(value):
+    return (isinstance(value, numbers.Integral) and
+            not isinstance(value, bool))
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.metrics
+~~~~~~~~~~~~
+This module contains adapters for the request hooks of the WebAPI, see
+:meth:`osisoftpy.WebAPI.on_request_start` and
+:meth:`osisoftpy.WebAPI.on_request_end`.
+
+PrometheusMetrics counts the requests per endpoint and keeps histograms of
+their duration, response size and batch size, in the text format Prometheus
+scrapes:
+
+    >>> metrics = webapi.enable_metrics()
+    >>> webapi.points(query='name:sinusoid').current()
+    >>> print(metrics.exposition())
+
+Endpoints are the request paths with their WebIDs replaced by {webid}, e.g.
+'streams/{webid}/recorded'.
+
+RequestLog logs every request to the osisoftpy.metrics logger.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import bisect
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                    10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+                16777216)
+BATCH_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Histogram(object):
+    """
+    Cumulative histogram of observed values.
+
+    :param tuple buckets: Sorted upper bounds of the buckets; a +Inf bucket
+        is added.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        Returns (upper bound, count of values up to it) tuples, ending with
+        '+Inf'.
+        """
+        total, result = 0, []
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class PrometheusMetrics(object):
+    """
+    Counters and histograms of the requests of one or more WebAPIs.
+
+    :param string prefix: Optional. Prefix of the metric names. Defaults to
+        'osisoftpy'.
+    :param tuple buckets: Optional. Upper bounds in seconds of the request
+        duration histogram.
+
+    Metrics:
+        | <prefix>_requests_total: counter by method, endpoint and status,
+        |     where status is 'error' for requests that raised
+        | <prefix>_retries_total: counter of requests sent again
+        | <prefix>_response_bytes_total: counter of response body bytes
+        | <prefix>_requests_in_progress: gauge of requests being sent
+        | <prefix>_request_duration_seconds: histogram by method and endpoint
+        | <prefix>_response_size_bytes: histogram by method and endpoint
+        | <prefix>_batch_subrequests: histogram of sub-requests per batch
+    """
+
+    def __init__(self, prefix='osisoftpy', buckets=DURATION_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.requests = {}
+        self.retries = {}
+        self.bytes = {}
+        self.in_progress = {}
+        self.durations = {}
+        self.sizes = {}
+        self.subrequests = {}
+        self._lock = threading.Lock()
+
+    def install(self, webapi):
+        """
+        Registers the metrics as request hooks of a WebAPI.
+        """
+        webapi.on_request_start(self.request_start)
+        webapi.on_request_end(self.request_end)
+        return self
+
+    def uninstall(self, webapi):
+        """
+        Removes the metrics from the request hooks of a WebAPI.
+        """
+        webapi.remove_request_hook(self.request_start)
+        webapi.remove_request_hook(self.request_end)
+
+    def request_start(self, event):
+        key = (event.method, event.template)
+        with self._lock:
+            self.in_progress[key] = self.in_progress.get(key, 0) + 1
+
+    def request_end(self, event):
+        key = (event.method, event.template)
+        status = 'error' if event.error is not None else str(event.status)
+        with self._lock:
+            self.in_progress[key] = self.in_progress.get(key, 1) - 1
+            counter = key + (status,)
+            self.requests[counter] = self.requests.get(counter, 0) + 1
+            if event.retry:
+                self.retries[key] = self.retries.get(key, 0) + 1
+            self._histogram(self.durations, key, self.buckets).observe(
+                event.seconds)
+            if event.bytes is not None:
+                self.bytes[key] = self.bytes.get(key, 0) + event.bytes
+                self._histogram(self.sizes, key, SIZE_BUCKETS).observe(
+                    event.bytes)
+            if event.subrequests is not None:
+                self._histogram(self.subrequests, key, BATCH_BUCKETS).observe(
+                    event.subrequests)
+
+    def clear(self):
+        """
+        Resets every metric.
+        """
+        with self._lock:
+            for metric in (self.requests, self.retries, self.bytes,
+                           self.in_progress, self.durations, self.sizes,
+                           self.subrequests):
+                metric.clear()
+
+    def exposition(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+
+        :rtype: str
+        """
+        lines = []
+        labels = ('method', 'endpoint')
+        with self._lock:
+            self._counter(lines, 'requests_total', 'counter',
+                          'HTTP requests sent to the PI Web API.',
+                          labels + ('status',), self.requests)
+            self._counter(lines, 'retries_total', 'counter',
+                          'HTTP requests sent again after a failure.',
+                          labels, self.retries)
+            self._counter(lines, 'response_bytes_total', 'counter',
+                          'Bytes of the response bodies.', labels, self.bytes)
+            self._counter(lines, 'requests_in_progress', 'gauge',
+                          'HTTP requests waiting for their response.',
+                          labels, self.in_progress)
+            self._histograms(lines, 'request_duration_seconds',
+                             'Seconds until the response was received.',
+                             labels, self.durations)
+            self._histograms(lines, 'response_size_bytes',
+                             'Size of the response bodies.', labels,
+                             self.sizes)
+            self._histograms(lines, 'batch_subrequests',
+                             'Sub-requests per batch request.', labels,
+                             self.subrequests)
+        return '\n'.join(lines) + '\n'
+
+    def _histogram(self, histograms, key, buckets):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+        return histogram
+
+    def _counter(self, lines, name, kind, help, labels, values):
+        name = '{}_{}'.format(self.prefix, name)
+        lines.append('# HELP {} {}'.format(name, help))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for key in sorted(values):
+            lines.append('{}{} {}'.format(
+                name, _labels(zip(labels, key)), values[key]))
+
+    def _histograms(self, lines, name, help, labels, histograms):
+        name = '{}_{}'.format(self.prefix, name)
+        lines.append('# HELP {} {}'.format(name, help))
+        lines.append('# TYPE {} histogram'.format(name))
+        for key in sorted(histograms):
+            histogram = histograms[key]
+            pairs = list(zip(labels, key))
+            for bound, count in histogram.cumulative():
+                lines.append('{}_bucket{} {}'.format(
+                    name, _labels(pairs + [('le', _number(bound))]), count))
+            lines.append('{}_sum{} {}'.format(
+                name, _labels(pairs), _number(histogram.sum)))
+            lines.append('{}_count{} {}'.format(
+                name, _labels(pairs), histogram.count))
+
+
+class RequestLog(object):
+    """
+    Logs every request with its status, size and duration.
+
+    :param int level: Optional. Logging level. Defaults to DEBUG.
+    """
+
+    def __init__(self, level=logging.DEBUG):
+        self.level = level
+
+    def install(self, webapi):
+        """
+        Registers the log as request hook of a WebAPI.
+        """
+        webapi.on_request_end(self.request_end)
+        return self
+
+    def uninstall(self, webapi):
+        """
+        Removes the log from the request hooks of a WebAPI.
+        """
+        webapi.remove_request_hook(self.request_end)
+
+    def request_end(self, event):
+        if event.error is not None:
+            log.log(self.level, '%s %s failed after %.3fs: %s', event.method,
+                    event.url, event.seconds, event.error)
+        else:
+            log.log(self.level, '%s %s %s, %s bytes in %.3fs%s', event.method,
+                    event.url, event.status, event.bytes, event.seconds,
+                    ' (retry {})'.format(event.retry) if event.retry else '')
+
+
+def _labels(pairs):
+    return '{' + ','.join('{}="{}"'.format(
+        k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+        for k, v in pairs) + '}'
+
+
+def _number(value):
+    if value == '+Inf':
+        return value
+    return repr(float(value))
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.parallel
+~~~~~~~~~~~~
+This module decodes large batch responses in a pool of worker processes, so
+decoding isn't limited to the one core the GIL allows.
+
+The raw response bodies are handed to the workers, which decode them into
+the columns of :mod:`osisoftpy.columnar` and return those through a block of
+shared memory instead of pickling them. Shared memory needs Python 3.8 or
+later; older versions pickle the columns.
+
+Starting the worker processes takes a while, so this pays off for responses
+of many megabytes.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import logging
+
+from osisoftpy.columnar import COLUMNS, DTYPES, decode_batch
+
+log = logging.getLogger(__name__)
+
+
+class Decoder(object):
+    """
+    Decodes batch responses into columns, in worker processes or in this
+    one.
+
+    :param int processes: Optional. Number of worker processes. None or 0
+        decodes in the calling thread.
+
+    Use it as a context manager, or call :meth:`close` to stop the workers.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes
+        self._pool = None
+        if processes:
+            from multiprocessing import Pool
+            self._pool = Pool(processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, body):
+        """
+        Starts decoding a response body, see
+        :func:`osisoftpy.columnar.decode_batch`.
+
+        :param bytes body: The raw response body.
+        :return: An object whose get() method returns the decoded dict.
+        """
+        if self._pool is None:
+            return _Done(decode_batch(body))
+        return _Pending(self._pool.apply_async(_decode_shared, (body,)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+class _Done(object):
+    def __init__(self, result):
+        self.result = result
+
+    def get(self):
+        return self.result
+
+
+class _Pending(object):
+    def __init__(self, async_result):
+        self.async_result = async_result
+
+    def get(self):
+        return _unpack(*self.async_result.get())
+
+
+def _decode_shared(body):
+    # runs in a worker: decodes and moves the columns into shared memory
+    results = decode_batch(body)
+    shared_memory = _shared_memory()
+    if shared_memory is None:
+        return None, results, None
+    layout, size = [], 0
+    for key, result in results.items():
+        if result.columns is None:
+            continue
+        for name in COLUMNS:
+            array = result.columns[name]
+            layout.append((key, name, size, len(array)))
+            size += array.nbytes
+    if not size:
+        return None, results, None
+    block = _create(shared_memory, size)
+    try:
+        import numpy as np
+        for key, name, offset, length in layout:
+            target = np.ndarray(length, dtype=DTYPES[name], buffer=block.buf,
+                                offset=offset)
+            target[:] = results[key].columns[name]
+        stripped = dict((key, r._replace(columns=None if r.columns is None
+                                         else True))
+                        for key, r in results.items())
+        name = block.name
+    finally:
+        block.close()
+    return name, stripped, layout
+
+
+def _create(shared_memory, size):
+    # The caller unlinks the block, so the worker's resource tracker must
+    # not track it too, or it warns about a leak and unlinks it a second
+    # time when the pool shuts down.
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:
+        pass
+    block = shared_memory.SharedMemory(create=True, size=size)
+    if getattr(shared_memory, '_USE_POSIX', False):
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+
+def _unpack(name, results, layout):
+    # runs in the caller: copies the columns out of shared memory and
+    # releases it
+    if name is None:
+        return results
+    import numpy as np
+
+    block = _shared_memory().SharedMemory(name=name)
+    try:
+        columns = dict((key, {}) for key, r in results.items()
+                       if r.columns is not None)
+        for key, column, offset, length in layout:
+            columns[key][column] = np.ndarray(
+                length, dtype=DTYPES[column], buffer=block.buf,
+                offset=offset).copy()
+    finally:
+        block.close()
+        block.unlink()
+    return dict((key, r._replace(columns=columns.get(key)))
+                for key, r in results.items())
+
+
+def _shared_memory():
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        return None
+    return shared_memory
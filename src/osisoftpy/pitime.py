@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.pitime
+~~~~~~~~~~~~
+This module contains helpers to work with PI Web API timestamps and time
+expressions on the client, so time ranges can be reasoned about without a
+round trip to the server.
+
+Times are handled as seconds since the Unix epoch (UTC) where speed matters.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import calendar
+import collections
+import functools
+import re
+import threading
+import time
+from datetime import datetime, timedelta, tzinfo
+
+
+class FixedOffset(tzinfo):
+    """
+    A time zone with a fixed offset from UTC, like those of ISO 8601
+    timestamps. dateutil, which knows named time zones, is only imported
+    when one is asked for.
+
+    :param int seconds: Offset from UTC in seconds.
+    """
+
+    def __init__(self, seconds):
+        self._offset = timedelta(seconds=seconds)
+
+    def utcoffset(self, dt):
+        return self._offset
+
+    def dst(self, dt):
+        return timedelta(0)
+
+    def tzname(self, dt):
+        if not self._offset:
+            return 'UTC'
+        seconds = int(self._offset.total_seconds())
+        return '{}{:02d}:{:02d}'.format('-' if seconds < 0 else '+',
+                                        abs(seconds) // 3600,
+                                        abs(seconds) % 3600 // 60)
+
+    def __eq__(self, other):
+        return (isinstance(other, FixedOffset) and
+                self._offset == other._offset)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._offset)
+
+    def __repr__(self):
+        return 'FixedOffset({})'.format(int(self._offset.total_seconds()))
+
+
+UTC = FixedOffset(0)
+
+# the format of the timestamps returned by the PI Web API, which has up to
+# seven digits of fractional seconds
+_ISO = re.compile(
+    r'^(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:\.(\d{1,9}))?'
+    r'(Z|[+-]\d\d:?\d\d)?$')
+# AFTimeSpan units; months and years have no fixed length and are added on
+# the calendar, as are days and weeks
+_SECONDS = {
+    's': 1, 'sec': 1, 'secs': 1, 'second': 1, 'seconds': 1,
+    'm': 60, 'min': 60, 'mins': 60, 'minute': 60, 'minutes': 60,
+    'h': 3600, 'hr': 3600, 'hrs': 3600, 'hour': 3600, 'hours': 3600,
+}
+_DAYS = {
+    'd': 1, 'day': 1, 'days': 1,
+    'w': 7, 'wk': 7, 'wks': 7, 'week': 7, 'weeks': 7,
+}
+_MONTHS = {
+    'mo': 1, 'month': 1, 'months': 1,
+    'y': 12, 'yr': 12, 'yrs': 12, 'year': 12, 'years': 12,
+}
+_WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+             'saturday', 'sunday']
+_TERM = re.compile(
+    r'\s*([+-]?)\s*(\d+(?:\.\d*)?|\.\d+)\s*([a-z]+)', re.IGNORECASE)
+_CLOCK = re.compile(
+    r'^\s*([+-]?)(?:(\d+)\.)?(\d+):(\d\d)(?::(\d\d(?:\.\d+)?))?\s*$')
+_OFFSETS = re.compile(
+    r'((?:\s*[+-]\s*(?:\d+(?:\.\d*)?|\.\d+)\s*[a-z]+)+)\s*$', re.IGNORECASE)
+
+
+def _memoize(maxsize):
+    # a small least recently used cache for functions of one argument
+    def decorate(fn):
+        cache = collections.OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(arg):
+            with lock:
+                if arg in cache:
+                    result = cache[arg] = cache.pop(arg)
+                    return result
+            result = fn(arg)
+            with lock:
+                cache[arg] = result
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+        wrapper.cache = cache
+        return wrapper
+    return decorate
+
+
+def parse_timestamp(timestamp):
+    """
+    Parses a timestamp returned by the PI Web API.
+
+    Timestamps in the ISO 8601 format of the PI Web API are parsed with a
+    compiled regular expression; anything else is left to dateutil, whose
+    results are kept for repeated inputs.
+
+    :param string timestamp: ISO 8601 timestamp, e.g. 2017-06-01T00:00:00Z
+    :return: datetime object; aware if the timestamp has a time zone.
+    :rtype: datetime.datetime
+    """
+    match = _ISO.match(timestamp)
+    if match is None:
+        return _parse_fallback(timestamp)
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    dt = datetime(int(year), int(month), int(day), int(hour), int(minute),
+                  int(second), int((fraction or '0')[:6].ljust(6, '0')))
+    if zone is None:
+        return dt
+    return dt.replace(tzinfo=_zone(zone))
+
+
+def parse_epoch(timestamp):
+    """
+    Parses a timestamp with a time zone into seconds since the Unix epoch.
+
+    :param string timestamp: ISO 8601 timestamp, e.g. 2017-06-01T00:00:00Z
+    :rtype: float
+    """
+    match = _ISO.match(timestamp)
+    if match is None or match.group(8) is None:
+        return to_epoch(parse_timestamp(timestamp))
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    seconds = float(calendar.timegm((int(year), int(month), int(day), int(hour),
+                                     int(minute), int(second))))
+    if fraction:
+        seconds += int(fraction) / 10 ** len(fraction)
+    return seconds - _offset(zone)
+
+
+def parse_timestamps(timestamps):
+    """
+    Parses many timestamps at once into a NumPy datetime64 array in UTC.
+
+    NumPy is required.
+
+    :param timestamps: Sequence of ISO 8601 timestamps with a time zone.
+    :return: numpy.ndarray of datetime64[ns]
+    """
+    import numpy as np
+
+    strings = np.asarray(timestamps, dtype='U')
+    if len(strings) and np.char.endswith(strings, 'Z').all():
+        return np.char.rstrip(strings, 'Z').astype('datetime64[ns]')
+    nanoseconds = [int(round(parse_epoch(x) * 1e6)) * 1000 for x in strings]
+    return np.array(nanoseconds, dtype='int64').view('datetime64[ns]')
+
+
+def timestamp_key(timestamp):
+    """
+    Returns the timestamp as 'YYYYmmddHHMMSS', as used in the keys of the
+    signals of WebAPI.subscribe.
+
+    :param string timestamp: The timestamp.
+    :rtype: string
+    """
+    if not timestamp:
+        return None
+    match = _ISO.match(timestamp)
+    if match is None:
+        return _parse_fallback(timestamp).strftime('%Y%m%d%H%M%S')
+    return ''.join(match.groups()[:6])
+
+
+@_memoize(256)
+def _parse_fallback(timestamp):
+    from dateutil import parser
+    return parser.parse(timestamp)
+
+
+@_memoize(64)
+def _zone(zone):
+    if zone == 'Z':
+        return UTC
+    return FixedOffset(_offset(zone))
+
+
+def _offset(zone):
+    if zone == 'Z':
+        return 0
+    sign = -1 if zone[0] == '-' else 1
+    zone = zone[1:].replace(':', '')
+    return sign * (int(zone[:2]) * 3600 + int(zone[2:]) * 60)
+
+
+def to_epoch(dt):
+    """
+    Converts an aware datetime into seconds since the Unix epoch.
+
+    :param datetime dt: An aware datetime object.
+    :rtype: float
+    """
+    return calendar.timegm(dt.utctimetuple()) + dt.microsecond / 1e6
+
+
+def format_epoch(seconds):
+    """
+    Formats seconds since the Unix epoch as an ISO 8601 timestamp in UTC, the
+    way the PI Web API accepts it.
+
+    :param float seconds: Seconds since the Unix epoch.
+    :rtype: string
+    """
+    dt = datetime(1970, 1, 1) + timedelta(seconds=float(seconds))
+    if dt.microsecond:
+        return dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def resolve(expression, now=None, relative_to=None, tzinfo=None):
+    """
+    Resolves a time given to a stream method into seconds since the Unix
+    epoch the way the PI Web API would, if that can be done on the client.
+
+    An expression is an optional reference time followed by any number of
+    offsets, such as '*-1d', 't+8h', 'y', 'mon+6h' or '*-1mo+2d'. Reference
+    times are '*' (now), 't' or 'today', 'y' or 'yesterday', a weekday
+    ('mon', 'monday', ...) for the most recent such day, and timestamps. An
+    expression of only offsets, such as '-2h', is relative to relative_to;
+    the end time of a range is relative to its start time.
+
+    The server interprets 't', 'y', weekdays and timestamps without a time
+    zone in its own time zone, so these are only resolved if tzinfo is
+    given. Offsets in days and longer are added on the calendar of tzinfo,
+    or of UTC without one.
+
+    :param expression: The time or time expression, or a datetime object.
+    :param float now: Optional. The time '*' refers to, in seconds since
+        the Unix epoch. Defaults to the current time.
+    :param float relative_to: Optional. The time an expression of only
+        offsets is relative to, in seconds since the Unix epoch. Defaults to
+        now.
+    :param tzinfo: Optional. Time zone of the PI Web API server, as a
+        tzinfo object or a name such as 'Europe/Amsterdam'.
+    :return: Seconds since the Unix epoch, or None.
+    :rtype: float
+    """
+    if now is None:
+        now = time.time()
+    tzinfo = _tzinfo(tzinfo)
+    if isinstance(expression, datetime):
+        if expression.tzinfo is None:
+            if tzinfo is None:
+                return None
+            return _localize(expression, tzinfo)
+        return to_epoch(expression)
+    if not expression or not expression.strip():
+        return None
+    expression = expression.strip()
+    if _ISO.match(expression):
+        return _absolute(expression, tzinfo)
+
+    match = _OFFSETS.search(expression)
+    base = expression[:match.start()].strip() if match else expression
+    offsets = _terms(match.group(1)) if match else []
+    if offsets is None:
+        return None
+    seconds = _reference(base, now, relative_to, tzinfo)
+    for sign, amount, unit in offsets:
+        if seconds is None:
+            break
+        seconds = _add(seconds, sign * amount, unit, tzinfo)
+    return seconds
+
+
+def parse_timespan(timespan):
+    """
+    Parses a fixed length AFTimeSpan such as '1h', '30m', '1.5 days',
+    '1h30m' or '01:30:00' into seconds.
+
+    :param string timespan: The time span.
+    :return: Seconds, or None if the time span has no fixed length, as
+        months and years don't, or isn't understood.
+    :rtype: float
+    """
+    terms = parse_terms(timespan)
+    if terms is None or any(unit in _MONTHS for _, _, unit in terms):
+        return None
+    return float(sum(
+        sign * amount * (_SECONDS.get(unit) or _DAYS[unit] * 86400)
+        for sign, amount, unit in terms))
+
+
+def parse_terms(timespan):
+    """
+    Parses an AFTimeSpan into its terms.
+
+    :param string timespan: The time span, e.g. '1mo', '-1d+2h' or
+        '1.02:00:00'.
+    :return: list of (sign, amount, unit) tuples, with sign 1 or -1 and the
+        unit in lower case, or None if the time span isn't understood.
+    :rtype: list
+    """
+    if not timespan:
+        return None
+    clock = _CLOCK.match(timespan)
+    if clock:
+        sign, days, hours, minutes, seconds = clock.groups()
+        total = (int(days or 0) * 86400 + int(hours) * 3600 +
+                 int(minutes) * 60 + float(seconds or 0))
+        return [(-1 if sign == '-' else 1, total, 's')]
+    return _terms(timespan)
+
+
+def steps(start, end, timespan, tzinfo=None):
+    """
+    Returns start, start + timespan, and so on up to and including end.
+    Time spans in months or years land on the same day of the month.
+
+    :param float start: Start time, in seconds since the epoch.
+    :param float end: End time, in seconds since the epoch.
+    :param string timespan: The AFTimeSpan to step by.
+    :param tzinfo: Optional. Time zone of the calendar, see :func:`resolve`.
+    :return: list of seconds since the epoch, or None if the time span
+        isn't understood or doesn't move forward.
+    :rtype: list
+    """
+    terms = parse_terms(timespan)
+    if not terms:
+        return None
+    tzinfo = _tzinfo(tzinfo)
+    result = [start]
+    while True:
+        # every step is counted from start, so days of the month don't drift
+        t = start
+        for sign, amount, unit in terms:
+            t = _add(t, sign * amount * len(result), unit, tzinfo)
+            if t is None:
+                return None
+        if t <= result[-1]:
+            return None
+        if t > end + 1e-6:
+            return result
+        result.append(t)
+
+
+def _terms(text):
+    terms = []
+    position = 0
+    for match in _TERM.finditer(text):
+        if text[position:match.start()].strip():
+            return None
+        sign, amount, unit = match.groups()
+        unit = unit.lower()
+        if unit not in _SECONDS and unit not in _DAYS and unit not in _MONTHS:
+            return None
+        terms.append((-1 if sign == '-' else 1, float(amount), unit))
+        position = match.end()
+    if not terms or text[position:].strip():
+        return None
+    return terms
+
+
+def _reference(base, now, relative_to, tzinfo):
+    name = base.lower()
+    if not name:
+        return now if relative_to is None else relative_to
+    if name == '*':
+        return now
+    weekday = _weekday(name)
+    if name in ('t', 'today', 'y', 'yesterday') or weekday is not None:
+        if tzinfo is None:
+            return None
+        today = datetime.fromtimestamp(now, tzinfo).replace(
+            hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+        if name in ('t', 'today'):
+            days = 0
+        elif name in ('y', 'yesterday'):
+            days = 1
+        else:
+            days = (today.weekday() - weekday) % 7
+        return _localize(today - timedelta(days=days), tzinfo)
+    return _absolute(base, tzinfo)
+
+
+def _weekday(name):
+    if len(name) < 3:
+        return None
+    for i, day in enumerate(_WEEKDAYS):
+        if day.startswith(name):
+            return i
+    return None
+
+
+def _absolute(timestamp, tzinfo):
+    try:
+        dt = parse_timestamp(timestamp)
+    except (ValueError, OverflowError):
+        return None
+    if dt.tzinfo is None:
+        if tzinfo is None:
+            return None
+        return _localize(dt, tzinfo)
+    return to_epoch(dt)
+
+
+def _add(seconds, amount, unit, tzinfo):
+    if unit in _SECONDS:
+        return seconds + amount * _SECONDS[unit]
+    zone = tzinfo or UTC
+    local = datetime.fromtimestamp(seconds, zone).replace(tzinfo=None)
+    if unit in _DAYS:
+        local += timedelta(days=amount * _DAYS[unit])
+    else:
+        months = amount * _MONTHS[unit]
+        if months != int(months):
+            return None
+        local = _add_months(local, int(months))
+    return _localize(local, zone)
+
+
+def _add_months(dt, months):
+    month = dt.month - 1 + months
+    year = dt.year + month // 12
+    month = month % 12 + 1
+    day = min(dt.day, calendar.monthrange(year, month)[1])
+    return dt.replace(year=year, month=month, day=day)
+
+
+def _localize(dt, tzinfo):
+    return to_epoch(dt.replace(tzinfo=tzinfo))
+
+
+def _tzinfo(zone):
+    if zone is None or not isinstance(zone, str):
+        return zone
+    from dateutil import tz
+    found = tz.gettz(zone)
+    if found is None:
+        raise ValueError('Unknown time zone: {}'.format(zone))
+    return found
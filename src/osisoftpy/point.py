@@ -22,6 +22,8 @@ represents a PI System Point. It's described by the PI Web API.
 import logging
 
 from osisoftpy.stream import Stream
+from osisoftpy.enumeration import EnumerationSet
+from osisoftpy.exceptions import OSIsoftPyException
 from osisoftpy.internal import _stringify
 
 log = logging.getLogger(__name__)
@@ -35,7 +37,7 @@ class Point(Stream):
     """
 
     valid_attr = {'name', 'description', 'uniqueid', 'webid', 'datatype',
-                  'links', 'session', 'webapi'}
+                  'uom', 'links', 'session', 'webapi'}
     dataserver = None
     
     """
@@ -45,6 +47,7 @@ class Point(Stream):
         | uniqueid: Unique GUID for the Point created by the PI System
         | webid: Unique GUID for the Point created by the PI Web API
         | datatype: PI Point datatype
+        | uom: Engineering units, if the search returned them
         | links: Direct Link to the PI Web API 
         | session: PI Web API Connection session
         | webapi: WebAPI object
@@ -52,6 +55,7 @@ class Point(Stream):
 
     def __init__(self, **kwargs):
         super(self.__class__, self).__init__(**kwargs)
+        self._step = None
 
     def __str__(self):
         self_str = '<OSIsoft PI Point [{} - {}]>'
@@ -65,4 +69,42 @@ class Point(Stream):
         return self._get_values(
             payload=payload, endpoint='attributes', controller='points')
 
+    def _fetch_enumeration_set(self, **kwargs):
+        # the set of a digital point is named by its digitalset attribute and
+        # looked up among the sets of its data server
+        items = self._get_items({}, 'attributes', 'points', **kwargs) or []
+        attributes = dict((x.get('Name', '').lower(), x.get('Value'))
+                          for x in items)
+        if str(attributes.get('pointtype', '')).lower() != 'digital':
+            return None
+        name = attributes.get('digitalset')
+        server = self.dataserver
+        if not server:
+            log.warning('The data server of %s is unknown, so its enumeration '
+                        'set %s cannot be read', self.name, name)
+            return None
+        base = self.webapi.links.get('Self')
+
+        def fetch():
+            sets = self._get_json('{}/dataservers/{}/enumerationsets'.format(
+                base, server.webid), {}, **kwargs).get('Items') or []
+            found = next((x for x in sets if x.get('Name') == name), None)
+            if found is None:
+                raise OSIsoftPyException('No enumeration set {} on {}'.format(
+                    name, server.name))
+            url = ((found.get('Links') or {}).get('Values') or
+                   '{}/enumerationsets/{}/enumerationvalues'.format(
+                       base, found['WebId']))
+            items = self._get_json(url, {}, **kwargs).get('Items')
+            return EnumerationSet.from_items(name, items)
+        return self.webapi.enumeration_sets.get((server.webid, name), fetch)
+
+    def _is_step(self):
+        # the step attribute of a point rarely changes, so it is only read
+        # the first time it's needed
+        if self._step is None:
+            attributes = self.attributes(namefilter='step') or []
+            self._step = bool(attributes and attributes[0].value)
+        return self._step
+
     
\ No newline at end of file
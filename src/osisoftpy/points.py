@@ -23,17 +23,40 @@ from __future__ import (absolute_import, division, unicode_literals)
 from future.builtins import *
 
 import collections
+try:
+    from collections.abc import MutableSequence
+except ImportError:
+    from collections import MutableSequence
 import logging
+import time
 
+import requests
+
+from osisoftpy import columnar
+from osisoftpy import export
+from osisoftpy import frames
+from osisoftpy import parallel
+from osisoftpy import tracing
+from osisoftpy.cursor import Cursor
+from osisoftpy.decimate import decimate_many
+from osisoftpy.enumeration import changed
+from osisoftpy.exceptions import HTTPError, OSIsoftPyException
+from osisoftpy.exceptions import PIWebAPIError
 from osisoftpy.factory import Factory
 from osisoftpy.factory import create
+from osisoftpy.internal import RETRY_STATUS
+from osisoftpy.internal import batch
+from osisoftpy.internal import batch_content
 from osisoftpy.internal import get_batch
+from osisoftpy.pitime import parse_epoch
+from osisoftpy.structures import WriteFailure, WriteRecord
 from osisoftpy.value import Value
+from osisoftpy.writer import to_items
 
 log = logging.getLogger(__name__)
 
 
-class Points(collections.MutableSequence):
+class Points(MutableSequence):
     def __init__(self, iterable, webapi):
         self.list = list()
         self.webapi = webapi
@@ -97,24 +120,523 @@ class Points(collections.MutableSequence):
             selectedfields=selectedfields
         )
 
-        r = get_batch('GET', self.webapi, self, 'value', params=payload)
-        json = r.response.json()
+        with tracing.span('Points.current', points=len(self)):
+            r = get_batch('GET', self.webapi, self, 'value', params=payload)
+            with tracing.span('decode', bytes=len(r.response.content)):
+                json = r.response.json()
 
-        # The Web API returns a tuple for each request given to it via batch.
-        # in this case, the key is the name of the tag.
-        # maybe use webid instead?
-        # point[0] is the index given (name in this case)
-        # point[1] is the content (the current value in this case)
-        for p in json.items():
-            point = next((x for x in self if x.name == p[0]), None)
-            v = create(Factory(Value), p[1].get('Content'), self.session,
-                       self.webapi)
+            # The Web API returns a tuple for each request given to it via
+            # batch. in this case, the key is the name of the tag.
+            # maybe use webid instead?
+            # point[0] is the index given (name in this case)
+            # point[1] is the content (the current value in this case)
+            with tracing.span('merge', items=len(json)):
+                for p in json.items():
+                    point = next((x for x in self if x.name == p[0]), None)
+                    v = create(Factory(Value), p[1].get('Content'),
+                               self.session, self.webapi)
 
-            oldcurrent = point.current_value
-            point.current_value = v
+                    oldcurrent = point.current_value
+                    point.current_value = v
 
-            if v and oldcurrent and v.value != oldcurrent.value:
-                signalkey = '{}/current/'.format(point.webid.__str__())
-                point._send_signal(signalkey)
+                    if v and oldcurrent and changed(oldcurrent.value, v.value):
+                        signalkey = '{}/current/'.format(
+                            point.webid.__str__())
+                        point._send_signal(signalkey)
 
         return self
+
+    def update_values(
+            self,
+            data,
+            updateoption='Replace',
+            bufferoption='BufferIfPossible',
+            chunksize=100,
+            maxvalues=10000,
+            retries=3,
+            backoff=1.0):
+        """
+        Updates values for many points at once through the batch controller.
+
+        :param data: The values to write. Either a dict of point -> list of
+            (timestamp, value) or (timestamp, value, flags) tuples, where
+            flags is a dict with any of the keys unitsabbreviation, good and
+            questionable, or a DataFrame-like object with a timestamp index
+            and one column per point. Points may be given as Point objects,
+            names or WebIDs. Missing (NaN) cells of a DataFrame are skipped.
+        :param string updateoption: Optional. Indicates how to treat multiple
+            values with the same timestamp. Default is 'Replace'.
+        :param string bufferoption: Optional. Indicates how to buffer values
+            updates. Default is 'BufferIfPossible'.
+        :param int chunksize: Optional. Number of sub-requests sent in one
+            batch request. Defaults to 100.
+        :param int maxvalues: Optional. Maximum number of values in one
+            sub-request; longer series are split. Defaults to 10000.
+        :param int retries: Optional. How often sub-requests that failed with
+            a connection error, a timeout or a 408/429/5xx status are sent
+            again. Defaults to 3.
+        :param float backoff: Optional. Seconds to wait before the first
+            retry, doubled for each following one. Defaults to 1 second.
+        :return: The values that could not be written, as a list of
+            :class:`WriteFailure <WriteFailure>`.
+        :rtype: list
+        """
+        params = {'updateOption': updateoption, 'bufferOption': bufferoption}
+
+        work = []
+        for point, records in self._write_records(data):
+            point._invalidate_cache()
+            for i in range(0, len(records), maxvalues):
+                work.append((point, records[i:i + maxvalues]))
+
+        failures = []
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(backoff * 2 ** (attempt - 1))
+            retry = []
+            for i in range(0, len(work), chunksize):
+                chunk = work[i:i + chunksize]
+                subrequests = dict(
+                    (str(n), dict(
+                        method='POST',
+                        url='{}streams/{}/recorded'.format(
+                            self.webapi.url, point.webid),
+                        params=params,
+                        json=to_items(records)))
+                    for n, (point, records) in enumerate(chunk))
+                try:
+                    results = batch(self.webapi, subrequests, attempt)
+                except (OSIsoftPyException,
+                        requests.exceptions.RequestException) as e:
+                    log.warning('Batch update of %s streams failed: %s',
+                                len(chunk), e)
+                    # only connection errors, timeouts and transient
+                    # statuses are worth sending again
+                    status = getattr(e, 'status_code', None)
+                    if (isinstance(e, (requests.exceptions.ConnectionError,
+                                       requests.exceptions.Timeout)) or
+                            (isinstance(e, HTTPError) and
+                             status in RETRY_STATUS)):
+                        retry.extend((point, records, status, [str(e)])
+                                     for point, records in chunk)
+                    else:
+                        failures.extend(
+                            WriteFailure(r, status, [str(e)])
+                            for _, records in chunk for r in records)
+                    continue
+                for n, (point, records) in enumerate(chunk):
+                    result = results.get(str(n))
+                    if result is None:
+                        retry.append((point, records, None, ['No response']))
+                    elif result.status in RETRY_STATUS:
+                        retry.append(
+                            (point, records, result.status, result.errors))
+                    elif (result.status is None or result.status >= 300 or
+                            result.errors):
+                        failures.extend(
+                            WriteFailure(r, result.status, result.errors)
+                            for r in records)
+            work = [(point, records) for point, records, _, _ in retry]
+            if not work:
+                break
+
+        for point, records, status, errors in retry:
+            failures.extend(WriteFailure(r, status, errors) for r in records)
+        return failures
+
+    def _write_records(self, data):
+        if hasattr(data, 'columns'):
+            # DataFrame-like: one column per point, timestamps in the index
+            items = ((column, list(zip(data.index, data[column])))
+                     for column in data.columns)
+            skipnan = True
+        else:
+            items = data.items()
+            skipnan = False
+
+        # every key is looked up, so the points are indexed once
+        lookup = {}
+        for x in reversed(self.list):
+            lookup[x.webid] = lookup[x.name] = x
+        for key, rows in items:
+            point = self._find(key, lookup)
+            records = []
+            for row in rows:
+                timestamp, value = row[0], row[1]
+                if skipnan and value != value:
+                    continue
+                flags = row[2] if len(row) > 2 else {}
+                if hasattr(timestamp, 'isoformat'):
+                    timestamp = timestamp.isoformat()
+                records.append(WriteRecord(
+                    point, timestamp, value, flags.get('unitsabbreviation'),
+                    flags.get('good'), flags.get('questionable')))
+            if records:
+                yield point, records
+
+    def _find(self, key, lookup):
+        if hasattr(key, 'webid'):
+            return key
+        point = lookup.get(key)
+        if point is None:
+            raise KeyError('No point named "{}" in {}'.format(key, self))
+        return point
+
+    def decimated(
+            self,
+            starttime='*-1d',
+            endtime='*',
+            pixels=640,
+            method='minmax',
+            error_action='Stop'):
+        """
+        Retrieves the recorded values of every point reduced to what a trend
+        of the given width can show, see :meth:`osisoftpy.Point.decimated`.
+
+        :param string starttime: Optional. Start time of the time range.
+            Defaults to '*-1d'.
+        :param string endtime: Optional. End time of the time range.
+            Defaults to '*'.
+        :param int pixels: Optional. Width of the trend in pixels. Defaults
+            to 640.
+        :param string method: Optional. 'minmax' or 'lttb'. Defaults to
+            'minmax'.
+        :param string error_action: Optional. Defaults to 'Stop'.
+        :return: OrderedDict of point -> list of :class:`osisoftpy.Value`
+        :rtype: collections.OrderedDict
+        """
+        series = collections.OrderedDict(
+            (point, point._recorded_series(
+                starttime, endtime, error_action=error_action))
+            for point in self)
+        decimated = decimate_many(series, pixels, method)
+        return collections.OrderedDict(
+            (point, [create(Factory(Value), x, self.session, self.webapi)
+                     for x in items])
+            for point, items in decimated.items())
+
+    def recorded_since(
+            self,
+            cursors=None,
+            starttime='*-1h',
+            endtime='*',
+            maxcount=1000):
+        """
+        Returns the recorded values of every point which were added after
+        the last call, in a single batch request. See
+        :meth:`osisoftpy.Point.recorded_since`.
+
+        Points whose request failed get no values and keep their cursor, so
+        the next call reads them again.
+
+        :param dict cursors: Optional. dict of webid ->
+            :class:`osisoftpy.cursor.Cursor` returned by the previous call.
+            Points without a cursor are read from starttime.
+        :param string starttime: Optional. Timestamp or time expression to
+            start reading from for points without a cursor. Default is '*-1h'.
+        :param string endtime: Optional. Timestamp or time expression up to
+            which values are read. Default is '*'.
+        :param int maxcount: Optional. Maximum number of values to retrieve
+            per point. Defaults to 1000.
+        :return: A tuple of a dict of point -> list of
+            :class:`osisoftpy.Value`, and a dict of webid -> new cursor.
+        :rtype: tuple
+        """
+        cursors = dict(cursors or {})
+        subrequests = dict(
+            (point.webid, dict(
+                method='GET',
+                url='{}streams/{}/recorded'.format(
+                    self.webapi.url, point.webid),
+                params=point._recorded_since_payload(
+                    cursors.get(point.webid), starttime, endtime, maxcount)))
+            for point in self)
+        results = batch(self.webapi, subrequests)
+
+        values = collections.OrderedDict()
+        for point in self:
+            result = results.get(point.webid)
+            if result is None or result.status != 200:
+                log.warning('Reading recorded values of %s failed: %s',
+                            point.name, result.errors if result else None)
+                values[point] = []
+                continue
+            items = (result.content or {}).get('Items') or []
+            values[point], cursor = point._recorded_since_result(
+                cursors.get(point.webid), starttime, items)
+            cursors[point.webid] = cursor
+        return values, cursors
+
+    def recorded_columns(
+            self,
+            starttime='*-1d',
+            endtime='*',
+            maxcount=10000,
+            chunksize=100,
+            processes=None,
+            error_action='Stop'):
+        """
+        Retrieves all recorded values of every point between starttime and
+        endtime as columns, see :mod:`osisoftpy.columnar`, instead of Value
+        objects. Meant for extracting large amounts of history.
+
+        The points are read in batch requests of chunksize points, maxcount
+        values per point per request, until every point has all its values.
+        With processes, the responses are decoded in that many worker
+        processes while the next requests are sent, see
+        :mod:`osisoftpy.parallel`.
+
+        :param string starttime: Optional. Start time of the time range.
+            Defaults to '*-1d'.
+        :param string endtime: Optional. End time of the time range.
+            Defaults to '*'.
+        :param int maxcount: Optional. Maximum number of values per point per
+            request. Defaults to 10000.
+        :param int chunksize: Optional. Number of points per batch request.
+            Defaults to 100.
+        :param int processes: Optional. Number of worker processes decoding
+            the responses. Defaults to decoding in this process.
+        :param string error_action: Optional. 'Stop' to raise when reading a
+            point fails, 'Continue' to return the values read until then.
+            Defaults to 'Stop'.
+        :return: OrderedDict of point -> dict of column name -> numpy.ndarray
+        :rtype: collections.OrderedDict
+        """
+        parts = collections.OrderedDict((point, []) for point in self)
+        for pages in self._recorded_pages(starttime, endtime, maxcount,
+                                          chunksize, processes, error_action):
+            for point, columns in pages:
+                parts[point].append(columns)
+        return collections.OrderedDict(
+            (point, columnar.concat(columns))
+            for point, columns in parts.items())
+
+    def export(
+            self,
+            path,
+            kind='recorded',
+            starttime='*-1d',
+            endtime='*',
+            format='parquet',
+            maxcount=10000,
+            chunksize=100,
+            processes=None,
+            error_action='Stop'):
+        """
+        Writes the values of every point to a file, page by page as they
+        are read, so memory use doesn't grow with the time range. Each batch
+        request of chunksize points and maxcount values per point becomes a
+        row group of a Parquet file, or a record batch of an Arrow file. See
+        :mod:`osisoftpy.export` for the columns.
+
+        :param string path: Path of the file.
+        :param string kind: Optional. The values to export; only 'recorded'
+            is supported.
+        :param string starttime: Optional. Start time of the time range.
+            Defaults to '*-1d'.
+        :param string endtime: Optional. End time of the time range.
+            Defaults to '*'.
+        :param string format: Optional. 'parquet', 'arrow' or 'csv'.
+            Defaults to 'parquet'. Parquet and Arrow require pyarrow.
+        :param int maxcount: Optional. Maximum number of values per point per
+            request. Defaults to 10000.
+        :param int chunksize: Optional. Number of points per batch request.
+            Defaults to 100.
+        :param int processes: Optional. Number of worker processes decoding
+            the responses, see :meth:`recorded_columns`.
+        :param string error_action: Optional. Defaults to 'Stop'.
+        :return: The number of values written.
+        :rtype: int
+        """
+        if kind != 'recorded':
+            raise ValueError(
+                "Only recorded values can be exported, not {!r}".format(kind))
+        writer = export.open_writer(path, format, list(self), dict(
+            kind=kind, starttime=starttime, endtime=endtime))
+        try:
+            with tracing.span('Points.export', format=format) as span:
+                for pages in self._recorded_pages(
+                        starttime, endtime, maxcount, chunksize, processes,
+                        error_action):
+                    with tracing.span('write', items=sum(
+                            len(c['timestamp']) for _, c in pages)):
+                        writer.write(pages)
+                span.set_attribute('items', writer.rows)
+        finally:
+            writer.close()
+        return writer.rows
+
+    def to_frame(
+            self,
+            kind='recorded',
+            starttime='*-1d',
+            endtime='*',
+            interval='1h',
+            layout='wide',
+            tz=None,
+            enumeration=False,
+            maxcount=10000,
+            chunksize=100,
+            processes=None,
+            error_action='Stop'):
+        """
+        Returns the values of every point as a pandas DataFrame, decoded
+        straight into arrays without creating Value objects. Requires pandas.
+        See :mod:`osisoftpy.frames`.
+
+        :param string kind: Optional. 'recorded', read as by
+            :meth:`recorded_columns`, or 'interpolated', read in one batch
+            request. Defaults to 'recorded'.
+        :param string starttime: Optional. Start time of the time range.
+            Defaults to '*-1d'.
+        :param string endtime: Optional. End time of the time range.
+            Defaults to '*'.
+        :param string interval: Optional. The sampling interval of
+            interpolated values. Defaults to '1h'.
+        :param string layout: Optional. 'wide' for a column per point,
+            indexed by timestamp, or 'long' for a row per value. Defaults to
+            'wide'.
+        :param tz: Optional. Time zone of the timestamps, name or tzinfo.
+            Defaults to the time zone of the WebAPI, or UTC.
+        :param bool enumeration: Optional. True to use every state of the
+            points' enumeration sets as the categories of digital values,
+            see :meth:`osisoftpy.Point.to_series`. Defaults to False.
+        :param int maxcount: Optional. See :meth:`recorded_columns`.
+        :param int chunksize: Optional. See :meth:`recorded_columns`.
+        :param int processes: Optional. See :meth:`recorded_columns`.
+        :param string error_action: Optional. Defaults to 'Stop'.
+        :rtype: pandas.DataFrame
+        """
+        if layout not in frames.LAYOUTS:
+            raise ValueError("layout must be 'wide' or 'long', not {!r}"
+                             .format(layout))
+        states = {}
+        if kind == 'recorded':
+            parts = collections.OrderedDict((point, []) for point in self)
+            for pages in self._recorded_pages(
+                    starttime, endtime, maxcount, chunksize, processes,
+                    error_action, states):
+                for point, columns in pages:
+                    parts[point].append(columns)
+            columns = [columnar.concat(x) for x in parts.values()]
+        elif kind == 'interpolated':
+            columns = self._interpolated_columns(
+                starttime, endtime, interval, error_action, states)
+        else:
+            raise ValueError("kind must be 'recorded' or 'interpolated', "
+                             "not {!r}".format(kind))
+
+        if enumeration:
+            for point in self:
+                found = point.enumeration_set(error_action)
+                if found is not None:
+                    states[point] = found.merge(states.get(point))
+        streams = [(point.name, c, states.get(point))
+                   for point, c in zip(self, columns)]
+        tz = tz or getattr(self.webapi, 'timezone', None) or 'UTC'
+        with tracing.span('Points.to_frame', points=len(self),
+                          items=sum(len(c['timestamp']) for c in columns)):
+            if layout == 'wide':
+                return frames.wide(streams, tz)
+            return frames.long(streams, tz)
+
+    def _interpolated_columns(self, starttime, endtime, interval,
+                              error_action, states):
+        subrequests = dict(
+            (point.webid, dict(
+                method='GET',
+                url='{}streams/{}/interpolated'.format(
+                    self.webapi.url, point.webid),
+                params=dict(starttime=starttime, endtime=endtime,
+                            interval=interval)))
+            for point in self)
+        results = batch(self.webapi, subrequests)
+        columns = []
+        for point in self:
+            result = results.get(point.webid)
+            if result is None or result.status != 200:
+                msg = 'Reading interpolated values of {} failed: {}'.format(
+                    point.name, result.errors if result else 'no response')
+                if error_action == 'Stop':
+                    raise PIWebAPIError(msg)
+                print(msg + ', Continuing')
+                columns.append(columnar.empty())
+                continue
+            columns.append(columnar.decode_items(
+                (result.content or {}).get('Items') or [],
+                states.setdefault(point, {})))
+        return columns
+
+    def _recorded_pages(self, starttime, endtime, maxcount, chunksize,
+                        processes, error_action, states=None):
+        # Yields the pages of recorded values read by one batch request, as
+        # a list of (point, columns). A point is requested again only after
+        # its page was yielded, and only one response more than there are
+        # worker processes is held at a time. The names of digital states
+        # are added to states, as point -> code -> name, if given.
+        cursors = dict((point.webid, None) for point in self)
+        queue = collections.deque(self)
+        inflight = collections.deque()
+        window = (processes or 0) + 1
+
+        with tracing.span('Points.recorded_columns', points=len(self),
+                          processes=processes or 0), \
+                parallel.Decoder(processes) as decoder:
+            while queue or inflight:
+                if queue and len(inflight) < window:
+                    chunk = [queue.popleft()
+                             for _ in range(min(chunksize, len(queue)))]
+                    subrequests = dict(
+                        (point.webid, dict(
+                            method='GET',
+                            url='{}streams/{}/recorded'.format(
+                                self.webapi.url, point.webid),
+                            params=point._recorded_since_payload(
+                                cursors[point.webid], starttime, endtime,
+                                maxcount)))
+                        for point in chunk)
+                    body = batch_content(self.webapi, subrequests)
+                    inflight.append((chunk, decoder.submit(body)))
+                    continue
+
+                chunk, decoded = inflight.popleft()
+                with tracing.span('decode wait', points=len(chunk)):
+                    results = decoded.get()
+                pages = []
+                for point in chunk:
+                    result = results.get(point.webid)
+                    columns, more = self._page_columns(
+                        point, result, cursors, maxcount, error_action)
+                    if states is not None and result is not None:
+                        states.setdefault(point, {}).update(result.states)
+                    if columns is not None:
+                        pages.append((point, columns))
+                    if more:
+                        queue.append(point)
+                yield pages
+
+    def _page_columns(self, point, result, cursors, maxcount, error_action):
+        # Returns the new columns read for a point and whether there are more
+        if result is None or result.status != 200:
+            msg = 'Reading recorded values of {} failed: {}'.format(
+                point.name, result.errors if result else 'no response')
+            if error_action == 'Stop':
+                raise PIWebAPIError(msg)
+            print(msg + ', Continuing')
+            return None, False
+
+        cursor = cursors[point.webid]
+        columns = result.columns
+        count = len(columns['timestamp'])
+        seen = 0
+        if cursor is not None:
+            timestamps = columns['timestamp']
+            timestamp = parse_epoch(cursor.timestamp)
+            while (seen < cursor.skip and seen < count and
+                   timestamps[seen] == timestamp):
+                seen += 1
+        page = columnar.take(columns, seen) if count > seen else None
+        if count - seen < maxcount:
+            return page, False
+        cursors[point.webid] = Cursor(point.webid, result.last, result.skip)
+        return page, True
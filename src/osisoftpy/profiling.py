@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.profiling
+~~~~~~~~~~~~
+This module attributes the time spent in library calls to their phases,
+using the spans of :mod:`osisoftpy.tracing`:
+
+    >>> with osisoftpy.profile():
+    ...     points = webapi.points(query='name:*')
+    ...     points.current()
+
+prints a table with a row per phase, e.g. 'HTTP GET' for the network,
+'decode' for JSON parsing and 'construct' for building Value and Point
+objects, and their calls, wall time, self time (excluding the phases inside
+them), CPU time of the calling thread, memory blocks still allocated at
+their end and bytes and items handled.
+
+Allocated blocks need Python 3.4 or later and CPU time per thread Python
+3.7 or later; older versions count the CPU time of the process.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import contextlib
+import sys
+import time
+from timeit import default_timer
+
+from osisoftpy import tracing
+
+_cpu = (getattr(time, 'thread_time', None) or
+        getattr(time, 'process_time', None) or time.clock)
+_blocks = getattr(sys, 'getallocatedblocks', None)
+
+
+class PhaseStats(object):
+    """
+    The totals of one phase.
+
+    Attributes:
+        | calls: Number of spans
+        | wall: Seconds from start to end
+        | self: Seconds not spent in the phases inside it
+        | cpu: CPU seconds not spent in the phases inside it
+        | blocks: Memory blocks allocated and not freed, or None
+        | bytes: Sum of the bytes attribute of the spans
+        | items: Sum of the items attribute of the spans
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.self = 0.0
+        self.cpu = 0.0
+        self.blocks = 0 if _blocks is not None else None
+        self.bytes = 0
+        self.items = 0
+
+
+class _ProfiledSpan(tracing.Span):
+
+    def __enter__(self):
+        self.child_wall = self.child_cpu = self.child_blocks = 0
+        self.blocks = _blocks() if _blocks is not None else 0
+        self.cpu = _cpu()
+        return super(_ProfiledSpan, self).__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cpu = _cpu() - self.cpu
+        self.blocks = (_blocks() if _blocks is not None else 0) - self.blocks
+        return super(_ProfiledSpan, self).__exit__(
+            exc_type, exc_value, traceback)
+
+
+class Profiler(tracing.Recorder):
+    """
+    A tracer that sums the spans per phase instead of keeping them.
+
+    Attributes:
+        | phases: dict of span name -> :class:`PhaseStats`
+        | wall: Seconds between start and stop
+        | cpu: CPU seconds of the process between start and stop
+    """
+
+    def __init__(self):
+        super(Profiler, self).__init__(maxtraces=0)
+        self.phases = {}
+        self.wall = None
+        self.cpu = None
+        self._started = None
+
+    def span(self, name, attributes):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        return _ProfiledSpan(self, name, attributes, parent)
+
+    def start(self):
+        self._started = (default_timer(), _process_cpu())
+
+    def stop(self):
+        wall, cpu = self._started
+        self.wall = default_timer() - wall
+        self.cpu = _process_cpu() - cpu
+
+    def format(self):
+        """
+        Returns the phases as a table, the phases with the most self time
+        first, followed by the wall and CPU time of the whole profile.
+
+        :rtype: str
+        """
+        with self._lock:
+            phases = sorted(self.phases.items(),
+                            key=lambda x: (-x[1].self, x[0]))
+        width = max([len(name) for name, _ in phases] + [len('phase')])
+        lines = ['{:<{w}} {:>7} {:>10} {:>10} {:>10} {:>9} {:>11} {:>9}'
+                 .format('phase', 'calls', 'wall ms', 'self ms', 'cpu ms',
+                         'blocks', 'bytes', 'items', w=width)]
+        for name, stats in phases:
+            lines.append(
+                '{:<{w}} {:>7} {:>10.1f} {:>10.1f} {:>10.1f} {:>9} {:>11} '
+                '{:>9}'.format(
+                    name, stats.calls, 1000 * stats.wall, 1000 * stats.self,
+                    1000 * stats.cpu,
+                    '-' if stats.blocks is None else stats.blocks,
+                    stats.bytes, stats.items, w=width))
+        if self.wall is not None:
+            library = sum(s.self for _, s in phases)
+            lines.append('total {:.1f} ms wall, {:.1f} ms cpu, {:.1f} ms in '
+                         'the library'.format(1000 * self.wall,
+                                              1000 * self.cpu,
+                                              1000 * library))
+        return '\n'.join(lines)
+
+    def _finish(self, span):
+        parent = span.parent
+        if parent is not None:
+            parent.child_wall += span.duration
+            parent.child_cpu += span.cpu
+            parent.child_blocks += span.blocks
+        with self._lock:
+            stats = self.phases.get(span.name)
+            if stats is None:
+                stats = self.phases[span.name] = PhaseStats()
+            stats.calls += 1
+            stats.wall += span.duration
+            stats.self += span.duration - span.child_wall
+            stats.cpu += span.cpu - span.child_cpu
+            if stats.blocks is not None:
+                stats.blocks += span.blocks - span.child_blocks
+            stats.bytes += _number(span.attributes.get('bytes'))
+            stats.items += _number(span.attributes.get('items'))
+
+
+@contextlib.contextmanager
+def profile(output=None, quiet=False):
+    """
+    Profiles the library calls made inside the with block, in every
+    thread, and prints a summary table when it ends. Tracing enabled
+    before is suspended meanwhile.
+
+    :param output: Optional. File to print the table to. Defaults to
+        sys.stdout.
+    :param bool quiet: Optional. True to not print the table.
+    :return: The :class:`Profiler`, whose phases hold the totals.
+    """
+    previous = tracing.current()
+    profiler = tracing.enable(Profiler())
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        if previous is None:
+            tracing.disable()
+        else:
+            tracing.enable(previous)
+        if not quiet:
+            (output or sys.stdout).write(profiler.format() + '\n')
+
+
+def _process_cpu():
+    return (getattr(time, 'process_time', None) or time.clock)()
+
+
+def _number(value):
+    return value if isinstance(value, int) and not isinstance(
+        value, bool) else 0
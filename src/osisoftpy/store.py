@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.store
+~~~~~~~~~~~~
+This module contains the Store class, which keeps extracted time series on
+disk as columns (see :mod:`osisoftpy.columnar`), so that one process can
+extract the data and several others can analyse it without each holding a
+copy:
+
+    >>> store = Store('/data/extract')
+    >>> store.write_many(points.recorded_columns(starttime='*-30d'))
+
+and in another process:
+
+    >>> columns = Store('/data/extract').read(webid, start, end)
+
+Every write adds a segment, one .npy file per column, and records its time
+range in an index. Reads memory-map the segments, so the arrays returned are
+views of the operating system's page cache shared by every reader, not
+copies.
+
+One process should write to a store at a time; any number can read it. NumPy
+is required.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import bisect
+import io
+import json
+import logging
+import os
+import threading
+
+from osisoftpy import columnar
+from osisoftpy.internal import replace_file
+from osisoftpy.pitime import parse_epoch
+
+log = logging.getLogger(__name__)
+
+_INDEX = 'index.json'
+
+
+class Store(object):
+    """
+    Time series stored as memory-mapped columns, indexed by webid and time
+    range.
+
+    :param string directory: Directory of the store. It is created if it
+        doesn't exist.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = {}
+        self._stamp = None
+        self._maps = {}
+        self._lock = threading.RLock()
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._load()
+
+    def __contains__(self, webid):
+        with self._lock:
+            self._load()
+            return webid in self._index
+
+    def webids(self):
+        """
+        Returns the webids of the streams in the store.
+
+        :rtype: list
+        """
+        with self._lock:
+            self._load()
+            return sorted(self._index)
+
+    def ranges(self, webid):
+        """
+        Returns the segments of a stream, ordered by their start.
+
+        :return: list of (start, end, count) tuples, start and end in seconds
+            since the epoch.
+        :rtype: list
+        """
+        with self._lock:
+            self._load()
+            return [(start, end, count) for start, end, count, _ in
+                    self._index.get(webid, [])]
+
+    def write(self, webid, values):
+        """
+        Adds a segment to a stream. Segments are kept as written, so writing
+        overlapping time ranges returns their values twice.
+
+        :param string webid: WebID of the stream.
+        :param values: dict of columns, or a list of
+            :class:`osisoftpy.Value`, e.g. the result of
+            :meth:`osisoftpy.Point.recorded`.
+        """
+        columns = (values if isinstance(values, dict)
+                   else columnar.from_values(values))
+        timestamps = columns['timestamp']
+        if not len(timestamps):
+            return
+        import numpy as np
+
+        with self._lock:
+            self._load()
+            segments = self._index.setdefault(webid, [])
+            name = '{:08d}'.format(
+                1 + max([int(s[3]) for s in segments] + [0]))
+            folder = os.path.join(self.directory, webid)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            for column in columnar.COLUMNS:
+                path = self._path(webid, name, column)
+                with io.open(path + '.tmp', 'wb') as f:
+                    np.save(f, np.ascontiguousarray(
+                        columns[column], dtype=columnar.DTYPES[column]))
+                replace_file(path + '.tmp', path)
+            segment = [float(timestamps[0]), float(timestamps[-1]),
+                       len(timestamps), name]
+            segments.insert(bisect.bisect_right(
+                [s[0] for s in segments], segment[0]), segment)
+            self._save()
+
+    def write_many(self, series):
+        """
+        Adds a segment per stream, see :meth:`write`.
+
+        :param dict series: dict of point or webid -> columns or list of
+            :class:`osisoftpy.Value`, e.g. the result of
+            :meth:`osisoftpy.Points.recorded_columns`.
+        """
+        for key, values in series.items():
+            self.write(getattr(key, 'webid', key), values)
+
+    def segments(self, webid, start=None, end=None):
+        """
+        Returns the values of a stream between start and end, inclusive, as
+        memory-mapped columns per segment. The arrays are read-only views of
+        the files.
+
+        :param string webid: WebID of the stream.
+        :param start: Optional. Seconds since the epoch or ISO 8601
+            timestamp. Defaults to the first value.
+        :param end: Optional. Seconds since the epoch or ISO 8601 timestamp.
+            Defaults to the last value.
+        :return: list of dicts of column name -> numpy.ndarray
+        :rtype: list
+        """
+        start, end = _seconds(start), _seconds(end)
+        parts = []
+        with self._lock:
+            self._load()
+            for first, last, count, name in self._index.get(webid, []):
+                if ((start is not None and last < start) or
+                        (end is not None and first > end)):
+                    continue
+                columns = self._open(webid, name)
+                timestamps = columns['timestamp']
+                lo = (0 if start is None or first >= start else
+                      int(timestamps.searchsorted(start, 'left')))
+                hi = (count if end is None or last <= end else
+                      int(timestamps.searchsorted(end, 'right')))
+                if hi > lo:
+                    parts.append(columnar.take(columns, lo, hi))
+        return parts
+
+    def read(self, webid, start=None, end=None):
+        """
+        Returns the values of a stream between start and end as columns, see
+        :meth:`segments`. Values from a single segment are returned as views
+        without copying, values from several are joined into new arrays.
+
+        :rtype: dict
+        """
+        return columnar.concat(self.segments(webid, start, end))
+
+    def close(self):
+        """
+        Releases the memory maps. Arrays returned before stay usable.
+        """
+        with self._lock:
+            self._maps.clear()
+
+    def _open(self, webid, name):
+        key = (webid, name)
+        columns = self._maps.get(key)
+        if columns is None:
+            import numpy as np
+            columns = self._maps[key] = dict(
+                (column, np.load(self._path(webid, name, column),
+                                 mmap_mode='r'))
+                for column in columnar.COLUMNS)
+        return columns
+
+    def _path(self, webid, name, column):
+        return os.path.join(self.directory, webid,
+                            '{}.{}.npy'.format(name, column))
+
+    def _load(self):
+        # picks up segments written by other processes since the last call
+        path = os.path.join(self.directory, _INDEX)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        stamp = (stat.st_ino, stat.st_mtime, stat.st_size)
+        if stamp == self._stamp:
+            return
+        with io.open(path, 'r', encoding='utf-8') as f:
+            self._index = json.load(f)
+        self._stamp = stamp
+
+    def _save(self):
+        path = os.path.join(self.directory, _INDEX)
+        with io.open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self._index, sort_keys=True))
+        replace_file(path + '.tmp', path)
+        stat = os.stat(path)
+        self._stamp = (stat.st_ino, stat.st_mtime, stat.st_size)
+
+
+def _seconds(timestamp):
+    if timestamp is None or isinstance(timestamp, (int, float)):
+        return timestamp
+    return parse_epoch(timestamp)
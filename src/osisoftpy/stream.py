@@ -22,20 +22,50 @@ represents a collection of time series data. It's described by the PI Web API.
 from __future__ import (absolute_import, division, unicode_literals)
 from future.builtins import *
 
+import bisect
 import warnings
 import json
+import logging
 import re
+import time
 
 from datetime import datetime
-from dateutil import parser
+from osisoftpy import columnar
+from osisoftpy import frames
+from osisoftpy import tracing
 from osisoftpy.base import Base
+from osisoftpy.cache import request_key
+from osisoftpy.cursor import Cursor
+from osisoftpy.decimate import decimate
+from osisoftpy.enumeration import EnumerationSet
+from osisoftpy.enumeration import changed
 from osisoftpy.factory import Factory
 from osisoftpy.factory import create
+from osisoftpy.interpolation import interpolate_cached
+from osisoftpy.interpolation import targets
 from osisoftpy.internal import get
 from osisoftpy.internal import put
 from osisoftpy.internal import post
+from osisoftpy.pitime import format_epoch
+from osisoftpy.pitime import parse_epoch
+from osisoftpy.pitime import parse_timespan
+from osisoftpy.pitime import resolve
+from osisoftpy.pitime import steps
+from osisoftpy.pitime import timestamp_key
+from osisoftpy.summary import CALCULATION_BASES
+from osisoftpy.summary import intervals
+from osisoftpy.summary import is_numeric
+from osisoftpy.summary import summarize
+from osisoftpy.summary import summary_types
 from osisoftpy.value import Value
+from osisoftpy.exceptions import HTTPError
 from osisoftpy.exceptions import MismatchEntriesError
+from osisoftpy.writer import _encode_items
+from osisoftpy.writer import post_chunked
+
+log = logging.getLogger(__name__)
+
+_UNKNOWN = object()
 
 
 class Stream(Base):
@@ -52,6 +82,7 @@ class Stream(Base):
         self.summary_values = None
         self.end_value = None
         self.value_value = None
+        self._enumeration_set = _UNKNOWN
 
     def update_value(
         self, 
@@ -66,6 +97,10 @@ class Stream(Base):
         """
         Updates a value for the specified stream.
         Exception and Compression rules take effort in a batch POST request.
+        If a write-ahead log is enabled with WebAPI.enable_wal, the update
+        is queued on disk and kept there while the server is unreachable;
+        this returns without an error and the update is sent on a later
+        call. An update the server rejects is still handled by error_action.
 
         :param string timestamp: Manual entry of a datetime to be inserted
             into the PI tag
@@ -91,21 +126,38 @@ class Stream(Base):
     def update_values(
         self, 
         timestamps, 
-        values, 
+        values=None, 
         unitsabbreviation=None, 
         good=None, 
         questionable=None, 
         updateoption='Replace', 
         bufferoption='BufferIfPossible',
-        error_action='Stop'):
+        error_action='Stop',
+        chunksize=10000,
+        maxbytes=4 * 1024 * 1024,
+        workers=1,
+        retries=3):
         """
         Updates multiple values for the specified stream.
         Assumes values property remains the same within the single call.
         Exception and Compression rules take effort in a batch POST request.
+        If a write-ahead log is enabled with WebAPI.enable_wal, the updates
+        are queued on disk and kept there while the server is unreachable;
+        their chunks are in the pending list of the report rather than
+        failed. Chunks the server rejects are still handled by error_action.
+
+        Large updates are split into chunks of at most chunksize values and
+        maxbytes bytes, which are sent (and retried) independently.
+
+        Timestamps and values may also be NumPy arrays, pandas objects, or
+        a single pandas Series indexed by timestamp. These are serialized
+        with vectorized operations; naive datetime64 timestamps are taken
+        as UTC.
 
         :param list(string) timestamps: Manual entry of a list of datetimes to be inserted
-            into the PI tag
-        :param list(Any) values: Manual entry of a list of values to be inserted 
+            into the PI tag, or a pandas Series of values indexed by timestamp.
+        :param list(Any) values: Manual entry of a list of values to be inserted.
+            Omitted when timestamps is a pandas Series.
         :param string unitsabbreviation: Optional. Unit of measure abbreviation
             of the value. Defaults to "".
         :param bool good: Optional. The status indicates whether 
@@ -118,20 +170,46 @@ class Stream(Base):
             updates. Default is 'BufferIfPossible'.
         :param string error_action: Optional. Defaults to 'Stop'. 'Continue' will
             allow the program to continue upon errors. Useful for long-running loops.
+        :param int chunksize: Optional. Maximum number of values per request.
+            Defaults to 10000.
+        :param int maxbytes: Optional. Maximum request body size in bytes.
+            Defaults to 4 MB.
+        :param int workers: Optional. Number of chunks sent in parallel.
+            Defaults to 1.
+        :param int retries: Optional. How often a chunk that failed with a
+            connection error, a timeout or a 408/429/5xx status is sent
+            again. Defaults to 3.
+        :return: Per-chunk status and throughput of the write.
+        :rtype: :class:`osisoftpy.writer.WriteReport`
 
         :raises MismatchEntriesError: The number of values in the Timestamps and 
             Values input list parameters are mismatched
+        :raises HTTPError: Some chunks could not be written and error_action
+            is 'Stop'.
         """
+        if values is None and _is_series(timestamps):
+            timestamps, values = timestamps.index, timestamps.values
         #throws error if number of timestamps doesn't correspond to number of values
         if len(timestamps) != len(values):
             raise MismatchEntriesError(
                 "The length of timestamps and values lists are not equal."
             )   
         payload = {'updateOption': updateoption, 'bufferOption': bufferoption }
-        request = []
-        for timestamp, value in zip(timestamps, values):
-            request.append({'Timestamp': timestamp, 'Value': value, 'UnitsAbbreviation': unitsabbreviation, 'Good':good, 'Questionable':questionable})
-        self._post_values(payload, request, 'recorded', error_action=error_action)
+        self._invalidate_cache()
+        encoded = _encode_items(
+            timestamps, values, unitsabbreviation, good, questionable)
+        report = post_chunked(
+            self, 'recorded', payload, encoded, chunksize=chunksize,
+            maxbytes=maxbytes, workers=workers, retries=retries)
+        if report.failed:
+            msg = '{} of {} chunks could not be written: {}'.format(
+                len(report.failed), len(report.chunks),
+                report.failed[0].errors)
+            if error_action.lower() == 'stop':
+                raise HTTPError(msg)
+            else:
+                print(msg + ', Continuing')
+        return report
 
     def current(self, overwrite=True, error_action='Stop'):
         """
@@ -163,7 +241,7 @@ class Stream(Base):
         # currently, checking the Value objects doesn't work, so we compare the
         # Value.value values.
         # if oldvalue and oldvalue != self.end_value:\
-        if oldvalue and self.current_value and self.current_value.value != oldvalue.value:
+        if oldvalue and self.current_value and changed(oldvalue.value, self.current_value.value):
             signalkey = '{}/current/'.format(self.webid.__str__())
             self._send_signal(signalkey)
 
@@ -215,7 +293,11 @@ class Stream(Base):
             'includefilteredvalues': includefilteredvalues,
             'selectedfields': selectedfields,
         }
-        values = self._get_values(payload=payload, endpoint='interpolated', error_action=error_action)
+        values = None
+        if filterexpression is None and selectedfields is None:
+            values = self._cached_interpolated(starttime, endtime, interval)
+        if values is None:
+            values = self._get_values(payload=payload, endpoint='interpolated', error_action=error_action)
         return values
         # if not overwrite:
         #     warnings.warn('You have set the overwrite boolean to False - '
@@ -269,7 +351,12 @@ class Stream(Base):
             'sortorder': sortorder,
             'selectedfields': selectedfields,
         }
-        new_intp_values = self._get_values(payload=payload, endpoint='interpolatedattimes', error_action=error_action)
+        new_intp_values = None
+        if filterexpression is None and selectedfields is None:
+            new_intp_values = self._cached_interpolatedattimes(
+                timestamps, sortorder)
+        if new_intp_values is None:
+            new_intp_values = self._get_values(payload=payload, endpoint='interpolatedattimes', error_action=error_action)
         if not overwrite:
             warnings.warn('You have set the overwrite boolean to False - '
                           'the interpolated value(s) has been retrieved, but not '
@@ -293,7 +380,7 @@ class Stream(Base):
             self.interpolated_at_time_values[pitimestamp] = value
 
             #compares old and new value to see if new value has changed
-            if oldvalue and value and value.value != oldvalue.value:
+            if oldvalue and value and changed(oldvalue.value, value.value):
                 signalkey = '{}/interpolatedattimes/{}'.format(self.webid.__str__(), pitimestamp)
                 self._send_signal(signalkey)
 
@@ -366,6 +453,90 @@ class Stream(Base):
 
         # return self.plot_values
 
+    def decimated(
+            self,
+            starttime='*-1d',
+            endtime='*',
+            pixels=640,
+            method='minmax',
+            error_action='Stop'):
+        """Retrieves the recorded values of a time range reduced to what a 
+        trend of the given width can show. Unlike plot, the values are 
+        reduced on the client: with a recorded cache enabled, zooming and 
+        panning within cached history doesn't need new requests. 
+
+        :param string starttime: Optional - Start time of the time range, 
+            with a time zone or relative to '\*'. Default is '\*-1d'.
+        :param string endtime: Optional - End time of the time range, with a 
+            time zone or relative to '\*'. Default is '\*'.
+        :param int pixels: Optional - Width of the trend in pixels. Default 
+            is 640.
+        :param string method: Optional - 'minmax' keeps the first, last, 
+            lowest and highest value per pixel, 'lttb' keeps the one value 
+            per pixel that best preserves the shape of the line. Default is 
+            'minmax'. 
+            See :mod:`osisoftpy.decimate`.
+        :param string error_action: Optional. Defaults to 'Stop'. 'Continue' will
+            allow the program to continue upon errors. Useful for long-running loops.
+        :return: Object containing a list of :class:`osisoftpy.Value` objects. 
+        :rtype: List of :class:`osisoftpy.Value`
+        """
+        times, items = self._recorded_series(
+            starttime, endtime, error_action=error_action)
+        return [create(Factory(Value), x, self.session, self.webapi)
+                for x in decimate(times, items, pixels, method)]
+
+    def to_series(
+            self,
+            kind='recorded',
+            starttime='*-1d',
+            endtime='*',
+            interval='1h',
+            tz=None,
+            enumeration=False,
+            error_action='Stop'):
+        """Returns recorded or interpolated values as a pandas Series, 
+        decoded straight into arrays without creating Value objects. 
+        Requires pandas. See :mod:`osisoftpy.frames`. 
+
+        :param string kind: Optional - 'recorded' or 'interpolated'. 
+            Default is 'recorded'.
+        :param string starttime: Optional - Start time of the time range. 
+            Default is '\*-1d'.
+        :param string endtime: Optional - End time of the time range. 
+            Default is '\*'.
+        :param string interval: Optional - The sampling interval of 
+            interpolated values. Default is '1h'.
+        :param tz: Optional - Time zone of the index, name or tzinfo. 
+            Defaults to the time zone of the WebAPI, or UTC.
+        :param bool enumeration: Optional - True to use every state of the 
+            stream's enumeration set as the categories of digital values, 
+            besides the states returned, so they are the same in every call. 
+            See enumeration_set. Default is False.
+        :param string error_action: Optional. Defaults to 'Stop'. 'Continue' will
+            allow the program to continue upon errors. Useful for long-running loops.
+        :return: Series indexed by timestamp, categorical for digital points.
+        :rtype: pandas.Series
+        """
+        states = {}
+        if kind == 'recorded':
+            _, items = self._recorded_series(
+                starttime, endtime, error_action=error_action)
+        elif kind == 'interpolated':
+            payload = dict(starttime=starttime, endtime=endtime,
+                           interval=interval)
+            items = self._get_items(payload, 'interpolated',
+                                    error_action=error_action) or []
+        else:
+            raise ValueError("kind must be 'recorded' or 'interpolated', "
+                             "not {!r}".format(kind))
+        columns = columnar.decode_items(items, states)
+        enumeration = enumeration and self.enumeration_set(error_action)
+        if enumeration:
+            states = enumeration.merge(states)
+        return frames.series(columns, states, self.name,
+                             tz or self._timezone() or 'UTC')
+
     def recorded(
             self,
             starttime='*-1d',
@@ -397,6 +568,11 @@ class Stream(Base):
         time. If the includeFilteredValues parameter is false for this case, 
         no event is returned for the boundary time. 
 
+        If a recorded cache is enabled with WebAPI.enable_recorded_cache, 
+        requests with the 'Inside' boundary type and no filter are answered 
+        from the cache, and only the parts of the time range that aren't 
+        cached yet are requested from the server. 
+
         :param string starttime: Optional – Timestamp or time expression for the start 
             of the interpolation period. The default is '*-1d' for element attributes 
             and points. For event frame attributes, the default is the event frame's 
@@ -425,18 +601,34 @@ class Stream(Base):
         :return: Object containing a list of :class:`osisoftpy.Value` objects. 
         :rtype: :func:`list` of :class:`osisoftpy.Value`
         """
-        payload = {
-            'starttime': starttime,
-            'endtime': endtime,
-            'boundarytype': boundarytype,
-            'filterexpression': filterexpression,
-            'maxcount': maxcount,
-            'includefilteredvalues': includefilteredvalues,
-            'selectedfields': selectedfields,
-        }
-
-        values = self._get_values(payload=payload, endpoint='recorded', error_action=error_action)
-        return values
+        with tracing.span('Stream.recorded', webid=self.webid,
+                          starttime=starttime, endtime=endtime) as span:
+            cache = getattr(self.webapi, 'recorded_cache', None)
+            if (cache is not None and boundarytype.lower() == 'inside' and
+                    not filterexpression and not includefilteredvalues and
+                    not selectedfields):
+                values = self._cached_recorded(
+                    cache, starttime, endtime, maxcount,
+                    error_action=error_action)
+                if values is not None:
+                    span.set_attribute('cached', True)
+                    span.set_attribute('items', len(values))
+                    return values
+
+            payload = {
+                'starttime': starttime,
+                'endtime': endtime,
+                'boundarytype': boundarytype,
+                'filterexpression': filterexpression,
+                'maxcount': maxcount,
+                'includefilteredvalues': includefilteredvalues,
+                'selectedfields': selectedfields,
+            }
+
+            values = self._get_values(payload=payload, endpoint='recorded',
+                                      error_action=error_action)
+            span.set_attribute('items', len(values or []))
+            return values
         # if not overwrite:
         #     warnings.warn('You have set the overwrite boolean to False - '
         #                   'the recorded value(s) has been retrieved, but not '
@@ -451,6 +643,62 @@ class Stream(Base):
 
         # return self.recorded_values
 
+    def recorded_since(
+            self,
+            cursor=None,
+            starttime='*-1h',
+            endtime='*',
+            maxcount=1000,
+            error_action='Stop'):
+        """Returns the recorded values which were added after the last call, 
+        together with a cursor to pass to the next call. 
+
+        Values are requested from the cursor's timestamp on with the 'Inside' 
+        boundary type, and the values at that timestamp which were returned 
+        before are skipped, so no value is returned twice. If more than 
+        maxcount values are available, the rest is returned by the next call. 
+        Values written later with a timestamp before the cursor aren't seen. 
+
+        :param cursor: Optional – :class:`osisoftpy.cursor.Cursor` returned by 
+            the previous call. If not given, values are read from starttime.
+        :param string starttime: Optional – Timestamp or time expression to 
+            start reading from when no cursor is given. Default is '*-1h'.
+        :param string endtime: Optional – Timestamp or time expression up to 
+            which values are read. Default is '*'.
+        :param int maxcount: Optional – Maximum number of values to retrieve. 
+            Defaults to 1000.
+        :param string error_action: Optional. Defaults to 'Stop'. 'Continue' will
+            allow the program to continue upon errors. Useful for long-running loops.
+        :return: A tuple of a list of :class:`osisoftpy.Value` objects and the 
+            new :class:`osisoftpy.cursor.Cursor`.
+        :rtype: tuple
+        """
+        payload = self._recorded_since_payload(cursor, starttime, endtime, maxcount)
+        items = self._get_items(payload=payload, endpoint='recorded', error_action=error_action) or []
+        values, cursor = self._recorded_since_result(cursor, starttime, items)
+        return values, cursor
+
+    def _recorded_since_payload(self, cursor, starttime, endtime, maxcount):
+        # the values at the cursor's timestamp which are skipped must not
+        # count against maxcount, or a cursor could never move past them.
+        return {
+            'starttime': cursor.timestamp if cursor else starttime,
+            'endtime': endtime,
+            'boundarytype': 'Inside',
+            'maxcount': maxcount + (cursor.skip if cursor else 0),
+        }
+
+    def _recorded_since_result(self, cursor, starttime, items):
+        # without values read yet the first cursor stays at starttime; one
+        # without a timestamp would make the server start at '*-1d'.
+        if cursor is None:
+            return ([create(Factory(Value), x, self.session, self.webapi)
+                     for x in items],
+                    Cursor(self.webid, starttime).advance(items))
+        return ([create(Factory(Value), x, self.session, self.webapi)
+                 for x in items[_seen(cursor, items):]],
+                cursor.advance(items))
+
     def recordedattime(
             self,
             time,
@@ -503,7 +751,7 @@ class Stream(Base):
             return new_recorded_at_time_value
 
         self.recorded_at_time_values[formattedtime] = new_recorded_at_time_value
-        if old_recorded_at_time_value and self.recorded_at_time_values[formattedtime] and self.recorded_at_time_values[formattedtime].value != old_recorded_at_time_value.value:
+        if old_recorded_at_time_value and self.recorded_at_time_values[formattedtime] and changed(old_recorded_at_time_value.value, self.recorded_at_time_values[formattedtime].value):
             signalkey = '{}/recordedattime/{}'.format(self.webid.__str__(),formattedtime or '')
             self._send_signal(signalkey)
 
@@ -588,7 +836,13 @@ class Stream(Base):
             'selectedFields': selectedfields
         }
 
-        values = self._get_summary(payload=payload, error_action=error_action)
+        values = None
+        if (filterexpression is None and selectedfields is None and
+                timezone is None and timetype in (None, 'Auto')):
+            values = self._cached_summary(starttime, endtime, summarytype,
+                                          calculationbasis, summaryduration)
+        if values is None:
+            values = self._get_summary(payload=payload, error_action=error_action)
         return values
         # if not overwrite:
         #     warnings.warn('You have set the overwrite boolean to False - '
@@ -634,7 +888,7 @@ class Stream(Base):
         # emit a signal if the value changes. exclude changes to booleans or timestmap
         # currently, checking the Value objects doesn't work, so we compare the
         # Value.value values.
-        if oldendvalue and self.end_value and self.end_value.value != oldendvalue.value:
+        if oldendvalue and self.end_value and changed(oldendvalue.value, self.end_value.value):
             signalkey = '{}/end/'.format(self.webid.__str__())
             self._send_signal(signalkey)
             
@@ -645,33 +899,281 @@ class Stream(Base):
         # log.debug('payload: %s', payload)
         url = '{}/{}/{}/{}'.format(
             self.webapi.links.get('Self'), controller, self.webid, endpoint)
-        r = get(url, self.session, params=payload, **kwargs)
         try:
-            value = create(Factory(Value), r.response.json(), self.session,
-                       self.webapi)
+            value = create(Factory(Value), self._get_json(url, payload, **kwargs),
+                           self.session, self.webapi)
         except ValueError:
             value = None
         return value
 
     def _get_values(self, payload, endpoint, controller='streams', **kwargs):
+        items = self._get_items(payload, endpoint, controller, **kwargs)
+        if items is None:
+            return None
+        with tracing.span('construct', items=len(items)):
+            return list(map(
+                lambda x: create(Factory(Value), x, self.session, self.webapi),
+                items
+            ))
+
+    def _get_items(self, payload, endpoint, controller='streams', **kwargs):
         url = '{}/{}/{}/{}'.format(self.webapi.links.get('Self'), controller,
                                         self.webid, endpoint)
-        r = get(url, self.session, params=payload, **kwargs)
         try:
-            values = list(map(
-                lambda x: create(Factory(Value), x, self.session, self.webapi),
-                r.response.json().get('Items', None)
-            ))
+            items = self._get_json(url, payload, **kwargs).get('Items', None)
         except ValueError:
-            values = None
-        return values
+            items = None
+        return items
+
+    def _get_json(self, url, payload, **kwargs):
+        # Threads reading the same url and parameters at the same time wait
+        # for the request that is already in flight, see WebAPI.single_flight.
+        def fetch():
+            r = get(url, self.session, params=payload, webapi=self.webapi,
+                    **kwargs)
+            with tracing.span('decode', bytes=len(r.response.content)):
+                return r.response.json()
+        flights = getattr(self.webapi, 'single_flight', None)
+        if flights is None:
+            return fetch()
+        key = request_key(url, payload) + tuple(sorted(kwargs.items()))
+        return flights.do(key, fetch)
+
+    def _iter_recorded(self, start, end, maxcount=1000, **kwargs):
+        # Yields pages of raw recorded items between two epoch times. Pages
+        # are requested from the cursor after the last item on, see
+        # recorded_since.
+        cursor = Cursor(self.webid, format_epoch(start))
+        endtime = format_epoch(end)
+        while True:
+            payload = self._recorded_since_payload(
+                cursor, None, endtime, maxcount)
+            items = self._get_items(payload, 'recorded', **kwargs) or []
+            page = items[_seen(cursor, items):]
+            if page:
+                yield page
+            if len(page) < maxcount:
+                return
+            cursor = cursor.advance(items)
+
+    def _cached_recorded(self, cache, starttime, endtime, maxcount, **kwargs):
+        now = time.time()
+        start, end = self._resolve_range(starttime, endtime, now)
+        if start is None or end is None or start > end:
+            return None
+
+        complete = self._fill_cache(cache, start, end, now, maxcount,
+                                    **kwargs)
+        items = cache.values(self.webid, start, complete)[:maxcount]
+        return [create(Factory(Value), x, self.session, self.webapi)
+                for x in items]
+
+    def _fill_cache(self, cache, start, end, now, maxcount=None, **kwargs):
+        # Reads the parts of a range missing from the cache. With maxcount,
+        # reading stops once the first maxcount values of the range are
+        # cached; the end of the part held complete is returned.
+        while True:
+            gaps = cache.missing(self.webid, start, end)
+            if not gaps:
+                return end
+            limit = None
+            for a, b in gaps:
+                if maxcount is not None:
+                    # the values at a are read again along with the gap
+                    cached, _ = cache.series(self.webid, start, a)
+                    if len(cached) >= maxcount:
+                        return a
+                    limit = maxcount - bisect.bisect_left(cached, a)
+                times, items = self._read_recorded(a, b, limit, **kwargs)
+                if limit is not None and len(items) > limit:
+                    # more values may share the last timestamp read, so the
+                    # range is only complete up to the one before it
+                    keep = bisect.bisect_left(times, times[-1])
+                    if keep:
+                        times, items = times[:keep], items[:keep]
+                    cache.add(self.webid, a, times[-1], times, items)
+                    if times[-1] <= a:
+                        return a
+                    break
+                # values can still arrive for the open-ended "now" segment,
+                # so it only counts as complete up to the last value
+                # received.
+                if b >= now:
+                    b = times[-1] if times else a
+                cache.add(self.webid, a, b, times, items)
+            else:
+                return end
+
+    def _read_recorded(self, start, end, limit=None, **kwargs):
+        # Returns the raw recorded items between two epoch times, with the
+        # items' epoch times; with a limit, reading stops after more than
+        # limit items.
+        times, items = [], []
+        pagesize = 1000 if limit is None else min(1000, limit + 1)
+        for page in self._iter_recorded(start, end, pagesize, **kwargs):
+            for item in page:
+                times.append(parse_epoch(item['Timestamp']))
+                items.append(item)
+            if limit is not None and len(items) > limit:
+                break
+        return times, items
+
+    def _recorded_series(self, starttime, endtime, **kwargs):
+        # Returns (times, items) of the recorded values of a time range,
+        # from the recorded cache if there is one.
+        now = time.time()
+        start, end = self._resolve_range(starttime, endtime, now)
+        if start is None or end is None or start > end:
+            raise ValueError('Cannot resolve the time range {} to {}'.format(
+                starttime, endtime))
+        cache = getattr(self.webapi, 'recorded_cache', None)
+        if cache is None:
+            return self._read_recorded(start, end, **kwargs)
+        self._fill_cache(cache, start, end, now, **kwargs)
+        return cache.series(self.webid, start, end)
+
+    def _cached_interpolated(self, starttime, endtime, interval):
+        # Interpolated values are computed from the recorded cache when it
+        # holds the recorded values around the whole range.
+        if getattr(self.webapi, 'recorded_cache', None) is None:
+            return None
+        now = time.time()
+        start, end = self._resolve_range(starttime, endtime, now)
+        if start is None or end is None or start > end:
+            return None
+        seconds = parse_timespan(interval)
+        if seconds and seconds > 0:
+            return self._interpolate_cached(targets(start, end, seconds))
+        # months and years step on the calendar
+        at = steps(start, end, interval, self._timezone())
+        if at is None:
+            return None
+        return self._interpolate_cached(at)
+
+    def _cached_interpolatedattimes(self, timestamps, sortorder='Ascending'):
+        if getattr(self.webapi, 'recorded_cache', None) is None:
+            return None
+        if not isinstance(timestamps, list):
+            timestamps = [timestamps]
+        now = time.time()
+        at = [resolve(x, now, tzinfo=self._timezone()) for x in timestamps]
+        if any(x is None for x in at):
+            return None
+        at = sorted(at, reverse=(sortorder or '').lower() == 'descending')
+        return self._interpolate_cached(at)
+
+    def _interpolate_cached(self, at):
+        cache = self.webapi.recorded_cache
+        items = interpolate_cached(cache, self.webid, at, self._is_step())
+        if items is None:
+            cache.misses += 1
+            return None
+        cache.hits += 1
+        return [create(Factory(Value), x, self.session, self.webapi)
+                for x in items]
+
+    def _cached_summary(self, starttime, endtime, summarytype,
+                        calculationbasis, summaryduration):
+        # Summaries are calculated from the recorded cache when it holds the
+        # recorded values of the range and, for time weighted summaries, the
+        # values around it.
+        cache = getattr(self.webapi, 'recorded_cache', None)
+        if cache is None:
+            return None
+        types = summary_types(summarytype)
+        basis = calculationbasis or 'TimeWeighted'
+        if not types or basis not in CALCULATION_BASES:
+            return None
+        now = time.time()
+        start, end = self._resolve_range(
+            starttime or '*-1d', endtime or '*', now)
+        if start is None or end is None or start >= end:
+            return None
+        bounds = intervals(start, end)
+        if summaryduration:
+            duration = parse_timespan(summaryduration)
+            if duration and duration > 0:
+                bounds = intervals(start, end, duration)
+            else:
+                # months and years are summarized per calendar period
+                bounds = steps(start, end, summaryduration, self._timezone())
+                if bounds is None:
+                    return None
+                if bounds[-1] < end:
+                    bounds.append(end)
+
+        interval = cache.interval(self.webid, start, end)
+        if interval is not None and basis == 'TimeWeighted':
+            a, b, times, items = interval
+            step = self._is_step()
+            if not times or times[0] > start or (not step and times[-1] < end):
+                interval = None
+        if interval is None or not is_numeric(interval[3]):
+            cache.misses += 1
+            return None
+        cache.hits += 1
+        a, b, times, items = interval
+        if basis != 'TimeWeighted':
+            step = False
+        items = summarize(times, items, bounds, types, basis, step)
+        return self._summary_values(items)
+
+    def enumeration_set(self, error_action='Stop'):
+        """Returns the enumeration set of a digital point or enumerated 
+        attribute. It is fetched the first time and shared with the other 
+        streams using it, see :mod:`osisoftpy.enumeration`. 
+
+        :param string error_action: Optional. Defaults to 'Stop'. 'Continue' will
+            allow the program to continue upon errors. Useful for long-running loops.
+        :return: The set, or None if the stream has none.
+        :rtype: osisoftpy.enumeration.EnumerationSet
+        """
+        if self._enumeration_set is _UNKNOWN:
+            self._enumeration_set = self._fetch_enumeration_set(
+                error_action=error_action)
+        return self._enumeration_set
+
+    def _fetch_enumeration_set(self, **kwargs):
+        # enumerated attributes link to the values of their set
+        url = (self.links or {}).get('EnumerationValues')
+        if not url:
+            return None
+        name = getattr(self, 'typequalifier', None) or None
+
+        def fetch():
+            items = self._get_json(url, {}, **kwargs).get('Items')
+            return EnumerationSet.from_items(name, items)
+        return self.webapi.enumeration_sets.get(url, fetch)
+
+    def _is_step(self):
+        return bool(getattr(self, 'step', False))
+
+    def _timezone(self):
+        return getattr(self.webapi, 'timezone', None)
+
+    def _resolve_range(self, starttime, endtime, now):
+        # Resolves a time range on the client; an end time of only offsets,
+        # such as '+1h', is relative to the start time.
+        tzinfo = self._timezone()
+        start = resolve(starttime, now, tzinfo=tzinfo)
+        end = resolve(endtime, now, relative_to=start, tzinfo=tzinfo)
+        return start, end
+
+    def _invalidate_cache(self):
+        for name in ('recorded_cache', 'response_cache'):
+            cache = getattr(self.webapi, name, None)
+            if cache is not None:
+                cache.invalidate(self.webid)
 
     def _get_summary(self, payload, endpoint='summary', controller='streams', **kwargs):
         url = '{}/{}/{}/{}'.format(
             self.webapi.links.get('Self'), controller, self.webid, endpoint)
-        r = get(url, self.session, params=payload, **kwargs)
+        r = get(url, self.session, params=payload, webapi=self.webapi,
+                **kwargs)
+
+        return self._summary_values(r.response.json().get('Items'))
 
-        items = r.response.json().get('Items')
+    def _summary_values(self, items):
         for item in items:
             item.get('Value')['calculationtype'] = item.get('Type')
 
@@ -686,21 +1188,35 @@ class Stream(Base):
         return values
 
     def _post_values(self, payload, request, endpoint, **kwargs):
+        self._invalidate_cache()
+        # with a write-ahead log the update is stored on disk first and then
+        # sent along with anything still queued from an earlier outage.
+        # Updates kept in the log while the server is unreachable are not
+        # errors, only the ones it rejects are.
+        wal = getattr(self.webapi, 'wal', None)
+        if wal is not None:
+            seq = wal.append(self.webid, endpoint, payload, request)
+            wal.replay(self.webapi)
+            rejected = [r for r in wal.rejected if r['seq'] == seq]
+            if rejected:
+                msg = 'PI Web API rejected the update: {}'.format(
+                    rejected[0]['error'])
+                if kwargs.get('error_action', 'Stop').lower() == 'stop':
+                    raise HTTPError(msg)
+                else:
+                    print(msg + ', Continuing')
+            return
         url = '{}/{}/{}/{}'.format(
             self.webapi.links.get('Self'), 'streams', self.webid, endpoint)
-        post(url, self.session, params=payload, json=request, **kwargs)
+        post(url, self.session, params=payload, json=request,
+             webapi=self.webapi, **kwargs)
 
     def _send_signal(self, signalkey):
         if signalkey in self.webapi.signals:
             self.webapi.signals[signalkey].send(self)
 
     def _parse_timestamp(self, datetime):
-        if datetime:
-            parseddatetime = parser.parse(datetime)
-            formatteddatetime = None if parseddatetime == None else parseddatetime.strftime('%Y%m%d%H%M%S')
-        else:  
-            formatteddatetime = None
-        return formatteddatetime
+        return timestamp_key(datetime)
 
     def getvalue(self, time=None, overwrite=True):
         """
@@ -728,8 +1244,29 @@ class Stream(Base):
         # if oldvalue and oldvalue != self.end_value:\
         if not oldvalue:
             pass
-        elif self.value_value and self.value_value.value != oldvalue.value:
+        elif self.value_value and changed(oldvalue.value, self.value_value.value):
             signalkey = '{}/getvalue/'.format(self.webid.__str__())
             self.webapi.signals[signalkey].send(self)
 
         return self.value_value
+
+
+def _seen(cursor, items):
+    # Number of leading items at the cursor's timestamp that were read before
+    skip = 0
+    while (skip < cursor.skip and skip < len(items) and
+           items[skip].get('Timestamp') == cursor.timestamp):
+        skip += 1
+    return skip
+
+
+def _is_series(obj):
+    # a list has an index method too; pandas is only imported for objects
+    # that could be a Series
+    if not hasattr(obj, 'index') or not hasattr(obj, 'values'):
+        return False
+    try:
+        import pandas as pd
+    except ImportError:
+        return False
+    return isinstance(obj, pd.Series)
@@ -20,11 +20,32 @@ osisoftpy.structures
 from __future__ import (absolute_import, division, unicode_literals)
 from future.builtins import *
 import collections
+try:
+    from collections.abc import MutableSequence
+except ImportError:
+    from collections import MutableSequence
 
 APIResponse = collections.namedtuple('APIResponse', ['response', 'session'])
+BatchResult = collections.namedtuple(
+    'BatchResult', ['status', 'content', 'errors'])
+BatchColumns = collections.namedtuple(
+    'BatchColumns', ['status', 'columns', 'last', 'skip', 'errors',
+                     'states'])
+WriteRecord = collections.namedtuple(
+    'WriteRecord', ['stream', 'timestamp', 'value', 'unitsabbreviation',
+                    'good', 'questionable'])
+WriteFailure = collections.namedtuple(
+    'WriteFailure', ['record', 'status', 'errors'])
+ChunkResult = collections.namedtuple(
+    'ChunkResult', ['index', 'count', 'bytes', 'status', 'attempts',
+                    'seconds', 'errors'])
+RequestEvent = collections.namedtuple(
+    'RequestEvent', ['method', 'url', 'template', 'status', 'bytes',
+                     'seconds', 'response_seconds', 'retry', 'subrequests',
+                     'error'])
 
 
-class TypedList(collections.MutableSequence):
+class TypedList(MutableSequence):
     """A ``list``-like object with one or more specified Type(s)
     
     Implements all methods and operations of
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.summary
+~~~~~~~~~~~~
+This module calculates the summaries of Stream.summary on the client from
+recorded values, so the recorded values held in memory can be rolled up
+without a summary request per stream.
+
+Time weighted summaries weigh every value by the time it was valid for. The
+values at the start and end of each summary interval are interpolated, see
+:mod:`osisoftpy.interpolation`, and the time during which the value is bad
+doesn't count. Totals assume the values are rates per day, as the PI Data
+Archive does, and the time weighted Count is the time in seconds the value
+was good.
+
+Event weighted summaries weigh every recorded value equally. A value at the
+boundary of two summary intervals belongs to the later one; the last
+interval also includes a value at its end.
+
+NumPy is required.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import math
+
+from osisoftpy.interpolation import _is_number
+from osisoftpy.interpolation import interpolate
+from osisoftpy.pitime import format_epoch
+
+SUMMARY_TYPES = ('Total', 'Average', 'Minimum', 'Maximum', 'Range', 'StdDev',
+                 'PopulationStdDev', 'Count', 'PercentGood')
+CALCULATION_BASES = ('TimeWeighted', 'EventWeighted',
+                     'EventWeightedIncludeBothEnds')
+
+# returned by the PI Data Archive when there is no good value to summarize
+CALC_FAILED = {'Name': 'Calc Failed', 'Value': 246, 'IsSystem': True}
+
+
+def summary_types(summarytype):
+    """
+    Returns the summary types of a Stream.summary request in the order they
+    are calculated, or None if one of them can't be calculated on the client.
+
+    :param summarytype: A summary type, a list of them or None for 'Total'.
+    :rtype: list
+    """
+    if not summarytype:
+        summarytype = ['Total']
+    elif not isinstance(summarytype, (list, tuple)):
+        summarytype = [summarytype]
+    names = dict((x.lower(), x) for x in SUMMARY_TYPES)
+    types = []
+    for t in summarytype:
+        if t.lower() == 'all':
+            types.extend(SUMMARY_TYPES)
+        elif t.lower() in names:
+            types.append(names[t.lower()])
+        else:
+            return None
+    return [t for t in SUMMARY_TYPES if t in types]
+
+
+def intervals(start, end, duration=None):
+    """
+    Splits a time range into summary intervals of a duration; the last one
+    ends at end.
+
+    :param float start: Start of the range, in seconds since the epoch.
+    :param float end: End of the range, in seconds since the epoch.
+    :param float duration: Optional. Seconds per interval. Defaults to the
+        whole range.
+    :return: numpy.ndarray of the interval boundaries
+    """
+    import numpy as np
+
+    if not duration or duration >= end - start:
+        return np.array([start, end], dtype='float64')
+    count = int(math.ceil((end - start) / duration - 1e-9))
+    bounds = start + np.arange(count + 1, dtype='float64') * duration
+    bounds[-1] = end
+    return bounds
+
+
+def summarize(times, items, bounds, summarytypes, calculationbasis=None,
+              step=False):
+    """
+    Calculates summaries of recorded values.
+
+    For time weighted summaries the items must include a value at or before
+    the first bound and, unless step is True, one at or after the last.
+
+    :param list times: Sorted times of the recorded items, in seconds since
+        the epoch.
+    :param list items: The recorded items as returned by the PI Web API.
+    :param bounds: Boundaries of the summary intervals, see
+        :func:`intervals`.
+    :param list summarytypes: Summary types, see :func:`summary_types`.
+    :param string calculationbasis: Optional. 'TimeWeighted' (the default),
+        'EventWeighted' or 'EventWeightedIncludeBothEnds'.
+    :param bool step: Optional. True for step streams. Defaults to False.
+    :return: list of dicts with the Type and Value of each summary, in the
+        format of the PI Web API, ordered by type and then by interval.
+    :rtype: list
+    """
+    basis = (calculationbasis or 'TimeWeighted').lower()
+    if basis == 'timeweighted':
+        stats = _time_weighted(times, items, bounds, step)
+    elif basis in ('eventweighted', 'eventweightedincludebothends'):
+        stats = _event_weighted(times, items, bounds,
+                                basis == 'eventweightedincludebothends')
+    else:
+        raise ValueError('Unsupported calculation basis: {}'.format(
+            calculationbasis))
+
+    units = items[0].get('UnitsAbbreviation', '') if items else ''
+    result = []
+    for summarytype in summarytypes:
+        for k in range(len(bounds) - 1):
+            value, timestamp = stats[k][summarytype]
+            good = value is not None and not (
+                isinstance(value, float) and math.isnan(value))
+            result.append({'Type': summarytype, 'Value': {
+                'Timestamp': format_epoch(
+                    bounds[k] if timestamp is None else timestamp),
+                'Value': value if good else CALC_FAILED,
+                'UnitsAbbreviation': units,
+                'Good': good,
+                'Questionable': False,
+                'Substituted': False,
+            }})
+    return result
+
+
+def is_numeric(items):
+    """
+    Returns whether the good values among items are all numeric, which is
+    what the summaries of this module are defined for.
+
+    :param list items: The recorded items as returned by the PI Web API.
+    :rtype: bool
+    """
+    return all(_is_number(x.get('Value')) for x in items
+               if x.get('Good', True))
+
+
+def _time_weighted(times, items, bounds, step):
+    import numpy as np
+
+    bounds = np.asarray(bounds, dtype='float64')
+    t = np.asarray(times, dtype='float64')
+    inside = (t > bounds[0]) & (t < bounds[-1])
+    grid = np.union1d(bounds, t[inside])
+    points = interpolate(times, items, grid, step)
+    good = np.array([p['Good'] and _is_number(p['Value']) for p in points])
+    v = np.array([float(p['Value']) if g else np.nan
+                  for p, g in zip(points, good)])
+
+    # segment i runs from grid[i] to grid[i + 1]; it is linear unless the
+    # stream steps or either end is bad, and only counts if its start is good
+    a, b = v[:-1], v[1:]
+    duration = np.diff(grid)
+    linear = (not step) & good[:-1] & good[1:]
+    b = np.where(linear, b, a)
+    counts = good[:-1]
+    interval = np.searchsorted(bounds, grid[:-1], side='right') - 1
+    n = len(bounds) - 1
+
+    weight = np.where(counts, duration, 0.0)
+    area = np.where(counts, duration * (a + b) / 2, 0.0)
+    goodtime = np.bincount(interval, weight, minlength=n)
+    integral = np.bincount(interval, area, minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = integral / goodtime
+        m = mean[interval]
+        square = np.where(counts, duration * (
+            (a - m) ** 2 + (a - m) * (b - m) + (b - m) ** 2) / 3, 0.0)
+        variance = np.bincount(interval, square, minlength=n) / goodtime
+
+    stats = []
+    for k in range(n):
+        lo, hi = np.searchsorted(grid, [bounds[k], bounds[k + 1]])
+        minimum, maximum = _extremes(grid[lo:hi + 1], v[lo:hi + 1],
+                                     good[lo:hi + 1])
+        total = bounds[k + 1] - bounds[k]
+        has_good = goodtime[k] > 0
+        stats.append(_stats(
+            total=float(integral[k] / 86400) if has_good else None,
+            average=float(mean[k]) if has_good else None,
+            minimum=minimum,
+            maximum=maximum,
+            stddev=math.sqrt(variance[k]) if has_good else None,
+            popstddev=math.sqrt(variance[k]) if has_good else None,
+            count=float(goodtime[k]),
+            percentgood=100.0 * goodtime[k] / total if total else None))
+    return stats
+
+
+def _event_weighted(times, items, bounds, bothends):
+    import numpy as np
+
+    t = np.asarray(times, dtype='float64')
+    good = np.array([bool(x.get('Good', True)) and _is_number(x.get('Value'))
+                     for x in items], dtype=bool)
+    v = np.array([float(x.get('Value')) if g else np.nan
+                  for x, g in zip(items, good)])
+
+    stats = []
+    n = len(bounds) - 1
+    for k in range(n):
+        lo = np.searchsorted(t, bounds[k], side='left')
+        last = bothends or k == n - 1
+        hi = np.searchsorted(t, bounds[k + 1], side='right' if last else 'left')
+        tk, vk, gk = t[lo:hi], v[lo:hi], good[lo:hi]
+        values = vk[gk]
+        count = len(values)
+        minimum, maximum = _extremes(tk, vk, gk)
+        stats.append(_stats(
+            total=float(values.sum()) if count else None,
+            average=float(values.mean()) if count else None,
+            minimum=minimum,
+            maximum=maximum,
+            stddev=float(values.std(ddof=1)) if count > 1 else None,
+            popstddev=float(values.std()) if count else None,
+            count=float(count),
+            percentgood=100.0 * count / len(vk) if len(vk) else None))
+    return stats
+
+
+def _extremes(t, v, good):
+    import numpy as np
+
+    if not good.any():
+        return (None, None), (None, None)
+    masked = np.where(good, v, np.nan)
+    i, j = np.nanargmin(masked), np.nanargmax(masked)
+    return (float(v[i]), float(t[i])), (float(v[j]), float(t[j]))
+
+
+def _stats(total, average, minimum, maximum, stddev, popstddev, count,
+           percentgood):
+    spread = None
+    if minimum[0] is not None:
+        spread = maximum[0] - minimum[0]
+    return {
+        'Total': (total, None),
+        'Average': (average, None),
+        'Minimum': minimum,
+        'Maximum': maximum,
+        'Range': (spread, None),
+        'StdDev': (stddev, None),
+        'PopulationStdDev': (popstddev, None),
+        'Count': (count, None),
+        'PercentGood': (percentgood, None),
+    }
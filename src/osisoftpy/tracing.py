@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tracing
+~~~~~~~~~~~~
+This module contains optional tracing of the library's operations as nested
+spans, e.g. WebAPI.points with a WebAPI.request span per page and an HTTP
+span below each, or Stream.recorded with the HTTP request, the JSON decode
+and the construction of the Value objects.
+
+Tracing is off by default; span() then returns one shared object that does
+nothing. To record the spans in memory:
+
+    >>> from osisoftpy import tracing
+    >>> recorder = tracing.enable()
+    >>> webapi.points(query='name:sinusoid*').current()
+    >>> print(recorder.format())
+    >>> tracing.disable()
+
+or to send them to OpenTelemetry, if the opentelemetry-api package is
+installed:
+
+    >>> tracing.enable(tracing.OpenTelemetryTracer())
+
+Spans started in other threads, e.g. by the ThreadPool of the chunked
+writer, are recorded as separate traces.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import collections
+import logging
+import threading
+from timeit import default_timer
+
+log = logging.getLogger(__name__)
+
+_tracer = None
+
+
+def span(name, **attributes):
+    """
+    Starts a span, to be used as a context manager:
+
+        with span('Points.current', points=len(points)) as s:
+            ...
+            s.set_attribute('bytes', size)
+
+    :param string name: Name of the operation.
+    :param attributes: Attributes of the span.
+    :return: The span, or a span that does nothing if tracing is disabled.
+    """
+    if _tracer is None:
+        return _NOOP
+    return _tracer.span(name, attributes)
+
+
+def enabled():
+    """
+    Returns whether tracing is enabled.
+
+    :rtype: bool
+    """
+    return _tracer is not None
+
+
+def current():
+    """
+    Returns the enabled tracer, or None.
+    """
+    return _tracer
+
+
+def enable(tracer=None):
+    """
+    Starts tracing, replacing the tracer enabled before.
+
+    :param tracer: Optional. Object whose span(name, attributes) method
+        returns a context manager, e.g. :class:`OpenTelemetryTracer`.
+        Defaults to a new :class:`Recorder`.
+    :return: The tracer.
+    """
+    global _tracer
+    _tracer = tracer if tracer is not None else Recorder()
+    return _tracer
+
+
+def disable():
+    """
+    Stops tracing.
+    """
+    global _tracer
+    _tracer = None
+
+
+class _NoopSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span(object):
+    """
+    A timed operation of a :class:`Recorder`.
+
+    Attributes:
+        | name: Name of the operation
+        | attributes: dict of the attributes of the span
+        | parent: The enclosing span, or None
+        | children: The spans started inside it
+        | start: Start of the span, in seconds of timeit.default_timer
+        | end: End of the span, or None while it runs
+        | error: The exception the span ended with, or None
+    """
+
+    def __init__(self, recorder, name, attributes, parent):
+        self.recorder = recorder
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.children = []
+        self.start = None
+        self.end = None
+        self.error = None
+
+    def __enter__(self):
+        self.recorder._push(self)
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end = default_timer()
+        self.error = exc_value
+        self.recorder._pop(self)
+        return False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    @property
+    def duration(self):
+        """Seconds the span took, or None while it runs."""
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def walk(self, depth=0):
+        """Yields (depth, span) for the span and the spans below it."""
+        yield depth, self
+        for child in self.children:
+            for item in child.walk(depth + 1):
+                yield item
+
+
+class Recorder(object):
+    """
+    Keeps the spans in memory.
+
+    :param int maxtraces: Optional. Number of finished traces, i.e. spans
+        without a parent, kept; older ones are dropped. Defaults to 1000.
+
+    Attributes:
+        | traces: The finished traces, oldest first
+    """
+
+    def __init__(self, maxtraces=1000):
+        self.traces = collections.deque(maxlen=maxtraces)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def span(self, name, attributes):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        return Span(self, name, attributes, parent)
+
+    def spans(self, name=None):
+        """
+        Returns the finished spans of every trace, optionally only those
+        of a name.
+
+        :rtype: list
+        """
+        with self._lock:
+            traces = list(self.traces)
+        return [s for trace in traces for _, s in trace.walk()
+                if name is None or s.name == name]
+
+    def clear(self):
+        with self._lock:
+            self.traces.clear()
+
+    def format(self):
+        """
+        Returns the traces as indented text, one span per line with its
+        duration in milliseconds and its attributes.
+
+        :rtype: str
+        """
+        with self._lock:
+            traces = list(self.traces)
+        lines = []
+        for trace in traces:
+            for depth, s in trace.walk():
+                attributes = ' '.join('{}={}'.format(k, v) for k, v in
+                                      sorted(s.attributes.items()))
+                lines.append('{}{} {:.2f} ms {}'.format(
+                    '  ' * depth, s.name, 1000 * s.duration,
+                    attributes).rstrip())
+        return '\n'.join(lines)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _push(self, span):
+        self._stack().append(span)
+
+    def _pop(self, span):
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        self._finish(span)
+
+    def _finish(self, span):
+        if span.parent is not None:
+            span.parent.children.append(span)
+        else:
+            with self._lock:
+                self.traces.append(span)
+
+
+class OpenTelemetryTracer(object):
+    """
+    Sends the spans to OpenTelemetry. Requires the opentelemetry-api
+    package.
+
+    :param tracer: Optional. The opentelemetry.trace.Tracer to use.
+        Defaults to the tracer 'osisoftpy' of the global tracer provider.
+    """
+
+    def __init__(self, tracer=None):
+        if tracer is None:
+            from opentelemetry import trace
+            tracer = trace.get_tracer('osisoftpy')
+        self.tracer = tracer
+
+    def span(self, name, attributes):
+        # OpenTelemetry attributes can't be None
+        return self.tracer.start_as_current_span(name, attributes=dict(
+            (k, v) for k, v in attributes.items() if v is not None))
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.wal
+~~~~~~~~~~~~
+This module contains the WriteAheadLog class, a durable local queue for value
+updates which keeps them on disk until the PI Web API has accepted them.
+
+Records are appended to segment files as one JSON document per line. The
+sequence number of the last record the server accepted is kept in a separate
+ack file, which is what makes a replay after a restart skip the records that
+were already written. A record that was sent but not yet acknowledged when
+the process died is sent again. With the updateoption 'Replace' that second
+write overwrites the first one with the same value, and with 'ReplaceOnly'
+and 'NoReplace' it changes nothing, so every record ends up in the archive
+exactly once. 'Insert' and 'InsertNoCompression' would store such a record
+twice, so the log refuses updates made with them.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import io
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from osisoftpy.exceptions import HTTPError
+from osisoftpy.internal import RETRY_STATUS
+from osisoftpy.internal import post
+from osisoftpy.internal import replace_file
+
+log = logging.getLogger(__name__)
+
+_SEGMENT_SUFFIX = '.wal'
+_ACK_FILE = 'ack'
+# update options for which sending a record twice stores it once
+_IDEMPOTENT = ('replace', 'replaceonly', 'noreplace')
+
+
+class WriteAheadLog(object):
+    """
+    An append-only, segmented log of value updates.
+
+    :param string directory: Directory holding the segment files. It is
+        created if it doesn't exist.
+    :param string fsync: Optional. When to force appended records to disk.
+        'always' syncs after every append, 'interval' at most every
+        fsyncinterval seconds and 'never' leaves it to the operating system.
+        Defaults to 'always'.
+    :param float fsyncinterval: Optional. Seconds between syncs for the
+        'interval' policy. Defaults to 1 second.
+    :param int segmentsize: Optional. Size in bytes after which a new segment
+        file is started. Defaults to 16 MB.
+    """
+
+    def __init__(
+            self,
+            directory,
+            fsync='always',
+            fsyncinterval=1.0,
+            segmentsize=16 * 1024 * 1024):
+        if fsync not in ('always', 'interval', 'never'):
+            raise ValueError(
+                "fsync must be 'always', 'interval' or 'never', "
+                "not {!r}".format(fsync))
+        self.directory = directory
+        self.fsync = fsync
+        self.fsyncinterval = fsyncinterval
+        self.segmentsize = segmentsize
+        self.rejected = []
+
+        self._lock = threading.RLock()
+        self._file = None
+        self._lastsync = 0
+        self._retry = 0
+        # (first seq of the segment, byte offset) of the oldest record that
+        # may not be acknowledged yet, so reads skip the acknowledged ones
+        self._position = (0, 0)
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.acked = self._read_ack()
+        self.lastseq = self._recover()
+
+    def __len__(self):
+        return self.lastseq - self.acked
+
+    def append(self, webid, endpoint, params, body):
+        """
+        Durably stores a value update.
+
+        :param string webid: WebID of the stream the update is for.
+        :param string endpoint: 'value' or 'recorded'.
+        :param dict params: Query parameters of the update. Its updateOption
+            must be 'Replace', the default, 'ReplaceOnly' or 'NoReplace'.
+        :param body: JSON body of the update.
+        :return: The sequence number of the record.
+        :rtype: int
+        """
+        option = next((v for k, v in (params or {}).items()
+                       if k.lower() == 'updateoption'), 'Replace')
+        if str(option).lower() not in _IDEMPOTENT:
+            raise ValueError(
+                "The write-ahead log can't replay updates with updateOption "
+                "{!r} exactly once, use 'Replace', 'ReplaceOnly' or "
+                "'NoReplace'".format(option))
+        with self._lock:
+            seq = self.lastseq + 1
+            line = json.dumps(dict(seq=seq, webid=webid, endpoint=endpoint,
+                                   params=params, body=body))
+            f = self._segment_for(seq)
+            f.write(line.encode('utf-8') + b'\n')
+            f.flush()
+            if self.fsync == 'always' or (
+                    self.fsync == 'interval' and
+                    time.time() - self._lastsync >= self.fsyncinterval):
+                os.fsync(f.fileno())
+                self._lastsync = time.time()
+            self.lastseq = seq
+            return seq
+
+    def ack(self, seq):
+        """
+        Marks every record up to and including seq as written.
+
+        :param int seq: Sequence number of the last accepted record.
+        """
+        with self._lock:
+            if seq <= self.acked:
+                return
+            path = os.path.join(self.directory, _ACK_FILE)
+            tmp = path + '.tmp'
+            with io.open(tmp, 'wb') as f:
+                f.write(str(seq).encode('ascii'))
+                f.flush()
+                if self.fsync != 'never':
+                    os.fsync(f.fileno())
+            replace_file(tmp, path)
+            self.acked = seq
+
+    def pending(self):
+        """
+        Yields the records that haven't been acknowledged, oldest first.
+
+        :return: Generator of dicts with the keys seq, webid, endpoint,
+            params and body.
+        """
+        for _, _, record in self._unacked():
+            yield record
+
+    def replay(self, webapi):
+        """
+        Sends the pending records to the PI Web API in the order they were
+        appended.
+
+        Replaying stops at the first record the server can't take right now
+        (connection errors, timeouts and 408/429/5xx responses), so the order
+        of the updates is preserved for the next attempt. Records the server
+        rejects outright are acknowledged, logged and kept in the rejected
+        attribute along with the status and error, as sending them again
+        would never succeed.
+
+        :param webapi: The :class:`osisoftpy.WebAPI` to write to.
+        :return: The number of records that were written.
+        :rtype: int
+        """
+        written = 0
+        with self._lock:
+            for first, end, record in self._unacked():
+                url = '{}streams/{}/{}'.format(
+                    webapi.url, record['webid'], record['endpoint'])
+                try:
+                    post(url, webapi.session, params=record['params'],
+                         json=record['body'], webapi=webapi,
+                         retry=self._retry)
+                except (requests.exceptions.ConnectionError,
+                        requests.exceptions.Timeout) as e:
+                    log.warning('PI Web API unreachable, %s update(s) kept '
+                                'in the write-ahead log: %s', len(self), e)
+                    self._retry += 1
+                    break
+                except HTTPError as e:
+                    if e.status_code is None or e.status_code in RETRY_STATUS:
+                        log.warning('%s, %s update(s) kept in the write-ahead '
+                                    'log', e, len(self))
+                        self._retry += 1
+                        break
+                    log.error('PI Web API rejected update %s: %s',
+                              record['seq'], e)
+                    self.rejected.append(
+                        dict(record, status=e.status_code, error=str(e)))
+                else:
+                    written += 1
+                self._retry = 0
+                self.ack(record['seq'])
+                self._position = (first, end)
+            self.compact()
+        return written
+
+    def compact(self):
+        """
+        Deletes the segment files of which every record has been
+        acknowledged.
+        """
+        with self._lock:
+            segments = self._segments()
+            for (first, path), (nextfirst, _) in zip(segments, segments[1:]):
+                if nextfirst - 1 <= self.acked:
+                    if self._file and self._file.name == path:
+                        self._close()
+                    os.remove(path)
+
+    def close(self):
+        """
+        Syncs and closes the current segment file.
+        """
+        with self._lock:
+            if self._file and self.fsync != 'never':
+                os.fsync(self._file.fileno())
+            self._close()
+
+    def _unacked(self):
+        # yields (first seq of the segment, offset after the record, record)
+        # for the records after the acknowledged ones, oldest first
+        with self._lock:
+            segments = self._segments()
+            start, offset = self._position
+        for first, path in segments:
+            if first < start:
+                continue
+            for end, record in _read_segment(
+                    path, offset if first == start else 0):
+                if record['seq'] <= self.acked:
+                    with self._lock:
+                        if (first, end) > self._position:
+                            self._position = (first, end)
+                    continue
+                yield first, end, record
+
+    def _segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SEGMENT_SUFFIX):
+                segments.append((int(name[:-len(_SEGMENT_SUFFIX)]),
+                                 os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _segment_for(self, seq):
+        if self._file and self._file.tell() >= self.segmentsize:
+            self._close()
+        if not self._file:
+            segments = self._segments()
+            if segments and os.path.getsize(segments[-1][1]) < self.segmentsize:
+                path = segments[-1][1]
+            else:
+                path = os.path.join(
+                    self.directory, '{:020d}{}'.format(seq, _SEGMENT_SUFFIX))
+            self._file = io.open(path, 'ab')
+        return self._file
+
+    def _close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _read_ack(self):
+        path = os.path.join(self.directory, _ACK_FILE)
+        if not os.path.exists(path):
+            return 0
+        with io.open(path, 'rb') as f:
+            return int(f.read().decode('ascii') or 0)
+
+    def _recover(self):
+        # A crash during an append can leave a partial last line behind,
+        # which is cut off so new records start on a clean line. Every
+        # segment still on disk holds unacknowledged records, so all are
+        # read to find the last sequence number and the first pending one.
+        lastseq = self.acked
+        for first, path in self._segments():
+            good = 0
+            for end, record in _read_segment(path):
+                if record['seq'] <= self.acked:
+                    self._position = (first, end)
+                lastseq = max(lastseq, record['seq'])
+                good = end
+            if good != os.path.getsize(path):
+                log.warning('Truncating damaged write-ahead log segment %s',
+                            path)
+                with io.open(path, 'r+b') as f:
+                    f.truncate(good)
+        return lastseq
+
+
+def _read_segment(path, offset=0):
+    # yields (offset after the record, record) up to the first damaged line
+    with io.open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                return
+            try:
+                record = json.loads(line.decode('utf-8'))
+            except ValueError:
+                return
+            offset += len(line)
+            yield offset, record
@@ -21,11 +21,10 @@ Some blah blah about what this file is for...
 from __future__ import (absolute_import, division, unicode_literals)
 from future.builtins import *
 from future.utils import iteritems
-from dateutil import parser
 from datetime import datetime
 import logging
-import blinker
 import re
+from osisoftpy import tracing
 from osisoftpy.base import Base
 from osisoftpy.factory import Factory, create
 from osisoftpy.internal import get
@@ -34,6 +33,15 @@ from osisoftpy.points import Points
 from osisoftpy.element import Element
 from osisoftpy.elements import Elements
 from osisoftpy.attribute import Attribute
+from osisoftpy.writer import BufferedWriter
+from osisoftpy.wal import WriteAheadLog
+from osisoftpy.cache import ConditionalCache
+from osisoftpy.cache import RecordedCache
+from osisoftpy.cache import ResponseCache
+from osisoftpy.cache import SingleFlight
+from osisoftpy.enumeration import EnumerationCache
+from osisoftpy.metrics import PrometheusMetrics
+from osisoftpy.pitime import timestamp_key
 
 log = logging.getLogger(__name__)
 
@@ -49,6 +57,24 @@ class WebAPI(Base):
         # p = Points(list(), self)
         # self._points = p
         self.signals = {}
+        self.wal = None
+        self.recorded_cache = None
+        self.conditional_cache = None
+        self.response_cache = None
+        # concurrent identical stream reads share one request; set to None
+        # to send every read
+        self.single_flight = SingleFlight()
+        # time zone of the server, which lets time expressions such as 't'
+        # and 'y' be resolved on the client, see pitime.resolve
+        self.timezone = None
+        # enumeration sets of digital points and attributes, fetched once
+        # and shared, see Stream.enumeration_set
+        self.enumeration_sets = EnumerationCache()
+        # functions called with a RequestEvent around every HTTP request,
+        # see on_request_start and on_request_end
+        self.request_start_hooks = []
+        self.request_end_hooks = []
+        self.metrics = None
 
     def __str__(self):
         self_str = '<OSIsoft PI Web API [{}]>'
@@ -111,33 +137,32 @@ class WebAPI(Base):
         :rtype: osisoftpy.Points
         """
 
-        totalitems = 0
-        totalhits = None
-        points = Points([], self)
-
+        with tracing.span('WebAPI.points', query=query, count=count) as span:
+            found, totalhits = self._points_page(
+                query, scope, fields, count, start)
+            # ceiling division
+            expectedloop = -(-totalhits // count)
+            for x in range(1, expectedloop):
+                start += count
+                found.extend(self._points_page(
+                    query, scope, fields, count, start)[0])
+            points = Points(found, self)
+
+            [self._map_dataserver_to_point(point) for point in points]
+            span.set_attribute('pages', max(expectedloop, 1))
+            span.set_attribute('items', len(points))
+            return points
+
+    def _points_page(self, query, scope, fields, count, start):
         r = self.request(
-                query=query, scope=scope, fields=fields, count=count, start=start)
-        items = r.json().get('Items', [])
-        totalhits = r.json().get('TotalHits', 0)
-        points = Points(points.list + list([
-                create(Factory(Point), x, self.session, self)
-                for x in items if x['ItemType'] == 'pipoint'
-            ]), self)
-        # ceiling division
-        expectedloop = -(-totalhits // count)
-        for x in range(1, expectedloop):
-            start += count
-            r = self.request(
-                query=query, scope=scope, fields=fields, count=count, start=start)
-            items = r.json().get('Items', [])
-            totalhits = r.json().get('TotalHits', 0)
-            points = Points(points.list + list([
-                    create(Factory(Point), x, self.session, self)
-                    for x in items if x['ItemType'] == 'pipoint'
-                ]), self)
-
-        [self._map_dataserver_to_point(point) for point in points]
-        return points
+            query=query, scope=scope, fields=fields, count=count, start=start)
+        with tracing.span('decode', bytes=len(r.content)):
+            json = r.json()
+        items = json.get('Items', [])
+        with tracing.span('construct', items=len(items)):
+            points = [create(Factory(Point), x, self.session, self)
+                      for x in items if x['ItemType'] == 'pipoint']
+        return points, json.get('TotalHits', 0)
 
     # added default value to fields so it also returns paths and parents
     def elements(
@@ -315,7 +340,9 @@ class WebAPI(Base):
         params = dict(
             q=query, scope=scope, fields=fields, count=count, start=start)
         try:
-            r = get(url, session=self.session, params=params)
+            with tracing.span('WebAPI.request', query=query, start=start,
+                              count=count):
+                r = get(url, session=self.session, params=params, webapi=self)
             return r.response
         except Exception as e:
             raise e
@@ -331,6 +358,8 @@ class WebAPI(Base):
         :param string enddatetime: Optional – Timestamp for when to stop monitoring
         :param func callback: Reference to the function to trigger when an update occurs
         """
+        import blinker
+
         if not isinstance(points, Points):
             raise TypeError('The object "{}" is not of type "{}"'.format(
                 points, Points))
@@ -368,6 +397,200 @@ class WebAPI(Base):
                 pass
         return self.signals
 
+    def buffered_writer(
+            self,
+            maxitems=5000,
+            maxdelay=1.0,
+            updateoption='Replace',
+            bufferoption='BufferIfPossible'):
+        """Returns a write-behind buffer for value updates to this PI Web API
+        instance. Records are grouped per stream and flushed in bulk when
+        maxitems records are pending or after maxdelay seconds.
+
+        :param int maxitems: Optional. Number of buffered records that
+            triggers a flush. Defaults to 5000.
+        :param float maxdelay: Optional. Maximum number of seconds a record
+            stays in the buffer. None disables time based flushing.
+            Defaults to 1 second.
+        :param string updateoption: Optional. Indicates how to treat multiple
+            values with the same timestamp. Default is 'Replace'.
+        :param string bufferoption: Optional. Indicates how to buffer values
+            updates. Default is 'BufferIfPossible'.
+        :return: :class:`osisoftpy.writer.BufferedWriter` object
+        :rtype: osisoftpy.writer.BufferedWriter
+        """
+        return BufferedWriter(
+            self, maxitems=maxitems, maxdelay=maxdelay,
+            updateoption=updateoption, bufferoption=bufferoption)
+
+    def enable_wal(
+            self,
+            directory,
+            fsync='always',
+            fsyncinterval=1.0,
+            segmentsize=16 * 1024 * 1024):
+        """Stores every update_value and update_values call in a durable
+        local queue before it is sent, so updates made while the PI Web API
+        is unreachable are written once it is back. Updates left in the
+        directory by an earlier process are replayed right away.
+
+        While the server is unreachable the updates stay in the log without
+        raising an error; updates it rejects are raised or printed according
+        to the error_action of the call that made them.
+
+        An update may be sent twice after a crash, so only updateoption
+        'Replace', 'ReplaceOnly' and 'NoReplace' can be used while the log is
+        enabled; other options raise a ValueError.
+
+        :param string directory: Directory holding the log segments.
+        :param string fsync: Optional. When to force appended records to
+            disk: 'always', 'interval' or 'never'. Defaults to 'always'.
+        :param float fsyncinterval: Optional. Seconds between syncs for the
+            'interval' policy. Defaults to 1 second.
+        :param int segmentsize: Optional. Size in bytes after which a new
+            segment file is started. Defaults to 16 MB.
+        :return: :class:`osisoftpy.wal.WriteAheadLog` object
+        :rtype: osisoftpy.wal.WriteAheadLog
+        """
+        self.wal = WriteAheadLog(
+            directory, fsync=fsync, fsyncinterval=fsyncinterval,
+            segmentsize=segmentsize)
+        self.wal.replay(self)
+        return self.wal
+
+    def disable_wal(self):
+        """Stops queueing updates in the write-ahead log. Updates that are
+        still pending stay on disk until the log is enabled again.
+        """
+        if self.wal is not None:
+            self.wal.close()
+        self.wal = None
+
+    def enable_recorded_cache(self, maxvalues=1000000, directory=None):
+        """Keeps the recorded values of streams on the client, so repeated
+        Stream.recorded calls for the same history only request the parts
+        of the time range that weren't requested before.
+
+        :param int maxvalues: Optional. Maximum number of values held in
+            memory. Defaults to 1,000,000.
+        :param string directory: Optional. Directory to keep streams in that
+            don't fit in memory.
+        :return: :class:`osisoftpy.cache.RecordedCache` object
+        :rtype: osisoftpy.cache.RecordedCache
+        """
+        self.recorded_cache = RecordedCache(
+            maxvalues=maxvalues, directory=directory)
+        return self.recorded_cache
+
+    def disable_recorded_cache(self):
+        """Stops caching recorded values and drops the cached ones held in
+        memory.
+        """
+        self.recorded_cache = None
+
+    def enable_conditional_requests(self, maxsize=1000):
+        """Remembers the ETag and Last-Modified of GET responses and sends 
+        them along when the same url and parameters are requested again. If 
+        the server answers 304 Not Modified, the response received before is 
+        reused without transferring or parsing the body again. 
+
+        :param int maxsize: Optional. Maximum number of responses kept. 
+            Defaults to 1000.
+        :return: :class:`osisoftpy.cache.ConditionalCache` object, which 
+            counts its hits and misses.
+        :rtype: osisoftpy.cache.ConditionalCache
+        """
+        self.conditional_cache = ConditionalCache(maxsize=maxsize)
+        return self.conditional_cache
+
+    def disable_conditional_requests(self):
+        """Stops sending conditional requests and drops the kept responses.
+        """
+        self.conditional_cache = None
+
+    def enable_response_cache(self, ttl=1.0, ttls=None, maxsize=1000):
+        """Keeps GET responses for a short time, so callers in this process 
+        reading the same values, e.g. the current value of a point, shortly 
+        after each other share one request. Identical requests made at the 
+        same time by several threads are sent only once. 
+
+        :param float ttl: Optional. Seconds a response is kept. Defaults to 
+            1 second.
+        :param dict ttls: Optional. Seconds a response is kept per endpoint, 
+            the last segment of the url path, e.g. {'value': 0.5, 
+            'recorded': 0, 'assetdatabases': 300}.
+        :param int maxsize: Optional. Maximum number of responses kept. 
+            Defaults to 1000.
+        :return: :class:`osisoftpy.cache.ResponseCache` object
+        :rtype: osisoftpy.cache.ResponseCache
+        """
+        self.response_cache = ResponseCache(
+            ttl=ttl, ttls=ttls, maxsize=maxsize)
+        return self.response_cache
+
+    def disable_response_cache(self):
+        """Stops caching responses and drops the cached ones.
+        """
+        self.response_cache = None
+
+    def on_request_start(self, callback):
+        """Registers a function called before every HTTP request to the
+        PI Web API with a :class:`RequestEvent <RequestEvent>` holding the
+        method, url, endpoint template, retry count and, for batch requests,
+        the number of sub-requests. Can be used as a decorator.
+
+        :param callback: Function taking the RequestEvent.
+        :return: callback
+        """
+        self.request_start_hooks.append(callback)
+        return callback
+
+    def on_request_end(self, callback):
+        """Registers a function called after every HTTP request to the
+        PI Web API with a :class:`RequestEvent <RequestEvent>` that also
+        holds the status, the size of the response body, the seconds the
+        request took in total and until the response headers arrived, and
+        the exception for requests that raised one. Can be used as a
+        decorator.
+
+        Responses served from the response cache don't send a request and
+        aren't reported; a 304 Not Modified is.
+
+        :param callback: Function taking the RequestEvent.
+        :return: callback
+        """
+        self.request_end_hooks.append(callback)
+        return callback
+
+    def remove_request_hook(self, callback):
+        """Unregisters a function registered with on_request_start or
+        on_request_end.
+        """
+        for hooks in (self.request_start_hooks, self.request_end_hooks):
+            while callback in hooks:
+                hooks.remove(callback)
+
+    def enable_metrics(self, prefix='osisoftpy'):
+        """Counts the HTTP requests per endpoint and keeps histograms of
+        their duration, response size and batch size.
+
+        :param string prefix: Optional. Prefix of the metric names. Defaults
+            to 'osisoftpy'.
+        :return: :class:`osisoftpy.metrics.PrometheusMetrics` object, whose
+            exposition() returns the metrics in the Prometheus text format.
+        :rtype: osisoftpy.metrics.PrometheusMetrics
+        """
+        self.disable_metrics()
+        self.metrics = PrometheusMetrics(prefix=prefix).install(self)
+        return self.metrics
+
+    def disable_metrics(self):
+        """Stops collecting metrics.
+        """
+        if self.metrics is not None:
+            self.metrics.uninstall(self)
+        self.metrics = None
+
     def piservers(self):
         for dataserver in self.dataservers:
             print('pi:' + dataserver.name)
@@ -388,10 +611,5 @@ class WebAPI(Base):
         point.dataserver = next((dataserver for dataserver in self.dataservers if dataserver.id == serverid), None)
 
     def _parse_timestamp(self, datetime):
-        if datetime:
-            parseddatetime = parser.parse(datetime)
-            formatteddatetime = None if parseddatetime == None else parseddatetime.strftime('%Y%m%d%H%M%S')
-        else:  
-            formatteddatetime = None
-        return formatteddatetime
+        return timestamp_key(datetime)
     
\ No newline at end of file
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.writer
+~~~~~~~~~~~~
+This module contains the BufferedWriter class, which collects value updates
+for many streams and writes them to the PI Web API in bulk, and the helpers
+that split large updates of a single stream into separately sent chunks.
+"""
+from __future__ import (absolute_import, division, unicode_literals)
+from future.builtins import *
+
+import collections
+import json
+import logging
+import threading
+import time
+
+import requests
+
+from osisoftpy.exceptions import HTTPError
+from osisoftpy.internal import RETRY_STATUS
+from osisoftpy.internal import batch
+from osisoftpy.internal import post
+from osisoftpy.structures import ChunkResult, WriteFailure, WriteRecord
+
+log = logging.getLogger(__name__)
+
+
+class BufferedWriter(object):
+    """
+    A write-behind buffer for value updates.
+
+    Records handed to :meth:`write` are kept in memory, grouped per stream,
+    and sent when the buffer holds maxitems records or when maxdelay seconds
+    have passed, whichever comes first. A single stream is written with a
+    POST to streams/{webid}/recorded, several streams are written together
+    through the batch controller.
+
+    The writer is safe to share between threads. Call :meth:`close` (or use
+    it as a context manager) on shutdown, otherwise buffered records are lost.
+    """
+
+    def __init__(
+            self,
+            webapi,
+            maxitems=5000,
+            maxdelay=1.0,
+            updateoption='Replace',
+            bufferoption='BufferIfPossible'):
+        """
+        :param webapi: The :class:`osisoftpy.WebAPI` to write to.
+        :param int maxitems: Optional. Number of buffered records that
+            triggers a flush. Defaults to 5000.
+        :param float maxdelay: Optional. Maximum number of seconds a record
+            stays in the buffer. None disables time based flushing.
+            Defaults to 1 second.
+        :param string updateoption: Optional. Indicates how to treat multiple
+            values with the same timestamp. Default is 'Replace'.
+        :param string bufferoption: Optional. Indicates how to buffer values
+            updates. Default is 'BufferIfPossible'.
+        """
+        self.webapi = webapi
+        self.maxitems = maxitems
+        self.maxdelay = maxdelay
+        self.updateoption = updateoption
+        self.bufferoption = bufferoption
+        self.failures = []
+
+        self._pending = collections.OrderedDict()
+        self._count = 0
+        self._lock = threading.Lock()
+        self._flushlock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+
+        if maxdelay:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def write(
+            self,
+            stream,
+            timestamp,
+            value,
+            unitsabbreviation=None,
+            good=None,
+            questionable=None):
+        """
+        Adds a value update to the buffer.
+
+        :param stream: The :class:`osisoftpy.Point` or
+            :class:`osisoftpy.Attribute` to write to.
+        :param string timestamp: Timestamp of the value. datetime objects are
+            converted to ISO 8601 strings.
+        :param Any value: The value to write.
+        :param string unitsabbreviation: Optional. Unit of measure
+            abbreviation of the value.
+        :param bool good: Optional. The status indicates whether the value
+            is good or bad.
+        :param bool questionable: Optional. The status indicates whether the
+            data quality is accurate.
+        """
+        if self._closed.is_set():
+            raise ValueError('The BufferedWriter has been closed.')
+        if hasattr(timestamp, 'isoformat'):
+            timestamp = timestamp.isoformat()
+        record = WriteRecord(stream, timestamp, value, unitsabbreviation,
+                             good, questionable)
+        with self._lock:
+            self._pending.setdefault(stream.webid, []).append(record)
+            self._count += 1
+            full = self._count >= self.maxitems
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Sends all buffered records to the PI Web API.
+
+        :return: The records of this flush that could not be written, as a
+            list of :class:`WriteFailure <WriteFailure>`. Failures are also
+            collected in the failures attribute.
+        :rtype: list
+        """
+        with self._flushlock:
+            with self._lock:
+                pending, self._pending = self._pending, collections.OrderedDict()
+                self._count = 0
+            if not pending:
+                return []
+            failures = self._send(pending)
+            self.failures.extend(failures)
+        return failures
+
+    def close(self):
+        """
+        Stops the background flushing and writes the remaining records.
+
+        :return: Every failure seen during the lifetime of the writer.
+        :rtype: list
+        """
+        self._closed.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+        return self.failures
+
+    def _run(self):
+        while not self._closed.wait(self.maxdelay):
+            try:
+                self.flush()
+            except Exception:
+                log.exception('Background flush of the BufferedWriter failed')
+
+    def _send(self, pending):
+        params = {'updateOption': self.updateoption,
+                  'bufferOption': self.bufferoption}
+        for records in pending.values():
+            records[0].stream._invalidate_cache()
+
+        if len(pending) == 1:
+            webid, records = next(iter(pending.items()))
+            url = '{}streams/{}/recorded'.format(self.webapi.url, webid)
+            try:
+                post(url, self.webapi.session, params=params,
+                     json=to_items(records), webapi=self.webapi)
+            except Exception as e:
+                return [WriteFailure(r, getattr(e, 'status_code', None),
+                                     [str(e)]) for r in records]
+            return []
+
+        subrequests = {}
+        for webid, records in pending.items():
+            subrequests[webid] = dict(
+                method='POST',
+                url='{}streams/{}/recorded'.format(self.webapi.url, webid),
+                params=params,
+                json=to_items(records))
+        try:
+            results = batch(self.webapi, subrequests)
+        except Exception as e:
+            return [WriteFailure(r, None, [str(e)])
+                    for records in pending.values() for r in records]
+
+        failures = []
+        for webid, records in pending.items():
+            result = results.get(webid)
+            if result is None:
+                failures.extend(WriteFailure(r, None, ['No response'])
+                                for r in records)
+            elif (result.status is None or result.status >= 300 or
+                    result.errors):
+                failures.extend(WriteFailure(r, result.status, result.errors)
+                                for r in records)
+        return failures
+
+
+def to_items(records):
+    """
+    Returns the JSON items of a streams/recorded update for WriteRecords.
+
+    :param list records: :class:`osisoftpy.structures.WriteRecord` tuples.
+    :rtype: list
+    """
+    return [{'Timestamp': r.timestamp, 'Value': r.value,
+             'UnitsAbbreviation': r.unitsabbreviation, 'Good': r.good,
+             'Questionable': r.questionable} for r in records]
+
+
+class WriteReport(object):
+    """
+    The outcome of a chunked update_values call.
+
+    Attributes:
+        | chunks: list of :class:`ChunkResult <ChunkResult>`, one per chunk
+        | seconds: wall clock time of the whole write
+    """
+
+    def __init__(self, chunks, seconds):
+        self.chunks = chunks
+        self.seconds = seconds
+
+    def __str__(self):
+        self_str = '<OSIsoft PI Write [{} values in {} chunks, {} failed]>'
+        return self_str.format(self.values, len(self.chunks), len(self.failed))
+
+    @property
+    def values(self):
+        return sum(c.count for c in self.chunks)
+
+    @property
+    def bytes(self):
+        return sum(c.bytes for c in self.chunks)
+
+    @property
+    def failed(self):
+        """The chunks that could not be written."""
+        return [c for c in self.chunks if c.errors]
+
+    @property
+    def pending(self):
+        """The chunks kept in the write-ahead log to be sent later."""
+        return [c for c in self.chunks if c.status is None and not c.errors]
+
+    @property
+    def throughput(self):
+        """Values written per second."""
+        written = self.values - sum(
+            c.count for c in self.failed + self.pending)
+        return written / self.seconds if self.seconds else 0.0
+
+
+def _encode_items(timestamps, values, unitsabbreviation, good, questionable):
+    # Every item is serialized on its own so the chunks can be cut by size.
+    if hasattr(timestamps, 'dtype') or hasattr(values, 'dtype'):
+        return _encode_arrays(
+            timestamps, values, unitsabbreviation, good, questionable)
+    return [json.dumps({'Timestamp': timestamp, 'Value': value,
+                        'UnitsAbbreviation': unitsabbreviation, 'Good': good,
+                        'Questionable': questionable})
+            for timestamp, value in zip(timestamps, values)]
+
+
+def _encode_arrays(timestamps, values, unitsabbreviation, good, questionable):
+    # Builds the same items as _encode_items from NumPy arrays or pandas
+    # objects with vectorized string operations, without a dict per item.
+    import numpy as np
+
+    # .values turns tz-aware pandas timestamps into UTC datetime64
+    ts = np.asarray(getattr(timestamps, 'values', timestamps))
+    if ts.dtype.kind == 'M':
+        if np.isnat(ts).any():
+            raise ValueError('NaT timestamps cannot be written.')
+        unit = 'us'
+        for candidate in ('s', 'ms'):
+            if (ts.astype('datetime64[{}]'.format(candidate)) == ts).all():
+                unit = candidate
+                break
+        ts = np.datetime_as_string(ts, unit=unit, timezone='UTC')
+    else:
+        ts = np.asarray([t.isoformat() if hasattr(t, 'isoformat') else t
+                         for t in ts.tolist()], dtype=str)
+
+    vals = np.asarray(getattr(values, 'values', values))
+    if vals.dtype.kind == 'b':
+        vals = np.where(vals, 'true', 'false')
+    elif vals.dtype.kind in 'iu':
+        vals = vals.astype(str)
+    elif vals.dtype.kind == 'f':
+        if not np.isfinite(vals).all():
+            raise ValueError('NaN and infinite values cannot be written.')
+        vals = vals.astype(str)
+    else:
+        vals = np.asarray([json.dumps(v) for v in vals.tolist()], dtype=str)
+
+    suffix = ',"UnitsAbbreviation":{},"Good":{},"Questionable":{}}}'.format(
+        json.dumps(unitsabbreviation), json.dumps(good),
+        json.dumps(questionable))
+    items = np.char.add('{"Timestamp":"', ts)
+    items = np.char.add(items, '","Value":')
+    items = np.char.add(items, vals)
+    items = np.char.add(items, suffix)
+    return items.tolist()
+
+
+def _chunk(encoded, chunksize, maxbytes):
+    # Splits the encoded items into (start, stop) slices of at most chunksize
+    # items and maxbytes bytes. An item larger than maxbytes gets a chunk of
+    # its own.
+    bounds = []
+    start, size = 0, 2
+    for i, item in enumerate(encoded):
+        length = len(item) + 1
+        if i > start and (i - start >= chunksize or size + length > maxbytes):
+            bounds.append((start, i))
+            start, size = i, 2
+        size += length
+    if start < len(encoded):
+        bounds.append((start, len(encoded)))
+    return bounds
+
+
+def post_chunked(stream, endpoint, params, encoded, chunksize=10000,
+                 maxbytes=4 * 1024 * 1024, workers=1, retries=3, backoff=1.0):
+    """
+    Sends encoded value updates for one stream in chunks.
+
+    Chunks that fail with a connection error, a timeout or a 408/429/5xx
+    status are sent again on their own, the others are reported as failed.
+    If the stream's WebAPI has a write-ahead log, the chunks are queued there
+    instead. Chunks the server rejects on replay are reported as failed, and
+    chunks still kept in the log as pending, with no status.
+
+    :param stream: The :class:`osisoftpy.Point` or
+        :class:`osisoftpy.Attribute` to write to.
+    :param string endpoint: 'value' or 'recorded'.
+    :param dict params: Query parameters of the update.
+    :param list encoded: The JSON serialized items.
+    :param int chunksize: Optional. Maximum number of items per request.
+    :param int maxbytes: Optional. Maximum body size per request.
+    :param int workers: Optional. Number of chunks sent in parallel.
+    :param int retries: Optional. How often a failed chunk is sent again.
+    :param float backoff: Optional. Seconds to wait before the first retry,
+        doubled for each following one.
+    :return: :class:`WriteReport <WriteReport>` object
+    :rtype: osisoftpy.writer.WriteReport
+    """
+    url = '{}streams/{}/{}'.format(stream.webapi.url, stream.webid, endpoint)
+    wal = getattr(stream.webapi, 'wal', None)
+
+    def send(args):
+        index, (start, stop) = args
+        data = '[' + ','.join(encoded[start:stop]) + ']'
+        began = time.time()
+        status, errors = None, []
+        for attempt in range(1, retries + 2):
+            if attempt > 1:
+                time.sleep(backoff * 2 ** (attempt - 2))
+            if wal is not None:
+                seq = wal.append(
+                    stream.webid, endpoint, params, json.loads(data))
+                wal.replay(stream.webapi)
+                rejected = [r for r in wal.rejected if r['seq'] == seq]
+                if rejected:
+                    status, errors = (rejected[0]['status'],
+                                      [rejected[0]['error']])
+                elif seq <= wal.acked:
+                    status = 202
+                break
+            try:
+                r = post(url, stream.session, params=params, data=data,
+                         webapi=stream.webapi, retry=attempt - 1)
+                status, errors = r.response.status_code, []
+                break
+            except HTTPError as e:
+                status, errors = e.status_code, [str(e)]
+                if status not in RETRY_STATUS:
+                    break
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                status, errors = None, [str(e)]
+            except requests.exceptions.RequestException as e:
+                status, errors = None, [str(e)]
+                break
+        return ChunkResult(index, stop - start, len(data), status, attempt,
+                           time.time() - began, errors)
+
+    began = time.time()
+    bounds = list(enumerate(_chunk(encoded, chunksize, maxbytes)))
+    if workers > 1 and len(bounds) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(workers, len(bounds)))
+        try:
+            chunks = pool.map(send, bounds)
+        finally:
+            pool.close()
+    else:
+        chunks = list(map(send, bounds))
+    return WriteReport(chunks, time.time() - began)
@@ -34,6 +34,21 @@ def pytest_addoption(parser):
                      help="my option: travis, circle, or appveyor")
     parser.addoption("--pythonversion", action="store", default="",
                      help="my option: 2.7 to nightly build")
+    parser.addoption("--fake", action="store_true", default=False,
+                     help="run against the in-process fake PI Web API")
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "live: depends on the data of the live PI Web API, "
+                   "skipped with --fake")
+
+def pytest_collection_modifyitems(config, items):
+    if not config.getoption("--fake"):
+        return
+    live = pytest.mark.skip(reason="depends on the data of the live PI Web API")
+    for item in items:
+        if "live" in item.keywords:
+            item.add_marker(live)
 
 @pytest.fixture
 def ci(request):
@@ -105,7 +120,20 @@ def pointvalues():
 
 
 @pytest.fixture(scope='module')
-def webapi(url, authtype, username, password, verifyssl, hostname_override):
+def webapi(request, url, authtype, username, password, verifyssl,
+           hostname_override):
+    if request.config.getoption("--fake"):
+        from osisoftpy.fakeserver import FakePIWebAPI
+        # the points of a fresh fake, and the ones the insert and
+        # subscription tests write to
+        suffix = '_{}{}'.format(request.config.getoption("--ci"),
+                                request.config.getoption("--pythonversion"))
+        names = [p.name for p in FakePIWebAPI().points]
+        names.extend(['PythonInserted' + suffix,
+                      'PythonInterpolatedAtTime' + suffix,
+                      'PythonRecordedAtTime' + suffix,
+                      'PythonInserted_appveyor', 'PythonInserted_travis'])
+        return FakePIWebAPI(names, url=url).webapi()
     if usekerberos:
         return osisoftpy.webapi(
             url, authtype=authtype, verifyssl=False,
@@ -100,4 +100,18 @@ class TestAssetServer(object):
         assetserver = webapi.assetservers[0]
         assetserver.get_databases()
         assetdatabases = assetserver.assetdatabases
-        assert all(isinstance(database, AssetDatabase) for database in assetdatabases)
\ No newline at end of file
+        assert all(isinstance(database, AssetDatabase) for database in assetdatabases)
+
+    @assetdatabase_implemented
+    def test_assertserver_databases_conditional_requests(self, webapi):
+        if webapi.assetservers.__len__() == 0:
+            pytest.skip("No Asset Server(s) found")
+        cache = webapi.enable_conditional_requests()
+        try:
+            assetserver = webapi.assetservers[0]
+            first = [db.name for db in assetserver.get_databases()]
+            second = [db.name for db in assetserver.get_databases()]
+            assert first == second
+            assert cache.hits + cache.misses >= 2
+        finally:
+            webapi.disable_conditional_requests()
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_cache.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.cache` module, against the fake PI Web API.
+"""
+from multiprocessing.pool import ThreadPool
+
+import pytest
+from osisoftpy.fakeserver import FakePIWebAPI
+
+
+START, END = '2017-06-14T00:00:00Z', '2017-07-14T00:00:00Z'
+
+
+@pytest.fixture
+def fake():
+    return FakePIWebAPI(points=5, now=1500000000)
+
+
+def test_recorded_cache_reads_only_maxcount_values(fake):
+    webapi = fake.webapi()
+    point = webapi.points(query='name:sinusoid')[0]
+    expected = point.recorded(starttime=START, endtime=END, maxcount=25)
+    assert fake.counts['GET/streams/recorded'] == 1
+
+    cache = webapi.enable_recorded_cache()
+    values = point.recorded(starttime=START, endtime=END, maxcount=10)
+    assert values == expected[:10]
+    assert fake.counts['GET/streams/recorded'] == 2
+    assert len(cache) <= 11
+
+    # the first ten are cached, only the rest is read
+    values = point.recorded(starttime=START, endtime=END, maxcount=25)
+    assert values == expected
+    assert fake.counts['GET/streams/recorded'] == 3
+    assert point.recorded(starttime=START, endtime=END,
+                          maxcount=20) == expected[:20]
+    assert fake.counts['GET/streams/recorded'] == 3
+
+
+def test_recorded_cache_dump_replaces_the_file(fake, tmpdir):
+    webapi = fake.webapi()
+    point = webapi.points(query='name:sinusoid')[0]
+    cache = webapi.enable_recorded_cache(directory=str(tmpdir))
+    point.recorded(starttime=START, endtime='2017-06-14T01:00:00Z')
+    cache.save()
+    point.recorded(starttime=START, endtime='2017-06-14T02:00:00Z')
+    cache.save()
+    assert sorted(x.basename for x in tmpdir.listdir()) == [
+        '{}.json'.format(point.webid)]
+
+
+def test_points_concurrent_current_reads_agree():
+    # slow enough for the concurrent reads to overlap
+    fake = FakePIWebAPI(points=5, now=1500000000, latency=0.5)
+    webapi = fake.webapi()
+    point = webapi.points(query='name:sinusoid')[0]
+    pool = ThreadPool(10)
+    try:
+        values = pool.map(lambda i: point.current(), range(10))
+    finally:
+        pool.close()
+    assert len(set(v.timestamp for v in values)) == 1
+    assert webapi.single_flight.shared > 0
+    assert (fake.counts['GET/streams/value'] +
+            webapi.single_flight.shared == 10)
+
+
+def _statuses(webapi):
+    events = []
+    webapi.on_request_end(lambda e: events.append(e.status))
+    return events
+
+
+def test_conditional_requests_reuse_the_body_on_304(fake):
+    webapi = fake.webapi()
+    cache = webapi.enable_conditional_requests()
+    point = webapi.points(query='name:cdt158')[0]
+    statuses = _statuses(webapi)
+    point.current()
+    first = point.current_value.value
+    point.current()
+    assert statuses == [200, 304]
+    assert point.current_value.value == first
+    assert cache.hits == 1
+
+
+def test_conditional_requests_replace_the_body_on_a_new_etag(fake):
+    webapi = fake.webapi()
+    cache = webapi.enable_conditional_requests()
+    point = webapi.points(query='name:cdt158')[0]
+    point.current()
+    point.update_value('2017-07-14T02:40:00Z', 5.0)
+    statuses = _statuses(webapi)
+    point.current()
+    point.current()
+    assert statuses == [200, 304]
+    assert point.current_value.value == 5.0
+    assert cache.hits == 1
+
+
+def test_conditional_requests_evict_the_least_recently_used(fake):
+    webapi = fake.webapi()
+    cache = webapi.enable_conditional_requests(maxsize=2)
+    points = webapi.points(query='name:*')[:3]
+    statuses = _statuses(webapi)
+    for point in points:
+        point.current()
+    points[2].current()
+    points[0].current()
+    assert statuses == [200, 200, 200, 304, 200]
+    assert len(cache) == 2
+
+
+class _Clock(object):
+    # stands in for the time module of osisoftpy.cache
+
+    def __init__(self, now=1500000000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    from osisoftpy import cache
+    clock = _Clock()
+    monkeypatch.setattr(cache, 'time', clock)
+    return clock
+
+
+def test_response_cache_expires_after_the_ttl(fake, clock):
+    webapi = fake.webapi()
+    point = webapi.points(query='name:cdt158')[0]
+    cache = webapi.enable_response_cache(ttl=10)
+    point.current()
+    clock.now += 9
+    point.current()
+    assert fake.counts['GET/streams/value'] == 1
+    clock.now += 1
+    point.current()
+    assert fake.counts['GET/streams/value'] == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_response_cache_ttl_per_endpoint(fake, clock):
+    webapi = fake.webapi()
+    point = webapi.points(query='name:cdt158')[0]
+    webapi.enable_response_cache(ttl=10, ttls={'Value': 1, 'end': 0})
+    for _ in range(2):
+        point.current()
+        point.end()
+    assert fake.counts['GET/streams/value'] == 1
+    assert fake.counts['GET/streams/end'] == 2
+    clock.now += 1
+    point.current()
+    assert fake.counts['GET/streams/value'] == 2
+
+
+def test_response_cache_evicts_the_least_recently_used(fake, clock):
+    webapi = fake.webapi()
+    points = webapi.points(query='name:*')[:3]
+    cache = webapi.enable_response_cache(ttl=10, maxsize=2)
+    for point in points:
+        point.current()
+    points[2].current()
+    points[0].current()
+    assert len(cache) == 2
+    assert fake.counts['GET/streams/value'] == 4
+
+
+def test_response_cache_does_not_keep_errors(fake, clock):
+    webapi = fake.webapi()
+    point = webapi.points(query='name:cdt158')[0]
+    cache = webapi.enable_response_cache(ttl=10)
+    fake.inject(503)
+    point.current(error_action='Continue')
+    assert len(cache) == 0
+    point.current()
+    assert len(cache) == 1 and point.current_value is not None
+    assert cache.misses == 2
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_columnar.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.columnar` and `osisoftpy.parallel` modules.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from osisoftpy import columnar
+from osisoftpy.exceptions import PIWebAPIError
+from osisoftpy.fakeserver import FakePIWebAPI
+from osisoftpy.parallel import Decoder
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def fake():
+    return FakePIWebAPI(points=6, now=1500000000)
+
+
+def test_decode_items():
+    columns = columnar.decode_items([
+        {'Timestamp': '2017-07-14T02:40:00Z', 'Value': 1.5, 'Good': True},
+        {'Timestamp': '2017-07-14T02:41:00Z', 'Good': False,
+         'Value': {'Name': 'Pt Created', 'Value': 251}},
+        {'Timestamp': '2017-07-14T02:42:00Z', 'Value': 'text',
+         'Questionable': True},
+    ])
+    assert list(columns['timestamp']) == [1500000000.0, 1500000060.0,
+                                          1500000120.0]
+    assert columns['value'][0] == 1.5
+    assert np.isnan(columns['value'][1:]).all()
+    assert list(columns['state']) == [-1, 251, -1]
+    assert list(columns['good']) == [True, False, True]
+    assert list(columns['questionable']) == [False, False, True]
+
+
+def test_decode_batch_reports_failures_and_position():
+    body = json.dumps({
+        'a': {'Status': 200, 'Content': {'Items': [
+            {'Timestamp': '2017-07-14T02:40:00Z', 'Value': 1},
+            {'Timestamp': '2017-07-14T02:41:00Z', 'Value': 2},
+            {'Timestamp': '2017-07-14T02:41:00Z', 'Value': 3}]}},
+        'b': {'Status': 404, 'Content': {'Errors': ['Unknown point']}},
+    }).encode('utf-8')
+    results = columnar.decode_batch(body)
+    assert results['a'].last == '2017-07-14T02:41:00Z'
+    assert results['a'].skip == 2
+    assert results['b'].columns is None
+    assert results['b'].errors == ['Unknown point']
+
+
+@pytest.mark.parametrize('processes', [None, 2])
+def test_decoder_matches_in_process_decoding(processes):
+    body = json.dumps({'a': {'Status': 200, 'Content': {'Items': [
+        {'Timestamp': '2017-07-14T02:40:00Z', 'Value': float(i)}
+        for i in range(1000)]}}}).encode('utf-8')
+    with Decoder(processes) as decoder:
+        result = decoder.submit(body).get()['a']
+    assert result.status == 200
+    assert result.columns['value'].sum() == sum(range(1000))
+
+
+def test_decoder_releases_shared_memory_cleanly():
+    # the resource trackers warn about leaked or missing blocks at shutdown,
+    # which -W error turns into a traceback on stderr
+    pytest.importorskip('multiprocessing.shared_memory')
+    script = '\n'.join([
+        'import json',
+        'from osisoftpy.parallel import Decoder',
+        'body = json.dumps({"a": {"Status": 200, "Content": {"Items": [',
+        '    {"Timestamp": "2017-07-14T02:40:00Z", "Value": 1.0}]}}})',
+        'with Decoder(2) as decoder:',
+        '    for _ in range(3):',
+        '        decoder.submit(body.encode("utf-8")).get()',
+    ])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    process = subprocess.Popen(
+        [sys.executable, '-W', 'error::UserWarning', '-c', script],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    out, err = process.communicate()
+    assert process.returncode == 0
+    assert err.decode('utf-8', 'replace') == ''
+
+
+@pytest.mark.parametrize('processes', [None, 2])
+def test_recorded_columns_matches_recorded(fake, processes):
+    points = fake.webapi().points(query='name:*')
+    columns = points.recorded_columns(starttime='*-2h', endtime='*',
+                                      maxcount=25, chunksize=4,
+                                      processes=processes)
+    for point in points:
+        values = point.recorded(starttime='*-2h', endtime='*')
+        assert len(columns[point]['timestamp']) == len(values) == 121
+        assert list(columns[point]['value']) == [v.value for v in values]
+    # 121 values per point, 25 at a time, and the recorded() calls
+    assert fake.counts['GET/streams/recorded'] == 6 * 5 + 6
+
+
+def test_recorded_columns_error_action(fake):
+    points = fake.webapi().points(query='name:*')
+    points[0].webid = 'FAKEP99999999'
+    with pytest.raises(PIWebAPIError):
+        points.recorded_columns(starttime='*-1h')
+    columns = points.recorded_columns(starttime='*-1h',
+                                      error_action='Continue')
+    assert len(columns[points[0]]['timestamp']) == 0
+    assert len(columns[points[1]]['timestamp']) == 61
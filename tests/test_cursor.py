@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_cursor.py
+~~~~~~~~~~~~
+Tests for recorded_since and the `osisoftpy.cursor` module, against the fake
+PI Web API.
+"""
+import pytest
+from osisoftpy.fakeserver import FakePIWebAPI
+
+
+@pytest.fixture
+def fake():
+    # values every minute, the last one at now
+    return FakePIWebAPI(points=5, now=1500000000)
+
+
+def test_point_recorded_since_empty_first_read_keeps_starttime(fake):
+    point = fake.webapi().points(query='name:sinusoid')[0]
+    values, cursor = point.recorded_since(starttime='*-30s',
+                                          endtime='*-10s')
+    assert values == []
+    assert cursor.timestamp == '*-30s'
+    values, cursor = point.recorded_since(cursor, endtime='*-10s')
+    assert values == []
+
+
+def test_point_recorded_since_continues_after_cursor(fake):
+    point = fake.webapi().points(query='name:sinusoid')[0]
+    values, cursor = point.recorded_since(starttime='*-150s',
+                                          endtime='*-1m')
+    assert len(values) == 2
+    assert cursor.timestamp == values[-1].timestamp
+    values, cursor = point.recorded_since(cursor)
+    assert [v.timestamp for v in values] == ['2017-07-14T02:40:00Z']
+
+
+def test_points_recorded_since_empty_first_read_keeps_starttime(fake):
+    points = fake.webapi().points(query='name:sinusoid OR name:cdt158')
+    values, cursors = points.recorded_since(starttime='*-30s',
+                                            endtime='*-10s')
+    assert all(v == [] for v in values.values())
+    assert all(c.timestamp == '*-30s' for c in cursors.values())
+    values, cursors = points.recorded_since(cursors, endtime='*-10s')
+    assert all(v == [] for v in values.values())
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_decimate.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.decimate` module.
+"""
+import pytest
+from osisoftpy.decimate import decimate, lttb, minmax
+
+np = pytest.importorskip('numpy')
+
+
+def test_minmax_keeps_first_last_lowest_and_highest_per_bucket():
+    times = np.arange(100, dtype='float64')
+    values = np.sin(times / 3.0)
+    keep = minmax(times, values, 10)
+    assert 20 < len(keep) <= 4 * 10
+    bucket = np.minimum((times / 99.0 * 10).astype('int64'), 9)
+    for b in range(10):
+        inside = np.flatnonzero(bucket == b)
+        kept = set(keep.tolist())
+        assert inside[0] in kept and inside[-1] in kept
+        assert inside[np.argmin(values[inside])] in kept
+        assert inside[np.argmax(values[inside])] in kept
+
+
+def test_minmax_keeps_short_series():
+    assert list(minmax(range(40), range(40), 10)) == list(range(40))
+    assert list(minmax([5.0] * 50, range(50), 10)) == [0, 49]
+
+
+def test_lttb_keeps_one_value_per_pixel():
+    times = np.arange(100, dtype='float64')
+    keep = lttb(times, np.sin(times / 3.0), 10)
+    assert len(keep) == 10
+    assert keep[0] == 0 and keep[-1] == 99
+
+
+def test_decimate_keeps_bad_values():
+    items = [{'Value': float(i), 'Good': True} for i in range(100)]
+    items[50] = {'Value': {'Name': 'I/O Timeout', 'Value': 246},
+                 'Good': False}
+    kept = decimate(list(range(100)), items, 5)
+    assert items[50] in kept
+    assert kept[0] is items[0] and kept[-1] is items[-1]
+    with pytest.raises(ValueError):
+        decimate(list(range(100)), items, 5, method='average')
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_enumeration.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.enumeration` module and Stream.enumeration_set.
+"""
+import pytest
+from osisoftpy.enumeration import EnumerationSet, changed
+from osisoftpy.fakeserver import FakePIWebAPI
+
+START, END = '2017-07-14T02:00:00Z', '2017-07-14T02:05:00Z'
+
+
+@pytest.fixture
+def fake():
+    return FakePIWebAPI(points=2, digital=2, now=1500000000)
+
+
+def test_enumeration_set_is_fetched_once(fake):
+    webapi = fake.webapi()
+    sinusoid, _, first, second = webapi.points(query='name:*')
+
+    modes = first.enumeration_set()
+    assert modes.name == 'Modes'
+    assert modes.states == {0: 'Off', 1: 'Starting', 2: 'On', 3: 'Stopping'}
+    assert first.enumeration_set() is modes
+    assert second.enumeration_set() is modes
+    assert sinusoid.enumeration_set() is None
+
+    assert webapi.enumeration_sets.fetches == 1
+    assert fake.counts['GET/enumerationsets/enumerationvalues'] == 1
+    assert fake.counts['GET/points/attributes'] == 3
+
+
+def test_enumeration_set_lookups():
+    modes = EnumerationSet.from_items('Modes', [
+        {'Name': 'Off', 'Value': 0}, {'Name': 'On', 'Value': 1}])
+    assert modes.name_of(1) == 'On'
+    assert modes.code_of('Off') == 0
+    assert modes.names([1, -1, 0]) == ['On', None, 'Off']
+    assert 1 in modes and 2 not in modes
+
+
+def test_changed_compares_codes():
+    off = {'Name': 'Off', 'Value': 0, 'IsSystem': False}
+    assert not changed(off, dict(off))
+    assert changed(off, {'Name': 'On', 'Value': 1, 'IsSystem': False})
+    assert changed(1.0, 2.0)
+    assert not changed(1.0, 1.0)
+
+
+def test_changed_between_numbers_and_system_states():
+    timeout = {'Name': 'I/O Timeout', 'Value': 246, 'IsSystem': True}
+    assert changed(246.0, timeout)
+    assert changed(timeout, 246.0)
+    assert changed(timeout, {'Name': 'Fault', 'Value': 246,
+                             'IsSystem': False})
+    assert not changed(timeout, dict(timeout, Name='E/S Timeout'))
+
+
+def test_digital_values_are_coded_in_columns(fake):
+    np = pytest.importorskip('numpy')
+    points = fake.webapi().points(query='name:digital*')
+    columns = points.recorded_columns(starttime=START, endtime=END)
+    state = columns[points[0]]['state']
+    assert state.dtype == np.int32
+    modes = points[0].enumeration_set()
+    assert modes.names(state) == [
+        v.value['Name'] for v in points[0].recorded(starttime=START,
+                                                    endtime=END)]
+
+
+def test_frames_use_the_whole_set(fake):
+    pytest.importorskip('pandas')
+    points = fake.webapi().points(query='name:digital*')
+    seen = points[0].to_series(starttime=START, endtime=END)
+    assert len(seen.cat.categories) < 4
+    full = points[0].to_series(starttime=START, endtime=END,
+                               enumeration=True)
+    assert list(full.cat.categories) == ['Off', 'Starting', 'On', 'Stopping']
+    assert list(full) == list(seen)
+
+    frame = points.to_frame(starttime=START, endtime=END, layout='long',
+                            enumeration=True)
+    assert list(frame['state'].cat.categories) == [
+        'Off', 'Starting', 'On', 'Stopping']
+
+
+def test_frames_keep_system_states_with_the_set(fake):
+    pytest.importorskip('pandas')
+    points = fake.webapi().points(query='name:digital*')
+    fake.point('digital000000').write({
+        'Timestamp': '2017-07-14T02:02:30Z', 'Good': False,
+        'Value': {'Name': 'I/O Timeout', 'Value': 246, 'IsSystem': True}})
+    full = points[0].to_series(starttime=START, endtime=END,
+                               enumeration=True)
+    assert list(full.cat.categories) == [
+        'Off', 'Starting', 'On', 'Stopping', 'I/O Timeout']
+    assert full.notnull().all()
+    assert 'I/O Timeout' in list(full)
+
+    frame = points.to_frame(starttime=START, endtime=END, layout='long',
+                            enumeration=True)
+    assert 'I/O Timeout' in list(frame['state'])
+    assert frame['state'].notnull().all()
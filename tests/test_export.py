@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_export.py
+~~~~~~~~~~~~
+Tests for Points.export and the `osisoftpy.export` module.
+"""
+import csv
+import io
+import json
+
+import pytest
+from osisoftpy.fakeserver import FakePIWebAPI
+
+pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def points():
+    return FakePIWebAPI(points=5, now=1500000000).webapi().points(
+        query='name:*')
+
+
+def test_export_parquet_row_groups(tmpdir, points):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmpdir.join('recorded.parquet'))
+    rows = points.export(path, starttime='*-1h', maxcount=20, chunksize=2)
+    assert rows == 5 * 61
+
+    f = pq.ParquetFile(path)
+    # a row group per batch request: 4 pages of each point, 2 per batch
+    assert f.metadata.num_row_groups == 5 * 4 // 2
+    assert f.metadata.num_rows == rows
+    meta = json.loads(f.schema_arrow.metadata[b'osisoftpy.points'])
+    assert [m['name'] for m in meta] == [p.name for p in points]
+    assert meta[0]['datatype'] == 'Float32'
+
+    table = f.read().to_pandas()
+    sinusoid = table[table['name'] == 'sinusoid']
+    values = points[0].recorded(starttime='*-1h')
+    assert list(sinusoid['value']) == [v.value for v in values]
+    assert str(sinusoid['timestamp'].iloc[0]) == '2017-07-14 01:40:00+00:00'
+
+
+def test_export_arrow(tmpdir, points):
+    pa = pytest.importorskip('pyarrow')
+    path = str(tmpdir.join('recorded.arrow'))
+    points.export(path, starttime='*-1h', format='arrow', maxcount=30)
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.num_rows == 5 * 61
+    assert table.schema.field('webid').type == pa.dictionary(
+        pa.int32(), pa.string())
+
+
+def test_export_csv(tmpdir, points):
+    path = str(tmpdir.join('recorded.csv'))
+    assert points.export(path, starttime='*-10m', format='csv') == 5 * 11
+    with io.open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['name', 'webid', 'timestamp', 'value', 'state',
+                       'good', 'questionable']
+    assert rows[1][:3] == ['sinusoid', points[0].webid,
+                           '2017-07-14T02:30:00Z']
+    assert rows[1][4] == ''
+
+
+def test_export_rejects_unknown_kind_and_format(tmpdir, points):
+    with pytest.raises(ValueError):
+        points.export(str(tmpdir.join('x')), kind='interpolated')
+    with pytest.raises(ValueError):
+        points.export(str(tmpdir.join('x')), format='xlsx')
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_fakeserver.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.fakeserver` module.
+"""
+import pytest
+from osisoftpy.exceptions import HTTPError
+from osisoftpy.fakeserver import FakePIWebAPI
+
+
+@pytest.fixture
+def fake():
+    return FakePIWebAPI(points=25, now=1500000000)
+
+
+def test_fake_search_pages_through_points(fake):
+    webapi = fake.webapi()
+    points = webapi.points(query='name:fake*', count=5)
+    assert len(points) == 22
+    assert fake.counts['GET/search/query'] == 5
+    names = webapi.points(query='name:sinusoid OR name:cdt158')
+    assert sorted(p.name for p in names) == ['cdt158', 'sinusoid']
+
+
+def test_fake_values_are_deterministic(fake):
+    other = FakePIWebAPI(points=25, now=1500000000)
+    first = fake.webapi().points(query='name:sinusoid')[0]
+    second = other.webapi().points(query='name:sinusoid')[0]
+    a = first.recorded(starttime='*-1h', endtime='*')
+    b = second.recorded(starttime='*-1h', endtime='*')
+    assert len(a) == 61
+    assert [v.value for v in a] == [v.value for v in b]
+
+
+def test_fake_keeps_written_values(fake):
+    point = fake.webapi().points(query='name:cdt158')[0]
+    point.update_value('2017-07-14T02:39:30Z', 42.0)
+    values = point.recorded(starttime='2017-07-14T02:39:00Z',
+                            endtime='2017-07-14T02:40:00Z')
+    assert [v.value for v in values][1] == 42.0
+    assert len(values) == 3
+
+
+def test_fake_update_values_from_series(fake):
+    pd = pytest.importorskip('pandas')
+    point = fake.webapi().points(query='name:cdt158')[0]
+    series = pd.Series([1.0, 2.0], index=pd.to_datetime(
+        ['2017-07-14T02:39:10Z', '2017-07-14T02:39:20Z']))
+    point.update_values(series)
+    assert sorted(v['Value'] for v in fake.point('cdt158').written.values()) \
+        == [1.0, 2.0]
+    # a list has an index method, but isn't a Series
+    with pytest.raises(TypeError):
+        point.update_values(['2017-07-14T02:39:30Z'])
+
+
+def test_fake_batch_current(fake):
+    points = fake.webapi().points(query='name:*', count=25)
+    points.current()
+    assert all(p.current_value is not None for p in points)
+    assert fake.counts['POST/batch'] == 1
+    assert fake.counts['GET/streams/value'] == 25
+
+
+def test_fake_injected_errors(fake):
+    point = fake.webapi().points(query='name:sinusoid')[0]
+    fake.inject(503)
+    with pytest.raises(HTTPError):
+        point.current()
+    assert point.current() is not None
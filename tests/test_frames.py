@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_frames.py
+~~~~~~~~~~~~
+Tests for Stream.to_series, Points.to_frame and the `osisoftpy.frames`
+module.
+"""
+import pytest
+from osisoftpy import columnar, frames
+from osisoftpy.fakeserver import FakePIWebAPI
+
+pd = pytest.importorskip('pandas')
+
+START, END = '2017-07-14T02:00:00Z', '2017-07-14T02:10:00Z'
+
+
+@pytest.fixture
+def points():
+    return FakePIWebAPI(points=3, now=1500000000).webapi().points(
+        query='name:*')
+
+
+def _digital(*states):
+    return columnar.decode_items([
+        {'Timestamp': '2017-07-14T02:0{}:00Z'.format(i),
+         'Value': {'Name': name, 'Value': code}}
+        for i, (code, name) in enumerate(states)])
+
+
+def test_to_series_matches_recorded(points):
+    point = points[0]
+    series = point.to_series(starttime=START, endtime=END)
+    values = point.recorded(starttime=START, endtime=END)
+    assert list(series) == [v.value for v in values]
+    assert str(series.index.tz) == 'UTC'
+    assert series.index[0] == pd.Timestamp(START)
+    assert series.name == 'sinusoid'
+
+    local = point.to_series(kind='interpolated', starttime=START,
+                            endtime=END, interval='5m', tz='Europe/Amsterdam')
+    assert len(local) == 3
+    assert local.index[0].hour == 4
+
+
+def test_to_frame_wide_aligns_points(points):
+    frame = points.to_frame(starttime=START, endtime=END, maxcount=4)
+    assert list(frame.columns) == ['sinusoid', 'sinusoidu', 'cdt158']
+    assert len(frame) == 11
+    assert list(frame['cdt158']) == [
+        v.value for v in points[2].recorded(starttime=START, endtime=END)]
+
+
+def test_to_frame_long(points):
+    frame = points.to_frame(kind='interpolated', starttime=START,
+                            endtime=END, interval='5m', layout='long')
+    assert list(frame.columns) == ['point', 'timestamp', 'value', 'state',
+                                   'good', 'questionable']
+    assert len(frame) == 9
+    assert frame['point'].dtype == 'category'
+    assert list(frame['point'].cat.categories) == ['sinusoid', 'sinusoidu',
+                                                    'cdt158']
+    assert frame['state'].isnull().all()
+
+
+def test_digital_states_are_categorical():
+    columns = _digital((0, 'Off'), (1, 'On'), (0, 'Off'))
+    states = {0: 'Off', 1: 'On'}
+    series = frames.series(columns, states, 'valve')
+    assert series.dtype == 'category'
+    assert list(series) == ['Off', 'On', 'Off']
+
+    other = _digital((2, 'Fault'), (1, 'On'))
+    frame = frames.long([('valve', columns, states),
+                         ('pump', other, {1: 'On', 2: 'Fault'})])
+    assert list(frame['state'].cat.categories) == ['Off', 'On', 'Fault']
+    assert list(frame['state']) == ['Off', 'On', 'Off', 'Fault', 'On']
+
+    wide = frames.wide([('valve', columns, states),
+                        ('pump', other, {1: 'On', 2: 'Fault'})])
+    assert wide['pump'].dtype == 'category'
+    assert wide['pump'].isnull().sum() == 1
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_import.py
+~~~~~~~~~~~~
+Tests that importing osisoftpy has no side effects.
+"""
+import subprocess
+import sys
+
+PROBE = '''
+import logging, sys
+import osisoftpy
+log = logging.getLogger('osisoftpy')
+print(' '.join(m for m in ('requests_kerberos', 'blinker', 'dateutil',
+                           'numpy', 'pandas', 'pyarrow',
+                           'multiprocessing.pool',
+                           'multiprocessing.shared_memory')
+               if m in sys.modules))
+print(' '.join(type(h).__name__ for h in log.handlers))
+print(log.level, logging.getLogger('requests_kerberos').level)
+'''
+
+
+def test_import_is_lazy_and_leaves_logging_alone():
+    out = subprocess.check_output([sys.executable, '-c', PROBE])
+    modules, handlers, levels = out.decode('utf-8').splitlines()[-3:]
+    assert modules == ''
+    assert handlers == 'NullHandler'
+    assert levels == '0 0'
+
+
+def test_pitime_without_dateutil():
+    from osisoftpy import pitime
+    dt = pitime.parse_timestamp('2017-06-01T02:00:00+02:00')
+    assert dt.utcoffset().total_seconds() == 7200
+    assert pitime.to_epoch(dt) == 1496275200
+    assert pitime.parse_timestamp('2017-06-01T00:00:00Z').tzinfo == pitime.UTC
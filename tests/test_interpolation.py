@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_interpolation.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.interpolation` module. The expected values are
+worked out by hand from the recorded values below.
+"""
+import pytest
+from osisoftpy.cache import RecordedCache
+from osisoftpy.interpolation import interpolate, interpolate_cached, targets
+
+pytest.importorskip('numpy')
+
+T = 1500000000
+IO_TIMEOUT = {'Name': 'I/O Timeout', 'Value': 246, 'IsSystem': True}
+
+
+def _item(seconds, value, good=True, questionable=False):
+    return {'Timestamp': '2017-07-14T02:{:02d}:{:02d}Z'.format(
+                40 + seconds // 60, seconds % 60),
+            'Value': value, 'UnitsAbbreviation': 'm', 'Good': good,
+            'Questionable': questionable, 'Substituted': False}
+
+
+# recorded values, at T plus the seconds
+RECORDED = [
+    _item(0, 10.0),
+    _item(60, 20.0),
+    _item(120, IO_TIMEOUT, good=False),
+    _item(180, 40.0, questionable=True),
+    _item(240, 50),
+    _item(300, 61),
+]
+TIMES = [T + 60 * i for i in range(len(RECORDED))]
+
+
+def _at(*seconds):
+    return [T + s for s in seconds]
+
+
+def test_targets_include_end_on_the_interval():
+    assert list(targets(T, T + 300, 60)) == _at(0, 60, 120, 180, 240, 300)
+    assert list(targets(T, T + 100, 30)) == _at(0, 30, 60, 90)
+    assert list(targets(T, T, 60)) == _at(0)
+
+
+def test_interpolate_linear_between_good_values():
+    result = interpolate(TIMES, RECORDED, _at(30, 45))
+    assert [x['Value'] for x in result] == [15.0, 17.5]
+    assert [x['Timestamp'] for x in result] == [
+        '2017-07-14T02:40:30Z', '2017-07-14T02:40:45Z']
+    assert all(x['Good'] and not x['Questionable'] for x in result)
+    assert result[0]['UnitsAbbreviation'] == 'm'
+
+
+def test_interpolate_step_takes_the_value_before():
+    result = interpolate(TIMES, RECORDED, _at(30, 59, 60), step=True)
+    assert [x['Value'] for x in result] == [10.0, 10.0, 20.0]
+
+
+def test_interpolate_at_recorded_times_returns_them():
+    result = interpolate(TIMES, RECORDED, _at(0, 60, 120, 300))
+    assert [x['Value'] for x in result] == [10.0, 20.0, IO_TIMEOUT, 61]
+    assert [x['Good'] for x in result] == [True, True, False, True]
+
+
+def test_interpolate_next_to_bad_values():
+    # before a bad value the good one is held, after it the bad one is
+    result = interpolate(TIMES, RECORDED, _at(90, 150))
+    assert result[0]['Value'] == 20.0 and result[0]['Good']
+    assert result[1]['Value'] == IO_TIMEOUT and not result[1]['Good']
+
+
+def test_interpolate_questionable_neighbours():
+    # 40.0 + (50 - 40.0) * 30 / 60
+    result = interpolate(TIMES, RECORDED, _at(210))
+    assert result[0]['Value'] == 45.0
+    assert result[0]['Questionable']
+
+
+def test_interpolate_integers_are_rounded():
+    # 50 + 11 * 10 / 60 = 51.83
+    result = interpolate(TIMES, RECORDED, _at(250))
+    assert result[0]['Value'] == 52
+    assert isinstance(result[0]['Value'], int)
+
+
+def test_interpolate_boundaries():
+    # after the last value it is held, before the first there is none
+    assert interpolate(TIMES, RECORDED, _at(330))[0]['Value'] == 61
+    with pytest.raises(ValueError):
+        interpolate(TIMES, RECORDED, _at(-1))
+    with pytest.raises(ValueError):
+        interpolate([], [], _at(0))
+
+
+def test_interpolate_cached_needs_values_around_the_times():
+    cache = RecordedCache()
+    cache.add('w', T, T + 300, TIMES, RECORDED)
+    result = interpolate_cached(cache, 'w', _at(30, 300))
+    assert [x['Value'] for x in result] == [15.0, 61]
+    assert interpolate_cached(cache, 'w', []) == []
+    # outside the cached range
+    assert interpolate_cached(cache, 'w', _at(-30)) is None
+    assert interpolate_cached(cache, 'w', _at(330)) is None
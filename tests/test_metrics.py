@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_metrics.py
+~~~~~~~~~~~~
+Tests for the request hooks and the `osisoftpy.metrics` module.
+"""
+import pytest
+from osisoftpy.fakeserver import FakePIWebAPI
+from osisoftpy.internal import url_template
+
+
+@pytest.mark.parametrize('url, template', [
+    ('https://pi/piwebapi/streams/P0abc-DEF/recorded', 'streams/{webid}/recorded'),
+    ('https://pi/piwebapi/points/P0abc/attributes', 'points/{webid}/attributes'),
+    ('https://pi/piwebapi/streamsets/value?webId=P0abc', 'streamsets/value'),
+    ('https://pi/piwebapi/batch/', 'batch'),
+])
+def test_url_template(url, template):
+    assert url_template(url, 'https://pi/piwebapi/') == template
+
+
+def test_request_hooks_see_every_request():
+    fake = FakePIWebAPI(points=10)
+    webapi = fake.webapi()
+    started, ended = [], []
+    webapi.on_request_start(started.append)
+    webapi.on_request_end(ended.append)
+    points = webapi.points(query='name:*', count=10)
+    points.current()
+    assert [e.template for e in ended] == ['search/query', 'batch']
+    assert len(started) == 2
+    assert ended[1].subrequests == 10
+    assert ended[1].status == 207
+    assert ended[1].bytes > 0
+    webapi.remove_request_hook(ended.append)
+    points.current()
+    assert len(ended) == 2
+    assert len(started) == 3
+
+
+def test_failing_hook_does_not_fail_request():
+    webapi = FakePIWebAPI(points=3).webapi()
+
+    @webapi.on_request_end
+    def broken(event):
+        raise RuntimeError
+
+    assert len(webapi.points(query='name:*')) == 3
+
+
+def test_prometheus_metrics():
+    fake = FakePIWebAPI(points=3)
+    webapi = fake.webapi()
+    metrics = webapi.enable_metrics()
+    point = webapi.points(query='name:sinusoid')[0]
+    point.current()
+    fake.inject(503)
+    with pytest.raises(Exception):
+        point.current()
+    text = metrics.exposition()
+    assert ('osisoftpy_requests_total{method="GET",'
+            'endpoint="streams/{webid}/value",status="200"} 1') in text
+    assert ('osisoftpy_requests_total{method="GET",'
+            'endpoint="streams/{webid}/value",status="503"} 1') in text
+    assert ('osisoftpy_request_duration_seconds_count{method="GET",'
+            'endpoint="streams/{webid}/value"} 2') in text
+    webapi.disable_metrics()
+    assert webapi.request_end_hooks == []
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_pitime.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.pitime` module.
+"""
+import pytest
+from dateutil import parser
+from osisoftpy import pitime
+
+
+@pytest.mark.parametrize('timestamp', [
+    '2017-06-01T00:00:00Z',
+    '2017-06-01T00:00:00.5Z',
+    '2017-06-01T00:00:00.1234567Z',
+    '2017-06-01T02:00:00+02:00',
+    '2017-06-01T00:00:00',
+    'June 1 2017 10:00',
+])
+def test_parse_timestamp_matches_dateutil(timestamp):
+    expected = parser.parse(timestamp)
+    assert pitime.parse_timestamp(timestamp) == expected
+    assert pitime.timestamp_key(timestamp) == expected.strftime('%Y%m%d%H%M%S')
+
+
+@pytest.mark.parametrize('timestamp', [
+    '2017-06-01T00:00:00.25Z',
+    '2017-06-01T02:00:00+02:00',
+])
+def test_parse_epoch_and_timestamps_agree(timestamp):
+    numpy = pytest.importorskip('numpy')
+    expected = pitime.to_epoch(parser.parse(timestamp))
+    assert pitime.parse_epoch(timestamp) == expected
+    parsed = pitime.parse_timestamps([timestamp])
+    assert parsed.astype('int64')[0] == int(round(expected * 1e6)) * 1000
+
+
+@pytest.mark.parametrize('timespan, seconds', [
+    ('1h', 3600),
+    ('30m', 1800),
+    ('1.5 days', 129600),
+])
+def test_parse_timespan(timespan, seconds):
+    assert pitime.parse_timespan(timespan) == seconds
+
+
+# Wednesday 2017-06-14 15:30 UTC
+NOW = 1497454200
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('*', '2017-06-14T15:30:00Z'),
+    ('*-1d', '2017-06-13T15:30:00Z'),
+    ('*-1d+2h', '2017-06-13T17:30:00Z'),
+    ('*-1mo', '2017-05-14T15:30:00Z'),
+    ('-2h', '2017-06-14T13:30:00Z'),
+    ('2017-06-01T00:00:00Z-1h', '2017-05-31T23:00:00Z'),
+    ('t', None),
+    ('2017-06-01', None),
+])
+def test_resolve_without_timezone(expression, expected):
+    seconds = pitime.resolve(expression, NOW)
+    assert (seconds and pitime.format_epoch(seconds)) == expected
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('t', '2017-06-13T22:00:00Z'),
+    ('t+8h', '2017-06-14T06:00:00Z'),
+    ('y', '2017-06-12T22:00:00Z'),
+    ('mon', '2017-06-11T22:00:00Z'),
+    ('sunday+6h', '2017-06-11T04:00:00Z'),
+    ('2017-06-01', '2017-05-31T22:00:00Z'),
+])
+def test_resolve_with_timezone(expression, expected):
+    seconds = pitime.resolve(expression, NOW, tzinfo='Europe/Amsterdam')
+    assert pitime.format_epoch(seconds) == expected
+
+
+def test_resolve_end_relative_to_start():
+    start = pitime.resolve('*-1d', NOW)
+    assert pitime.resolve('+1h', NOW, relative_to=start) == start + 3600
+
+
+@pytest.mark.parametrize('timespan, seconds', [
+    ('1h30m', 5400),
+    ('01:30:00', 5400),
+    ('1.02:00:00', 93600),
+    ('1mo', None),
+    ('pump', None),
+])
+def test_parse_compound_timespan(timespan, seconds):
+    assert pitime.parse_timespan(timespan) == seconds
+
+
+def test_steps_by_month_keep_day_of_month():
+    start = pitime.resolve('2017-01-31T00:00:00Z')
+    end = pitime.resolve('2017-04-30T00:00:00Z')
+    assert [pitime.format_epoch(t) for t in pitime.steps(start, end, '1mo')] == [
+        '2017-01-31T00:00:00Z', '2017-02-28T00:00:00Z',
+        '2017-03-31T00:00:00Z', '2017-04-30T00:00:00Z']
@@ -200,4 +200,112 @@ def test_webapi_dispalys_dataserver_helper(
 ):
     webapi.piservers()
     out, err = capfd.readouterr()
-    assert 'pi:' in out
\ No newline at end of file
+    assert 'pi:' in out
+
+
+@pytest.mark.parametrize('query', ['name:sinusoid'])
+@pytest.mark.parametrize('params', [
+    {'starttime': '2017-10-01T00:00:00Z', 'endtime': '2017-10-02T00:00:00Z'},
+    {'starttime': '2017-10-01T12:00:00Z', 'endtime': '2017-10-03T00:00:00Z'},
+])
+def test_points_recorded_cache_matches_server(webapi, query, params):
+    points = webapi.points(query=query, count=1)
+    expected = [point.recorded(**params) for point in points]
+    cache = webapi.enable_recorded_cache()
+    try:
+        for point, values in zip(points, expected):
+            assert point.recorded(**params) == values
+            assert point.recorded(**params) == values
+        assert cache.hits >= len(points)
+    finally:
+        webapi.disable_recorded_cache()
+
+@pytest.mark.parametrize('query', ['name:sinusoid'])
+def test_points_recorded_since_does_not_repeat_values(webapi, query):
+    points = webapi.points(query=query, count=1)
+    for point in points:
+        values, cursor = point.recorded_since(starttime='*-1d', maxcount=10)
+        assert len(values) == 10
+        more, cursor = point.recorded_since(cursor, maxcount=10)
+        assert more[0].timestamp >= values[-1].timestamp
+        assert all(v not in values for v in more)
+    values, cursors = points.recorded_since(starttime='*-1d', maxcount=10)
+    restored = osisoftpy.cursor.loads(osisoftpy.cursor.dumps(cursors))
+    assert restored == cursors
+
+@pytest.mark.parametrize('query', ['name:sinusoid'])
+def test_points_current_shares_cached_response(webapi, query):
+    points = webapi.points(query=query, count=1)
+    cache = webapi.enable_response_cache(ttl=60)
+    try:
+        for point in points:
+            first = point.current()
+            assert point.current() == first
+        assert cache.hits >= len(points)
+    finally:
+        webapi.disable_response_cache()
+
+@pytest.mark.parametrize('query', ['name:sinusoid', 'name:cdt158'])
+@pytest.mark.parametrize('params', [
+    {'starttime': '2017-10-01T06:00:00Z', 'endtime': '2017-10-01T18:00:00Z', 'interval': '1h'},
+    {'starttime': '2017-10-01T06:00:00Z', 'endtime': '2017-10-01T07:00:00Z', 'interval': '7m'},
+])
+def test_points_cached_interpolated_matches_server(webapi, query, params):
+    points = webapi.points(query=query, count=1)
+    expected = [point.interpolated(**params) for point in points]
+    cache = webapi.enable_recorded_cache()
+    try:
+        for point, values in zip(points, expected):
+            point.recorded('2017-09-30T00:00:00Z', '2017-10-03T00:00:00Z')
+            hits = cache.hits
+            local = point.interpolated(**params)
+            assert cache.hits == hits + 1
+            assert [v.timestamp for v in local] == [v.timestamp for v in values]
+            for a, b in zip(local, values):
+                assert a.good == b.good
+                if isinstance(b.value, float):
+                    assert a.value == pytest.approx(b.value)
+                else:
+                    assert a.value == b.value
+    finally:
+        webapi.disable_recorded_cache()
+
+@pytest.mark.parametrize('query', ['name:sinusoid', 'name:cdt158'])
+@pytest.mark.parametrize('params', [
+    {'summarytype': ['Average', 'Minimum', 'Maximum', 'Count', 'PercentGood']},
+    {'summarytype': ['Average', 'Count'], 'calculationbasis': 'EventWeighted'},
+    {'summarytype': 'Average', 'summaryduration': '6h'},
+])
+def test_points_cached_summary_matches_server(webapi, query, params):
+    params = dict(params, starttime='2017-10-01T00:00:00Z',
+                  endtime='2017-10-02T00:00:00Z')
+    points = webapi.points(query=query, count=1)
+    expected = [point.summary(**params) for point in points]
+    cache = webapi.enable_recorded_cache()
+    try:
+        for point, values in zip(points, expected):
+            point.recorded('2017-09-30T00:00:00Z', '2017-10-03T00:00:00Z')
+            local = point.summary(**params)
+            assert len(local) == len(values)
+            for a, b in zip(local, values):
+                assert a.calculationtype == b.calculationtype
+                assert a.value == pytest.approx(b.value, rel=1e-6)
+    finally:
+        webapi.disable_recorded_cache()
+
+@pytest.mark.parametrize('query', ['name:sinusoid'])
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_points_decimated_keeps_extremes(webapi, query, method):
+    points = webapi.points(query=query, count=1)
+    params = dict(starttime='2017-10-01T00:00:00Z',
+                  endtime='2017-10-08T00:00:00Z')
+    decimated = points.decimated(pixels=50, method=method, **params)
+    for point in points:
+        recorded = point.recorded(maxcount=100000, **params)
+        values = decimated[point]
+        assert len(values) <= max(len(recorded), 4 * 50)
+        assert values[0] == recorded[0] and values[-1] == recorded[-1]
+        if method == 'minmax':
+            numbers = [v.value for v in recorded if v.good]
+            assert max(v.value for v in values if v.good) == max(numbers)
+            assert min(v.value for v in values if v.good) == min(numbers)
@@ -228,4 +228,90 @@ def test_point_multiple_mismatch(webapi, query, timestamps, values, ci, pythonve
     assert(len(points) == 1)
     with pytest.raises(MismatchEntriesError) as err:
         for point in points:
-            point.update_values(timestamps, values)
\ No newline at end of file
+            point.update_values(timestamps, values)
+# Test the write-behind buffer
+@pytest.mark.parametrize('query', ['name:PythonInserted'])
+@pytest.mark.parametrize('values', [[311,312,313]])
+def test_point_buffered_writer(webapi, query, now, values, ci, pythonversion):
+    timestamps = [now.shift(hours=-14).format('YYYY-MM-DD HH:mm:ss ZZ'), now.shift(hours=-15).format('YYYY-MM-DD HH:mm:ss ZZ'), now.shift(hours=-16).format('YYYY-MM-DD HH:mm:ss ZZ')]
+    points = webapi.points(query='{}_{}{}'.format(query, ci, pythonversion))
+    assert(len(points) == 1)
+    with webapi.buffered_writer(maxitems=10, maxdelay=None) as writer:
+        for point in points:
+            for timestamp, value in zip(timestamps, values):
+                writer.write(point, timestamp, value)
+        assert len(writer) == len(values)
+    assert writer.failures == []
+    time.sleep(0.5)
+    for point in points:
+        for timestamp, value in zip(timestamps, values):
+            p = point.recordedattime(time=timestamp)
+            assert p.value == value
+
+# Test updates through the write-ahead log
+@pytest.mark.parametrize('query', ['name:PythonInserted'])
+@pytest.mark.parametrize('value', [4711])
+def test_point_update_value_with_wal(webapi, query, now, value, tmpdir, ci, pythonversion):
+    timestamp = now.shift(hours=-17).format('YYYY-MM-DD HH:mm:ss ZZ')
+    points = webapi.points(query='{}_{}{}'.format(query, ci, pythonversion))
+    assert(len(points) == 1)
+    wal = webapi.enable_wal(str(tmpdir))
+    try:
+        for point in points:
+            point.update_value(timestamp, value)
+            assert len(wal) == 0
+            time.sleep(0.5)
+            p = point.recordedattime(time=timestamp)
+            assert p.value == value
+    finally:
+        webapi.disable_wal()
+
+# Test the multi-stream bulk write
+@pytest.mark.parametrize('query', ['name:PythonInserted'])
+@pytest.mark.parametrize('values', [[411,412]])
+def test_points_update_values(webapi, query, now, values, ci, pythonversion):
+    timestamps = [now.shift(hours=-18).format('YYYY-MM-DD HH:mm:ss ZZ'), now.shift(hours=-19).format('YYYY-MM-DD HH:mm:ss ZZ')]
+    points = webapi.points(query='{}_{}{}'.format(query, ci, pythonversion))
+    assert(len(points) == 1)
+    data = dict((point.name, [(timestamps[0], values[0]), (timestamps[1], values[1], {'questionable': True})]) for point in points)
+    failures = points.update_values(data)
+    assert failures == []
+    time.sleep(0.5)
+    for point in points:
+        p = point.recordedattime(time=timestamps[1])
+        assert p.value == values[1]
+        assert p.questionable == True
+
+# Test chunked update_values
+@pytest.mark.parametrize('query', ['name:PythonInserted'])
+@pytest.mark.parametrize('values', [[511,512,513,514,515]])
+def test_point_multiple_update_chunked(webapi, query, now, values, ci, pythonversion):
+    timestamps = [now.shift(hours=-20, minutes=-i).format('YYYY-MM-DD HH:mm:ss ZZ') for i in range(len(values))]
+    points = webapi.points(query='{}_{}{}'.format(query, ci, pythonversion))
+    assert(len(points) == 1)
+    for point in points:
+        report = point.update_values(timestamps, values, chunksize=2, workers=2)
+        assert len(report.chunks) == 3
+        assert report.failed == []
+        assert report.values == len(values)
+        time.sleep(0.5)
+        for timestamp, value in zip(timestamps, values):
+            p = point.recordedattime(time=timestamp)
+            assert p.value == value
+
+# Test update_values with a pandas Series
+@pytest.mark.parametrize('query', ['name:PythonInserted'])
+@pytest.mark.parametrize('values', [[611.5,612.5,613.5]])
+def test_point_multiple_update_series(webapi, query, now, values, ci, pythonversion):
+    pandas = pytest.importorskip('pandas')
+    start = now.shift(hours=-21).replace(microsecond=0)
+    index = pandas.date_range(start.datetime, periods=len(values), freq='1min')
+    points = webapi.points(query='{}_{}{}'.format(query, ci, pythonversion))
+    assert(len(points) == 1)
+    for point in points:
+        report = point.update_values(pandas.Series(values, index=index))
+        assert report.failed == []
+        time.sleep(0.5)
+        for timestamp, value in zip(index, values):
+            p = point.recordedattime(time=timestamp.isoformat())
+            assert p.value == value
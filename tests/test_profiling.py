@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_profiling.py
+~~~~~~~~~~~~
+Tests for `osisoftpy.profile`.
+"""
+import io
+import osisoftpy
+from osisoftpy import tracing
+from osisoftpy.fakeserver import FakePIWebAPI
+
+
+def test_profile_attributes_phases():
+    webapi = FakePIWebAPI(points=20, now=1500000000).webapi()
+    output = io.StringIO()
+    with osisoftpy.profile(output=output) as profiler:
+        points = webapi.points(query='name:*', count=10)
+        points[0].recorded(starttime='*-1h')
+    phases = profiler.phases
+    assert phases['WebAPI.request'].calls == 2
+    assert phases['HTTP GET'].calls == 3
+    assert phases['construct'].items == 20 + 61
+    assert phases['decode'].bytes == phases['HTTP GET'].bytes
+    recorded = phases['Stream.recorded']
+    assert recorded.self <= recorded.wall
+    assert profiler.wall >= recorded.wall
+    table = output.getvalue()
+    assert table.startswith('phase')
+    assert 'Stream.recorded' in table
+    assert not tracing.enabled()
+
+
+def test_profile_restores_tracer():
+    recorder = tracing.enable()
+    try:
+        with osisoftpy.profile(quiet=True):
+            with tracing.span('inside'):
+                pass
+        assert tracing.current() is recorder
+        assert recorder.spans('inside') == []
+    finally:
+        tracing.disable()
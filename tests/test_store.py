@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_store.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.store` module.
+"""
+import multiprocessing
+
+import pytest
+from osisoftpy.fakeserver import FakePIWebAPI
+from osisoftpy.store import Store
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def points():
+    return FakePIWebAPI(points=3, now=1500000000).webapi().points(
+        query='name:*')
+
+
+def _total(directory, webid):
+    return float(Store(directory).read(webid)['value'].sum())
+
+
+def test_store_bulk_extract(tmpdir, points):
+    store = Store(str(tmpdir))
+    extract = points.recorded_columns(starttime='*-1h')
+    store.write_many(extract)
+
+    assert store.webids() == sorted(p.webid for p in points)
+    point = points[0]
+    columns = store.read(point.webid)
+    assert isinstance(columns['value'], np.memmap)
+    assert list(columns['value']) == list(extract[point]['value'])
+
+    part = store.read(point.webid, 1499998000, '2017-07-14T02:20:00Z')
+    assert part['timestamp'][0] == 1499998020
+    assert part['timestamp'][-1] == 1499998800
+
+
+def test_store_values_and_segments(tmpdir, points):
+    point = points[1]
+    store = Store(str(tmpdir))
+    store.write(point.webid, point.recorded(
+        starttime='2017-07-14T01:40:00Z', endtime='2017-07-14T02:00:00Z'))
+    store.write(point.webid, point.recorded(
+        starttime='2017-07-14T01:00:00Z', endtime='2017-07-14T01:20:00Z'))
+
+    assert [r[2] for r in store.ranges(point.webid)] == [21, 21]
+    assert len(store.segments(point.webid, end='2017-07-14T01:45:00Z')) == 2
+    values = (point.recorded(starttime='2017-07-14T01:10:00Z',
+                             endtime='2017-07-14T01:20:00Z') +
+              point.recorded(starttime='2017-07-14T01:40:00Z',
+                             endtime='2017-07-14T01:45:00Z'))
+    columns = store.read(point.webid, '2017-07-14T01:10:00Z',
+                         '2017-07-14T01:45:00Z')
+    assert list(columns['value']) == [v.value for v in values]
+
+
+def test_store_shared_with_other_processes(tmpdir, points):
+    store = Store(str(tmpdir))
+    reader = Store(str(tmpdir))
+    point = points[2]
+    store.write(point.webid, point.recorded(starttime='*-10m'))
+    assert point.webid in reader
+
+    pool = multiprocessing.Pool(1)
+    try:
+        total = pool.apply(_total, (str(tmpdir), point.webid))
+    finally:
+        pool.close()
+        pool.join()
+    assert total == pytest.approx(float(reader.read(point.webid)['value']
+                                        .sum()))
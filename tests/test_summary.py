@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_summary.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.summary` module. The expected values are worked out
+by hand from the recorded values below.
+"""
+import pytest
+from osisoftpy.summary import (CALC_FAILED, SUMMARY_TYPES, intervals,
+                               summarize, summary_types)
+
+pytest.importorskip('numpy')
+
+T = 1500000000
+IO_TIMEOUT = {'Name': 'I/O Timeout', 'Value': 246, 'IsSystem': True}
+
+
+def _item(seconds, value, good=True):
+    return {'Timestamp': '2017-07-14T02:{:02d}:{:02d}Z'.format(
+                40 + seconds // 60, seconds % 60),
+            'Value': value, 'UnitsAbbreviation': 'm', 'Good': good,
+            'Questionable': False, 'Substituted': False}
+
+
+# recorded values, at T plus the seconds; bad from 120 to 180
+RECORDED = [
+    _item(0, 10.0),
+    _item(60, 20.0),
+    _item(120, IO_TIMEOUT, good=False),
+    _item(180, 40.0),
+    _item(240, 50.0),
+    _item(300, 60.0),
+]
+TIMES = [T + 60 * i for i in range(len(RECORDED))]
+
+
+def _values(result, summarytype):
+    return [x['Value']['Value'] for x in result if x['Type'] == summarytype]
+
+
+def _bounds(*seconds):
+    return [T + s for s in seconds]
+
+
+def test_summary_types():
+    assert summary_types(None) == ['Total']
+    assert summary_types('average') == ['Average']
+    assert summary_types(['Maximum', 'Minimum']) == ['Minimum', 'Maximum']
+    assert summary_types('All') == list(SUMMARY_TYPES)
+    assert summary_types(['Average', 'Delta']) is None
+
+
+def test_intervals_end_with_a_partial_one():
+    assert list(intervals(T, T + 300, 120)) == _bounds(0, 120, 240, 300)
+    assert list(intervals(T, T + 240, 120)) == _bounds(0, 120, 240)
+    assert list(intervals(T, T + 300)) == _bounds(0, 300)
+
+
+def test_time_weighted_skips_bad_time():
+    # 60 * (10 + 20) / 2 + 60 * 20 + 60 * (40 + 50) / 2 + 60 * (50 + 60) / 2
+    # = 8100 over the 240 good seconds; before the bad value 20 is held
+    result = summarize(TIMES, RECORDED, _bounds(0, 300), SUMMARY_TYPES)
+    assert _values(result, 'Average') == [pytest.approx(33.75)]
+    assert _values(result, 'Total') == [pytest.approx(8100 / 86400.0)]
+    assert _values(result, 'Count') == [240.0]
+    assert _values(result, 'PercentGood') == [80.0]
+    assert _values(result, 'Minimum') == [10.0]
+    assert _values(result, 'Maximum') == [60.0]
+    assert _values(result, 'Range') == [50.0]
+    maximum = [x for x in result if x['Type'] == 'Maximum'][0]['Value']
+    assert maximum['Timestamp'] == '2017-07-14T02:45:00Z'
+    assert maximum['UnitsAbbreviation'] == 'm'
+
+
+def test_time_weighted_step():
+    # 60 * 10 + 60 * 20 + 60 * 40 + 60 * 50 = 7200 over 240 seconds
+    result = summarize(TIMES, RECORDED, _bounds(0, 300), ['Average'],
+                       step=True)
+    assert _values(result, 'Average') == [pytest.approx(30.0)]
+
+
+def test_time_weighted_intervals():
+    # [0, 120]: (900 + 1200) / 120, [120, 240]: 2700 / 60 of 120 seconds
+    # good, [240, 300]: 3300 / 60
+    result = summarize(TIMES, RECORDED, _bounds(0, 120, 240, 300),
+                       ['Average', 'Minimum', 'PercentGood'])
+    assert _values(result, 'Average') == [
+        pytest.approx(17.5), pytest.approx(45.0), pytest.approx(55.0)]
+    assert _values(result, 'PercentGood') == [100.0, 50.0, 100.0]
+    assert _values(result, 'Minimum') == [10.0, 40.0, 50.0]
+
+
+def test_time_weighted_interpolates_at_the_bounds():
+    # 15 at 30 and 20 held until 90:
+    # (30 * (15 + 20) / 2 + 30 * 20) / 60
+    result = summarize(TIMES, RECORDED, _bounds(30, 90), ['Average',
+                                                         'Minimum'])
+    assert _values(result, 'Average') == [pytest.approx(18.75)]
+    assert _values(result, 'Minimum') == [15.0]
+
+
+def test_time_weighted_without_good_values_fails():
+    result = summarize(TIMES, RECORDED, _bounds(120, 150), ['Average',
+                                                           'PercentGood'])
+    average = result[0]['Value']
+    assert average['Value'] == CALC_FAILED and not average['Good']
+    assert _values(result, 'PercentGood') == [0.0]
+
+
+def test_event_weighted_intervals():
+    # [0, 120): 10, 20; [120, 240): bad, 40; [240, 300]: 50, 60
+    result = summarize(TIMES, RECORDED, _bounds(0, 120, 240, 300),
+                       ['Total', 'Average', 'StdDev', 'PopulationStdDev',
+                        'Count', 'PercentGood'], 'EventWeighted')
+    assert _values(result, 'Total') == [30.0, 40.0, 110.0]
+    assert _values(result, 'Average') == [15.0, 40.0, 55.0]
+    assert _values(result, 'Count') == [2.0, 1.0, 2.0]
+    assert _values(result, 'PercentGood') == [100.0, 50.0, 100.0]
+    assert _values(result, 'StdDev')[0] == pytest.approx(50 ** 0.5)
+    assert _values(result, 'StdDev')[1] == CALC_FAILED
+    assert _values(result, 'PopulationStdDev') == [5.0, 0.0, 5.0]
+
+
+def test_event_weighted_include_both_ends():
+    # [0, 120]: 10, 20, bad; [120, 240]: bad, 40, 50
+    result = summarize(TIMES, RECORDED, _bounds(0, 120, 240),
+                       ['Average', 'PercentGood'],
+                       'EventWeightedIncludeBothEnds')
+    assert _values(result, 'Average') == [15.0, 45.0]
+    assert _values(result, 'PercentGood') == [
+        pytest.approx(200 / 3.0), pytest.approx(200 / 3.0)]
+
+
+def test_unsupported_calculation_basis():
+    with pytest.raises(ValueError):
+        summarize(TIMES, RECORDED, _bounds(0, 300), ['Average'], 'Weekly')
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_tracing.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.tracing` module.
+"""
+import pytest
+from osisoftpy import tracing
+from osisoftpy.fakeserver import FakePIWebAPI
+
+
+@pytest.fixture
+def recorder():
+    recorder = tracing.enable()
+    yield recorder
+    tracing.disable()
+
+
+def test_disabled_span_is_shared_noop():
+    assert not tracing.enabled()
+    with tracing.span('a', x=1) as a:
+        a.set_attribute('y', 2)
+    assert tracing.span('b') is a
+
+
+def test_spans_nest(recorder):
+    with tracing.span('outer', n=1) as outer:
+        with tracing.span('inner'):
+            pass
+        outer.set_attribute('m', 2)
+    trace = recorder.traces[-1]
+    assert trace.name == 'outer'
+    assert trace.attributes == {'n': 1, 'm': 2}
+    assert [s.name for s in trace.children] == ['inner']
+    assert trace.duration >= trace.children[0].duration
+
+
+def test_span_records_error(recorder):
+    with pytest.raises(ValueError):
+        with tracing.span('failing'):
+            raise ValueError('boom')
+    assert isinstance(recorder.traces[-1].error, ValueError)
+
+
+def test_library_spans(recorder):
+    webapi = FakePIWebAPI(points=12, now=1500000000).webapi()
+    points = webapi.points(query='name:*', count=5)
+    points.current()
+    points[0].recorded(starttime='*-1h')
+    search, current, recorded = list(recorder.traces)[-3:]
+    assert search.name == 'WebAPI.points'
+    assert search.attributes['pages'] == 3
+    assert [s.name for s in search.children].count('WebAPI.request') == 3
+    assert current.name == 'Points.current'
+    assert [s.name for s in current.children] == ['get_batch', 'decode',
+                                                  'merge']
+    assert recorded.name == 'Stream.recorded'
+    assert [s.name for s in recorded.children] == ['HTTP GET', 'decode',
+                                                   'construct']
+    assert recorded.children[0].attributes['endpoint'] == \
+        'streams/{webid}/recorded'
+    assert recorded.attributes['items'] == 61
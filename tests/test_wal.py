@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_wal.py
+~~~~~~~~~~~~
+Tests for the `osisoftpy.wal` module, against the fake PI Web API.
+"""
+import io
+import os
+
+import pytest
+from osisoftpy.exceptions import HTTPError
+from osisoftpy.fakeserver import FakePIWebAPI
+from osisoftpy.wal import WriteAheadLog
+
+
+@pytest.fixture
+def fake():
+    return FakePIWebAPI(points=5, now=1500000000)
+
+
+def _append(wal, webid, n, option='Replace'):
+    return wal.append(webid, 'value', {'updateOption': option},
+                      {'Timestamp': '2017-07-14T02:{:02d}:00Z'.format(n),
+                       'Value': float(n)})
+
+
+def test_wal_replays_queued_updates_in_order(fake, tmpdir):
+    webapi = fake.webapi()
+    point = fake.point('cdt158')
+    wal = WriteAheadLog(str(tmpdir))
+    fake.inject(503)
+    _append(wal, point.webid, 1)
+    assert wal.replay(webapi) == 0
+    _append(wal, point.webid, 2)
+    assert wal.replay(webapi) == 2
+    assert [point.written[t]['Value'] for t in sorted(point.written)] == [
+        1.0, 2.0]
+    assert len(wal) == 0 and list(wal.pending()) == []
+
+
+def test_wal_replay_goes_through_request_hooks(fake, tmpdir):
+    webapi = fake.webapi()
+    events = []
+    webapi.on_request_end(events.append)
+    wal = WriteAheadLog(str(tmpdir))
+    fake.inject(503)
+    _append(wal, fake.point('cdt158').webid, 1)
+    wal.replay(webapi)
+    wal.replay(webapi)
+    assert [(e.status, e.retry) for e in events] == [(503, 0), (202, 1)]
+
+
+def test_wal_rejects_non_idempotent_update_options(tmpdir):
+    wal = WriteAheadLog(str(tmpdir))
+    with pytest.raises(ValueError):
+        _append(wal, 'FAKEP00000002', 1, option='Insert')
+    _append(wal, 'FAKEP00000002', 1, option='NoReplace')
+    assert len(wal) == 1
+
+
+def test_wal_pending_skips_acknowledged_records(tmpdir):
+    wal = WriteAheadLog(str(tmpdir))
+    for n in range(1, 6):
+        _append(wal, 'FAKEP00000002', n)
+    wal.ack(3)
+    assert [r['seq'] for r in wal.pending()] == [4, 5]
+    offset = wal._position
+    assert offset[1] > 0
+    assert [r['seq'] for r in wal.pending()] == [4, 5]
+    assert wal._position == offset
+
+
+def test_wal_recovers_every_segment(tmpdir):
+    wal = WriteAheadLog(str(tmpdir), segmentsize=200)
+    for n in range(1, 9):
+        _append(wal, 'FAKEP00000002', n)
+    wal.ack(2)
+    wal.close()
+    segments = sorted(x for x in os.listdir(str(tmpdir))
+                      if x.endswith('.wal'))
+    assert len(segments) > 2
+    # a crash in the middle of an append
+    with io.open(os.path.join(str(tmpdir), segments[-1]), 'ab') as f:
+        f.write(b'{"seq": 9, "webid"')
+
+    recovered = WriteAheadLog(str(tmpdir), segmentsize=200)
+    assert recovered.lastseq == 8
+    assert [r['seq'] for r in recovered.pending()] == list(range(3, 9))
+    assert _append(recovered, 'FAKEP00000002', 9) == 9
+    assert [r['seq'] for r in recovered.pending()] == list(range(3, 10))
+
+
+def test_update_value_keeps_updates_while_unreachable(fake, tmpdir):
+    webapi = fake.webapi()
+    webapi.enable_wal(str(tmpdir))
+    point = webapi.points(query='name:cdt158')[0]
+    fake.inject(503)
+    point.update_value('2017-07-14T02:01:00Z', 1.0)
+    assert len(webapi.wal) == 1
+    point.update_value('2017-07-14T02:02:00Z', 2.0)
+    assert len(webapi.wal) == 0
+    assert len(fake.point('cdt158').written) == 2
+
+
+def test_update_value_raises_for_rejected_updates(fake, tmpdir):
+    webapi = fake.webapi()
+    webapi.enable_wal(str(tmpdir))
+    point = webapi.points(query='name:cdt158')[0]
+    fake.inject(400)
+    with pytest.raises(HTTPError):
+        point.update_value('2017-07-14T02:01:00Z', 1.0)
+    fake.inject(400)
+    point.update_value('2017-07-14T02:02:00Z', 2.0, error_action='Continue')
+    assert [r['seq'] for r in webapi.wal.rejected] == [1, 2]
+    assert len(webapi.wal) == 0
@@ -60,6 +60,7 @@ def test_webapi_has_self_url_property(webapi, url):
 def test_webapi_has_search_url(webapi, url):
     assert webapi.links.get('Search') == url + '/search'
 
+@pytest.mark.live
 def test_webapi_has_dataservers(webapi):
     assert webapi.dataservers.__len__() == 2
 
@@ -95,10 +96,12 @@ def test_webapi_points_query(webapi, query):
     msg = '{} points were retrieved with the query "{}"'
     print(msg.format(points.__len__(), query))
 
+@pytest.mark.live
 def test_webapi_points_scope(webapi):
     points = webapi.points(query='name:SINUSOID*', scope='pi:gold')
     assert points.__len__() == 4
 
+@pytest.mark.live
 def test_webapi_points_pagination(webapi):
     points = webapi.points(query='name:S*')
     assert points.__len__() == 398
@@ -175,6 +178,8 @@ def callback_interp_1(sender):
 
 # test interpolatedattimes - assumes no one has used this tag
 # @pytest.mark.skipif(piserverissue, reason='PI Server times out when retrieving archived values')
+# the values around the times must be the only ones of the point
+@pytest.mark.live
 @pytest.mark.parametrize('query', ['name:PythonInterpolatedAtTime'])
 # @pytest.mark.parametrize('times', [['2017-01-01T00:00:00Z']])
 def test_subscription_interpolatedattimes_single_timestamp_notify_one(webapi, query, now, ci, pythonversion, callback=callback_interp_1):
@@ -294,6 +299,7 @@ def test_webapi_has_assetservers_objects(webapi):
     assert all(isinstance(assetserver, osisoftpy.AssetServer) for assetserver in webapi.assetservers)
     assert webapi.assetservers.__len__() > 0
 
+@pytest.mark.live
 def test_webapi_has_assetdatabases(webapi):
     servers = webapi.assetservers
     for assetserver in servers:
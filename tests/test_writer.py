@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2017 DST Controls
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+osisoftpy.tests.test_writer.py
+~~~~~~~~~~~~
+Tests for the bulk writes of Points.update_values and the
+`osisoftpy.writer` module, against the fake PI Web API.
+"""
+import pytest
+import requests
+from osisoftpy.fakeserver import FakePIWebAPI
+from osisoftpy.structures import BatchResult
+from osisoftpy.writer import BufferedWriter, post_chunked
+
+ROWS = [('2017-07-14T02:39:10Z', 1.0), ('2017-07-14T02:39:20Z', 2.0)]
+
+
+@pytest.fixture
+def fake():
+    return FakePIWebAPI(points=5, now=1500000000)
+
+
+def _written(fake, name):
+    point = fake.point(name)
+    return [point.written[t]['Value'] for t in sorted(point.written)]
+
+
+def _batches(webapi):
+    events = []
+    webapi.on_request_end(
+        lambda e: events.append(e.status) if e.template == 'batch' else None)
+    return events
+
+
+def test_points_update_values_fans_out_in_batches(fake):
+    webapi = fake.webapi()
+    points = webapi.points(query='name:*')
+    batches = _batches(webapi)
+    data = dict((point.name, ROWS) for point in points)
+    assert points.update_values(data, chunksize=2) == []
+    assert len(batches) == 3
+    assert fake.counts['POST/streams/recorded'] == 5
+    assert all(_written(fake, p.name) == [1.0, 2.0] for p in points)
+
+
+def test_points_update_values_reports_partial_failures(fake):
+    webapi = fake.webapi()
+    points = webapi.points(query='name:sinusoid OR name:cdt158')
+    lost = points[0]
+    lost.webid = 'FAKEP99999999'
+    failures = points.update_values({lost: ROWS, points[1]: ROWS},
+                                    backoff=0)
+    assert [f.record.stream.webid for f in failures] == [lost.webid] * 2
+    assert all(f.status == 404 for f in failures)
+    assert _written(fake, points[1].name) == [1.0, 2.0]
+
+
+def test_points_update_values_retries_transient_errors(fake):
+    webapi = fake.webapi()
+    points = webapi.points(query='name:cdt158')
+    batches = _batches(webapi)
+    fake.inject(503, 2)
+    assert points.update_values({'cdt158': ROWS}, backoff=0) == []
+    assert batches == [503, 503, 207]
+    assert _written(fake, 'cdt158') == [1.0, 2.0]
+
+
+def test_points_update_values_does_not_retry_other_errors(fake):
+    webapi = fake.webapi()
+    points = webapi.points(query='name:cdt158')
+    batches = _batches(webapi)
+    fake.inject(401, 4)
+    failures = points.update_values({'cdt158': ROWS}, backoff=0)
+    assert batches == [401]
+    assert [f.status for f in failures] == [401, 401]
+
+
+def test_update_values_chunks_kept_in_the_wal_are_pending(fake, tmpdir):
+    webapi = fake.webapi()
+    webapi.enable_wal(str(tmpdir))
+    point = webapi.points(query='name:cdt158')[0]
+    times, values = zip(*ROWS)
+    fake.inject(503, 2)
+    report = point.update_values(list(times), list(values), chunksize=1)
+    assert len(report.pending) == 2 and report.failed == []
+    assert _written(fake, 'cdt158') == []
+    report = point.update_values(list(times), list(values), chunksize=1)
+    assert report.pending == [] and report.failed == []
+    assert [c.status for c in report.chunks] == [202, 202]
+    assert _written(fake, 'cdt158') == [1.0, 2.0]
+
+
+def test_update_values_chunks_rejected_from_the_wal_fail(fake, tmpdir):
+    webapi = fake.webapi()
+    webapi.enable_wal(str(tmpdir))
+    point = webapi.points(query='name:cdt158')[0]
+    times, values = zip(*ROWS)
+    fake.inject(400)
+    report = point.update_values(list(times), list(values), chunksize=1,
+                                 error_action='Continue')
+    assert [c.status for c in report.failed] == [400]
+    assert _written(fake, 'cdt158') == [2.0]
+
+
+def test_post_chunked_does_not_retry_invalid_requests(fake, monkeypatch):
+    point = fake.webapi().points(query='name:cdt158')[0]
+    calls = []
+
+    def post(url, *args, **kwargs):
+        calls.append(url)
+        raise requests.exceptions.InvalidURL(url)
+    monkeypatch.setattr('osisoftpy.writer.post', post)
+    report = post_chunked(point, 'recorded', {}, ['{}'], backoff=0)
+    assert len(calls) == 1
+    assert report.failed[0].status is None and report.failed[0].attempts == 1
+
+
+def test_buffered_writer_batches_several_streams(fake):
+    webapi = fake.webapi()
+    points = webapi.points(query='name:*')[:3]
+    writer = BufferedWriter(webapi, maxdelay=None)
+    for point in points:
+        for timestamp, value in ROWS:
+            writer.write(point, timestamp, value)
+    assert writer.flush() == []
+    assert fake.counts['POST/batch'] == 1
+    assert all(_written(fake, p.name) == [1.0, 2.0] for p in points)
+
+
+def test_buffered_writer_reports_failures(fake):
+    webapi = fake.webapi()
+    points = webapi.points(query='name:sinusoid OR name:cdt158')
+    lost = points[0]
+    lost.webid = 'FAKEP99999999'
+    with BufferedWriter(webapi, maxdelay=None) as writer:
+        for point in points:
+            writer.write(point, *ROWS[0])
+    assert [(f.record.stream, f.status) for f in writer.failures] == [
+        (lost, 404)]
+    assert _written(fake, points[1].name) == [1.0]
+    fake.inject(503)
+    writer = BufferedWriter(webapi, maxdelay=None)
+    writer.write(points[1], *ROWS[1])
+    assert [f.status for f in writer.flush()] == [503]
+
+
+def test_buffered_writer_treats_a_missing_status_as_failed(fake, monkeypatch):
+    webapi = fake.webapi()
+    points = webapi.points(query='name:sinusoid OR name:cdt158')
+    monkeypatch.setattr(
+        'osisoftpy.writer.batch', lambda webapi, subrequests: dict(
+            (key, BatchResult(None, None, [])) for key in subrequests))
+    writer = BufferedWriter(webapi, maxdelay=None)
+    for point in points:
+        writer.write(point, *ROWS[0])
+    failures = writer.flush()
+    assert len(failures) == 2 and all(f.status is None for f in failures)
+
+
+def test_update_values_rejects_nat_timestamps(fake):
+    np = pytest.importorskip('numpy')
+    point = fake.webapi().points(query='name:cdt158')[0]
+    times = np.array(['2017-07-14T02:39:10', 'NaT'], dtype='datetime64[s]')
+    with pytest.raises(ValueError):
+        point.update_values(times, np.array([1.0, 2.0]))
+    with pytest.raises(ValueError):
+        point.update_values(times[:1], np.array([np.nan]))
+    assert fake.point('cdt158').written == {}